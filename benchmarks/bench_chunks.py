@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#
+# read_in_chunks() throughput benchmark. Re-chunks an in-memory stream made
+# of odd sized pieces (like the ones returned by a socket) using the
+# previous string concatenation based implementation and the current one
+# for a range of chunk sizes.
+#
+# Usage: python benchmarks/bench_chunks.py [size in MB]
+#
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from libcloud.utils import read_in_chunks
+
+CHUNK_SIZES = [8 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024,
+               8 * 1024 * 1024]
+PIECE_SIZE = 1460 * 11
+
+
+def concat_read_in_chunks(iterator, chunk_size, fill_size):
+    # Previous implementation
+    data = ''
+    empty = False
+
+    while not empty or len(data) > 0:
+        if not empty:
+            try:
+                chunk = str(iterator.next())
+                if len(chunk) > 0:
+                    data += chunk
+                else:
+                    empty = True
+            except StopIteration:
+                empty = True
+
+        if len(data) == 0:
+            raise StopIteration
+
+        if fill_size:
+            if empty or len(data) >= chunk_size:
+                yield data[:chunk_size]
+                data = data[chunk_size:]
+        else:
+            yield data
+            data = ''
+
+
+def pieces(piece, count):
+    for i in xrange(count):
+        yield piece
+
+
+def run(func, size, chunk_size):
+    piece = 'a' * PIECE_SIZE
+    count = size / PIECE_SIZE
+    total = 0
+
+    start = time.time()
+    for chunk in func(pieces(piece, count), chunk_size, True):
+        total += len(chunk)
+    elapsed = time.time() - start
+
+    assert total == count * PIECE_SIZE
+    return total / elapsed / (1024 * 1024)
+
+
+def main(argv):
+    size = 64
+
+    if len(argv) > 1:
+        size = int(argv[1])
+
+    size = size * 1024 * 1024
+
+    print '%-12s %16s %16s' % ('chunk size', 'concat (MB/s)',
+                               'current (MB/s)')
+
+    for chunk_size in CHUNK_SIZES:
+        before = run(concat_read_in_chunks, size, chunk_size)
+        after = run(read_in_chunks, size, chunk_size)
+        print '%-12d %16.1f %16.1f' % (chunk_size, before, after)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
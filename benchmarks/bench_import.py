@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#
+# Import time benchmark. Every statement is timed in a fresh interpreter.
+#
+# Usage: python benchmarks/bench_import.py [runs]
+#
+
+import os
+import sys
+import subprocess
+
+STATEMENTS = [
+    'import libcloud',
+    'from libcloud.compute.providers import get_driver',
+    'from libcloud.storage.providers import get_driver',
+    'import libcloud.compute.base',
+    'import libcloud.storage.base',
+    ('from libcloud.compute.providers import get_driver; '
+     'from libcloud.compute.types import Provider; '
+     'get_driver(Provider.EC2)'),
+    ('from libcloud.compute.providers import get_driver; '
+     'from libcloud.compute.types import Provider; '
+     'get_driver(Provider.SOFTLAYER)')
+]
+
+CODE = """
+import sys, time
+before = len(sys.modules)
+start = time.time()
+%s
+print time.time() - start, len(sys.modules) - before
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def measure(statement, runs):
+    times = []
+
+    for _ in range(runs):
+        process = subprocess.Popen([sys.executable, '-c', CODE % statement],
+                                   cwd=ROOT, stdout=subprocess.PIPE)
+        elapsed, modules = process.communicate()[0].split()
+        times.append(float(elapsed))
+
+    times.sort()
+    return times[len(times) // 2], int(modules)
+
+
+def main(argv):
+    runs = 10
+
+    if len(argv) > 1:
+        runs = int(argv[1])
+
+    for statement in STATEMENTS:
+        elapsed, modules = measure(statement, runs)
+        print '%8.2f ms %4d modules  %s' % (elapsed * 1000, modules,
+                                             statement)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
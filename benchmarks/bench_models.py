@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#
+# Model object memory benchmark. Compares the size of the slot based model
+# objects to equivalent __dict__ based objects (subclasses which don't
+# declare __slots__).
+#
+# Usage: python benchmarks/bench_models.py [count]
+#
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from libcloud.compute.base import Node, NodeSize, NodeImage, NodeLocation
+from libcloud.storage.base import Object, Container
+from libcloud.loadbalancer.base import Member, LoadBalancer
+
+
+class FakeDriver(object):
+    type = 0
+    name = 'fake'
+
+DRIVER = FakeDriver()
+CONTAINER = Container(name='container', extra=None, driver=DRIVER)
+
+FACTORIES = [
+    (Node, lambda cls, i: cls(id=i, name='node-%d' % (i), state=0,
+                              public_ip=['10.0.0.1'], private_ip=[],
+                              driver=DRIVER)),
+    (NodeSize, lambda cls, i: cls(id=i, name='size', ram=256, disk=10,
+                                  bandwidth=None, price=0.1, driver=DRIVER)),
+    (NodeImage, lambda cls, i: cls(id=i, name='image', driver=DRIVER)),
+    (NodeLocation, lambda cls, i: cls(id=i, name='location', country='US',
+                                      driver=DRIVER)),
+    (Object, lambda cls, i: cls(name='object-%d' % (i), size=i, hash='abc',
+                                extra={}, meta_data={}, container=CONTAINER,
+                                driver=DRIVER)),
+    (Container, lambda cls, i: cls(name='container-%d' % (i), extra={},
+                                   driver=DRIVER)),
+    (Member, lambda cls, i: cls(id=i, ip='10.0.0.1', port=80)),
+    (LoadBalancer, lambda cls, i: cls(id=i, name='lb', state=0,
+                                      ip='10.0.0.1', port=80, driver=DRIVER))
+]
+
+
+def get_size(obj):
+    """
+    Return the size of the object, its __dict__ and its (empty) extra
+    dictionaries. Attribute values are shared and not included.
+    """
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, '__dict__', None)
+
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        values = attributes.values()
+    else:
+        values = [getattr(obj, name, None) for name in ('_extra',
+                                                       '_meta_data')]
+
+    for value in values:
+        if isinstance(value, dict):
+            size += sys.getsizeof(value)
+
+    return size
+
+
+def dict_based(cls):
+    # Subclass without __slots__ and with the extra dictionaries created up
+    # front, like the previous implementation
+    def __init__(self, *args, **kwargs):
+        cls.__init__(self, *args, **kwargs)
+
+        for name in ('extra', 'meta_data'):
+            if hasattr(cls, name):
+                self.__dict__[name] = getattr(self, name)
+
+    return type('Dict' + cls.__name__, (cls, ), {'__init__': __init__})
+
+
+def main(argv):
+    count = 100000
+
+    if len(argv) > 1:
+        count = int(argv[1])
+
+    print '%-14s %12s %12s %12s' % ('class', 'dict (B)', 'slots (B)',
+                                    'create (us)')
+
+    for cls, factory in FACTORIES:
+        before = get_size(factory(dict_based(cls), 1))
+
+        start = time.time()
+        objects = [factory(cls, i) for i in xrange(count)]
+        elapsed = time.time() - start
+
+        after = get_size(objects[0])
+        print '%-14s %12d %12d %12.2f' % (cls.__name__, before, after,
+                                          elapsed * 1000000.0 / count)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
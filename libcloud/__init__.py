@@ -25,16 +25,28 @@ __version__ = '0.5.2'
 DEFAULT_LOG_PATH = '/tmp/libcloud_debug.log'
 
 
-def enable_debug(fo):
+def enable_debug(fo, buffered=False):
     """
     Enable library wide debugging to a file-like object.
 
     @param fo: Where to append debugging information
     @type fo: File like object, only write operations are used.
+
+    @param buffered: True to write the log entries from a background thread
+                     (see L{libcloud.common.base.BufferedLogWriter}). Entries
+                     are dropped if the thread can't keep up.
+    @type buffered: C{bool}
     """
-    from libcloud.base import (ConnectionKey,
-                               LoggingHTTPConnection,
-                               LoggingHTTPSConnection)
+    from libcloud.common.base import (ConnectionKey,
+                                      LoggingHTTPConnection,
+                                      LoggingHTTPSConnection,
+                                      BufferedLogWriter)
+
+    if buffered and not isinstance(fo, BufferedLogWriter):
+        import atexit
+        fo = BufferedLogWriter(fo)
+        atexit.register(fo.flush)
+
     LoggingHTTPSConnection.log = fo
     LoggingHTTPConnection.log = fo
     ConnectionKey.conn_classes = (LoggingHTTPConnection,
@@ -50,6 +62,8 @@ def _init_once():
 
     If LIBCLOUD_DEBUG is not a path, C{/tmp/libcloud_debug.log} is used by
     default.
+
+    Connection classes are only imported if debugging is enabled.
     """
     import os
     d = os.getenv('LIBCLOUD_DEBUG')
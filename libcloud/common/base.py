@@ -13,41 +13,233 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
 import httplib
 import urllib
-import StringIO
+import socket
 import ssl
+import threading
+import time
 
+from cStringIO import StringIO
 from pipes import quote as pquote
 
 import libcloud
 
 from libcloud.httplib_ssl import LibcloudHTTPSConnection
+from libcloud.common.types import CircuitOpenError, DeadlineExceededError
 from httplib import HTTPConnection as LibcloudHTTPConnection
 
+# Maximum number of idle connections which are kept per host
+DEFAULT_POOL_MAX_SIZE = 10
+
+# How long (in seconds) an idle connection is kept around before it is closed
+DEFAULT_POOL_IDLE_TIMEOUT = 30
+
+# Methods of the requests which are retried if a pooled connection turns out
+# to be closed by the server (RFC 2616 idempotent methods). Other requests
+# may have been processed even though no response has been received.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE')
+
+# Content codings which are requested (Accept-Encoding) and transparently
+# decoded for API responses
+SUPPORTED_CONTENT_ENCODINGS = ('gzip', 'deflate')
+
+# Number of bytes which are read from the socket at once when decoding a
+# compressed response body
+DECOMPRESS_CHUNK_SIZE = 16 * 1024
+
+def get_content_encoding(headers):
+    """
+    Return the (lower cased) value of the Content-Encoding header if it's one
+    of the supported encodings, None otherwise.
+    """
+    for key, value in headers.items():
+        if key.lower() == 'content-encoding':
+            value = value.strip().lower()
+
+            if value in SUPPORTED_CONTENT_ENCODINGS:
+                return value
+
+    return None
+
+class DecompressingReader(object):
+    """
+    File-like wrapper around a HTTP response which decodes a gzip or deflate
+    encoded body as it's being read.
+    """
+
+    def __init__(self, response, encoding, chunk_size=DECOMPRESS_CHUNK_SIZE):
+        """
+        @type response: C{httplib.HTTPResponse}
+        @param response: Response (or any other object with a read method).
+
+        @type encoding: C{str}
+        @param encoding: 'gzip' or 'deflate'.
+        """
+        self.response = response
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self._buffer = ''
+        self._eof = False
+        self._started = False
+
+        import zlib
+
+        if encoding == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+
+    def read(self, amt=None):
+        if amt is None:
+            chunks = [self._buffer]
+            self._buffer = ''
+
+            while not self._eof:
+                chunks.append(self._read_chunk())
+
+            return ''.join(chunks)
+
+        while not self._eof and len(self._buffer) < amt:
+            self._buffer += self._read_chunk()
+
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def _read_chunk(self):
+        data = self.response.read(self.chunk_size)
+
+        if not data:
+            self._eof = True
+            return self._decompressor.flush()
+
+        if self._started or self.encoding != 'deflate':
+            self._started = True
+            return self._decompressor.decompress(data)
+
+        self._started = True
+
+        import zlib
+
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate data without the zlib header
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(data)
+
+class ReleasingReader(object):
+    """
+    File-like wrapper around the body of a streamed response which releases
+    the connection once the body has been read to the end. If the reader is
+    closed or reading fails before that, the connection is discarded
+    instead, so the rest of the body is never read by another request.
+    """
+
+    def __init__(self, reader, release, discard):
+        """
+        @param reader: Response or L{DecompressingReader}.
+
+        @type release: C{callable}
+        @param release: Called once the whole body has been read.
+
+        @type discard: C{callable}
+        @param discard: Called if the body hasn't been read to the end.
+        """
+        self.reader = reader
+        self._release = release
+        self._discard = discard
+        self._finished = False
+
+    def read(self, amt=None):
+        try:
+            if amt is None:
+                data = self.reader.read()
+            else:
+                data = self.reader.read(amt)
+        except Exception:
+            self._finish(self._discard)
+            raise
+
+        if amt is None or (amt and not data):
+            self._finish(self._release)
+
+        return data
+
+    def close(self):
+        self._finish(self._discard)
+
+    def _finish(self, callback):
+        if not self._finished:
+            self._finished = True
+            callback()
+
 class Response(object):
     """
     A Base Response class to derive from.
+
+    Bodies encoded using one of the C{SUPPORTED_CONTENT_ENCODINGS} are
+    decoded transparently. The body is parsed (see L{parse_body}) when
+    C{object} is accessed for the first time.
     """
     NODE_STATE_MAP = {}
 
-    object = None
+    # True to parse the body in the constructor, for providers which report
+    # errors in the body of otherwise successful responses
+    parse_eagerly = False
+
     body = None
     status = httplib.OK
     headers = {}
     error = None
     connection = None
 
-    def __init__(self, response):
-        self.body = response.read()
+    def __init__(self, response, stream=False):
+        """
+        @type stream: C{bool}
+        @param stream: True to leave the body of a successful response
+                       unread. C{body} is then a file-like object which
+                       can be parsed incrementally (e.g. using
+                       L{libcloud.utils.IterParser}) and C{object} is None.
+        """
         self.status = response.status
         self.headers = dict(response.getheaders())
         self.error = response.reason
 
+        if stream and self.success():
+            self.body = self._get_body_reader(response)
+            return
+
+        self.body = self._read_body(response)
+
         if not self.success():
             raise Exception(self.parse_error())
 
-        self.object = self.parse_body()
+        # Body is parsed on first access, callers which only check the
+        # status never pay for it
+        self._parse_pending = True
+
+        if self.parse_eagerly:
+            self._get_object()
+
+    _object = None
+    _parse_pending = False
+
+    def _get_object(self):
+        if self._parse_pending:
+            self._object = self.parse_body()
+            self._parse_pending = False
+
+        return self._object
+
+    def _set_object(self, value):
+        self._object = value
+        self._parse_pending = False
+
+    object = property(_get_object, _set_object, doc='Parsed body.')
 
     def parse_body(self):
         """
@@ -80,7 +272,69 @@ class Response(object):
         """
         return self.status == httplib.OK or self.status == httplib.CREATED
 
+    def _read_body(self, response):
+        return self._get_body_reader(response).read()
+
+    def _get_body_reader(self, response):
+        encoding = get_content_encoding(self.headers)
+
+        if encoding is None:
+            return response
+
+        return DecompressingReader(response, encoding)
+
+    _body_data = None
+
+    def _buffer_body(self):
+        """
+        Read the whole body of a streamed response, so the response can be
+        shared (see L{copy_response}). C{body} is then a file-like object
+        which reads from memory.
+        """
+        self._body_data = self.body.read()
+        self.body = StringIO(self._body_data)
+
+def copy_response(response):
+    """
+    Return a copy of a response which can be returned to another caller.
+    The body is parsed (once) and the parsed body is shared with the
+    original response. The copy of a buffered streamed response gets its
+    own file-like body.
+    """
+    import copy
+
+    if response._body_data is None:
+        response.object
+
+    response = copy.copy(response)
+    response.headers = dict(response.headers)
+
+    if response._body_data is not None:
+        response.body = StringIO(response._body_data)
+
+    return response
+
 class RawResponse(Response):
+    """
+    Response whose body is read by the caller.
+
+    C{response} is the underlying (undecoded) HTTP response, which is what
+    the storage drivers read object data from, so objects which have been
+    stored with a Content-Encoding are never decoded. If C{decompress} is
+    True, C{body} is a file-like object which decodes a gzip or deflate
+    encoded body while it's being read.
+    """
+
+    # True to request compressed responses and decode C{body}
+    decompress = False
+
+    # L{RequestMetrics} of the request if a metrics sink is used
+    metrics = None
+
+    # HTTP connection the request has been sent over. Connections are per
+    # thread, so the response can be read by a different thread than the
+    # one which made the request (e.g. when using AsyncDriver).
+    http_connection = None
 
     def __init__(self, response=None):
         self._status = None
@@ -92,8 +346,29 @@ class RawResponse(Response):
     @property
     def response(self):
         if not self._response:
-            response = self.connection.connection.getresponse()
+            http_connection = self.http_connection
+
+            if http_connection is None:
+                http_connection = self.connection.connection
+
+            response = http_connection.getresponse()
+
+            if self.metrics is not None:
+                from libcloud.common.metrics import MeteredResponse
+
+                self.metrics.ttfb = self.metrics.elapsed()
+                self.metrics.status = response.status
+                response = MeteredResponse(response, self.metrics,
+                                           self.connection.metrics_sink)
+
             self._response, self.body = response, response
+
+            if self.decompress:
+                encoding = get_content_encoding(
+                    dict(response.getheaders()))
+
+                if encoding is not None:
+                    self.body = DecompressingReader(response, encoding)
             if not self.success():
                 self.parse_error()
         return self._response
@@ -117,50 +392,187 @@ class RawResponse(Response):
         return self._reason
 
 
-#TODO: Move this to a better location/package
-class LoggingConnection():
+# Maximum number of response body bytes which are written to the debug log
+LOG_BODY_MAX_SIZE = 64 * 1024
+
+# Maximum number of log entries which are waiting to be written
+LOG_QUEUE_MAX_SIZE = 10000
+
+class BufferedLogWriter(object):
     """
-    Debug class to log all HTTP(s) requests as they could be made
-    with the C{curl} command.
+    File-like object which writes to another file-like object from a
+    background thread, so logging never blocks the requests on disk I/O.
 
-    @cvar log: file-like object that logs entries are written to.
+    The number of pending entries is bounded. If the writer can't keep up,
+    entries are dropped instead of growing the memory usage. Dropped entries
+    are counted in C{dropped} and their number is written into the log
+    before the next entry.
     """
-    log = None
 
-    def _log_response(self, r):
-        rv = "# -------- begin %d:%d response ----------\n" % (id(self), id(r))
-        ht = ""
+    def __init__(self, fo, max_queue_size=LOG_QUEUE_MAX_SIZE):
+        """
+        @type fo: C{file}
+        @param fo: File-like object the log entries are written to.
+
+        @type max_queue_size: C{int}
+        @param max_queue_size: Maximum number of pending log entries.
+        """
+        import Queue
+
+        self.fo = fo
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+        self._queue = Queue.Queue(max_queue_size)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def write(self, data):
+        import Queue
+
+        try:
+            self._queue.put_nowait(data)
+        except Queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+
+    def flush(self):
+        """
+        Block until all the pending entries have been written.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+
+            with self._lock:
+                unreported, self._unreported = self._unreported, 0
+
+            try:
+                if unreported:
+                    self.fo.write('# [%d log entries dropped]\n' %
+                                  (unreported))
+
+                self.fo.write(data)
+
+                # Flush once there is nothing else to write
+                if self._queue.empty():
+                    self.fo.flush()
+            except Exception:
+                pass
+
+            self._queue.task_done()
+
+class LoggingResponse(object):
+    """
+    Wraps a HTTP response and tees the body into the debug log while it's
+    being read by the caller.
+
+    At most C{max_body_size} bytes of the body are kept and the log entry is
+    written once the whole body has been read (or the response is closed).
+    """
+
+    def __init__(self, response, connection, max_body_size=LOG_BODY_MAX_SIZE):
+        self.response = response
+        self.connection = connection
+        self.max_body_size = max_body_size
+        self._body = []
+        self._captured = 0
+        self._size = 0
+        self._logged = False
+
+    def read(self, amt=None):
+        if amt is None:
+            data = self.response.read()
+        else:
+            data = self.response.read(amt)
+
+        self._size += len(data)
+
+        if self._captured < self.max_body_size:
+            chunk = data[:self.max_body_size - self._captured]
+            self._body.append(chunk)
+            self._captured += len(chunk)
+
+        if amt is None or not data:
+            self._log()
+
+        return data
+
+    def close(self):
+        self._log()
+        return self.response.close()
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def _log(self):
+        if self._logged:
+            return
+
+        self._logged = True
+        r = self.response
+        conn_id, response_id = id(self.connection), id(self)
+
         v = r.version
         if r.version == 10:
             v = "HTTP/1.0"
         if r.version == 11:
             v = "HTTP/1.1"
-        ht += "%s %s %s\r\n" % (v, r.status, r.reason)
-        body = r.read()
+
+        rv = ["# -------- begin %d:%d response ----------\n" %
+              (conn_id, response_id)]
+        rv.append("%s %s %s\r\n" % (v, r.status, r.reason))
+
         for h in r.getheaders():
-            ht += "%s: %s\r\n" % (h[0].title(), h[1])
-        ht += "\r\n"
-        # this is evil. laugh with me. ha arharhrhahahaha
-        class fakesock:
-            def __init__(self, s):
-                self.s = s
-            def makefile(self, mode, foo):
-                return StringIO.StringIO(self.s)
-        rr = r
-        if r.chunked:
-            ht += "%x\r\n" % (len(body))
-            ht += body
-            ht += "\r\n0\r\n"
-        else:
-            ht += body
-        rr = httplib.HTTPResponse(fakesock(ht),
-                                  method=r._method,
-                                  debuglevel=r.debuglevel)
-        rr.begin()
-        rv += ht
-        rv += ("\n# -------- end %d:%d response ----------\n"
-               % (id(self), id(r)))
-        return (rr, rv)
+            rv.append("%s: %s\r\n" % (h[0].title(), h[1]))
+
+        rv.append("\r\n")
+        rv.extend(self._body)
+        self._body = []
+
+        if self._size > self._captured:
+            rv.append("\n# [%d more bytes not logged]" %
+                      (self._size - self._captured))
+
+        rv.append("\n# -------- end %d:%d response ----------\n\n"
+                  % (conn_id, response_id))
+        self.connection._write_log("".join(rv))
+
+#TODO: Move this to a better location/package
+class LoggingConnection():
+    """
+    Debug class to log all HTTP(s) requests as they could be made
+    with the C{curl} command.
+
+    Response bodies are logged while they are being read by the caller, so
+    logging doesn't change the memory usage of (large) downloads.
+
+    @cvar log: file-like object that logs entries are written to (see
+               L{BufferedLogWriter}).
+    @cvar log_body_max_size: Maximum number of response body bytes which are
+                             logged.
+    """
+    log = None
+    log_body_max_size = LOG_BODY_MAX_SIZE
+
+    def _log_response(self, r):
+        return LoggingResponse(r, connection=self,
+                               max_body_size=self.log_body_max_size)
+
+    def _log_request(self, method, url, body, headers):
+        pre = "# -------- begin %d request ----------\n"  % id(self)
+        self._write_log(pre + self._log_curl(method, url, body, headers) +
+                        "\n")
+
+    def _write_log(self, data):
+        self.log.write(data)
+
+        if not isinstance(self.log, BufferedLogWriter):
+            self.log.flush()
 
     def _log_curl(self, method, url, body, headers):
         cmd = ["curl", "-i"]
@@ -185,18 +597,13 @@ class LoggingHTTPSConnection(LoggingConnection, LibcloudHTTPSConnection):
     def getresponse(self):
         r = LibcloudHTTPSConnection.getresponse(self)
         if self.log is not None:
-            r, rv = self._log_response(r)
-            self.log.write(rv + "\n")
-            self.log.flush()
+            r = self._log_response(r)
         return r
 
     def request(self, method, url, body=None, headers=None):
         headers.update({'X-LC-Request-ID': str(id(self))})
         if self.log is not None:
-            pre = "# -------- begin %d request ----------\n"  % id(self)
-            self.log.write(pre +
-                           self._log_curl(method, url, body, headers) + "\n")
-            self.log.flush()
+            self._log_request(method, url, body, headers)
         return LibcloudHTTPSConnection.request(self, method, url, body, headers)
 
 class LoggingHTTPConnection(LoggingConnection, LibcloudHTTPConnection):
@@ -207,36 +614,185 @@ class LoggingHTTPConnection(LoggingConnection, LibcloudHTTPConnection):
     def getresponse(self):
         r = LibcloudHTTPConnection.getresponse(self)
         if self.log is not None:
-            r, rv = self._log_response(r)
-            self.log.write(rv + "\n")
-            self.log.flush()
+            r = self._log_response(r)
         return r
 
     def request(self, method, url, body=None, headers=None):
         headers.update({'X-LC-Request-ID': str(id(self))})
         if self.log is not None:
-            pre = "# -------- begin %d request ----------\n"  % id(self)
-            self.log.write(pre +
-                           self._log_curl(method, url, body, headers) + "\n")
-            self.log.flush()
+            self._log_request(method, url, body, headers)
         return LibcloudHTTPConnection.request(self, method, url,
                                                body, headers)
 
+class ConnectionPool(object):
+    """
+    A pool of idle HTTP/1.1 keep-alive connections.
+
+    Connections are keyed by the connection class, host and port so the same
+    pool can safely be shared between different drivers and hosts.
+
+    Pooling is disabled by default. To enable it, assign an instance to
+    L{ConnectionKey.connection_pool}, either on the class (library wide) or on
+    a single connection instance (e.g. C{driver.connection}).
+    """
+
+    def __init__(self, max_size=DEFAULT_POOL_MAX_SIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        """
+        @type max_size: C{int}
+        @param max_size: Maximum number of idle connections kept per host.
+
+        @type idle_timeout: C{int}
+        @param idle_timeout: Number of seconds after which an idle connection
+                             is closed instead of being reused.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return an idle connection for the provided key or None if there are
+        no usable idle connections.
+
+        @type key: C{tuple}
+        @param key: (connection class, host, port) tuple.
+        """
+        expired = []
+        connection = None
+        now = time.time()
+
+        with self._lock:
+            idle = self._connections.get(key, [])
+
+            while idle:
+                # The most recently used connection is the last one
+                candidate, last_used = idle.pop()
+
+                if now - last_used < self.idle_timeout:
+                    connection = candidate
+                    break
+
+                # All the remaining connections are even older
+                expired.append(candidate)
+                expired.extend([item[0] for item in idle])
+                del idle[:]
+
+        for item in expired:
+            self._close_connection(item)
+
+        return connection
+
+    def put(self, key, connection):
+        """
+        Return a connection to the pool.
+
+        If there are already C{max_size} idle connections for this key, the
+        oldest one is closed.
+
+        @type key: C{tuple}
+        @param key: (connection class, host, port) tuple.
+
+        @param connection: Connection instance.
+        """
+        discarded = []
+
+        with self._lock:
+            idle = self._connections.setdefault(key, [])
+            idle.append((connection, time.time()))
+
+            while len(idle) > self.max_size:
+                discarded.append(idle.pop(0)[0])
+
+        for item in discarded:
+            self._close_connection(item)
+
+    def size(self, key):
+        """
+        Return the number of idle connections for the provided key.
+        """
+        with self._lock:
+            return len(self._connections.get(key, []))
+
+    def close(self):
+        """
+        Close all the idle connections.
+        """
+        with self._lock:
+            connections = []
+            for idle in self._connections.values():
+                connections.extend([item[0] for item in idle])
+            self._connections = {}
+
+        for connection in connections:
+            self._close_connection(connection)
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+class RequestContext(threading.local):
+    """
+    Per-thread state of the request which is currently being made by a
+    connection.
+
+    Keeping this state per thread means a single driver instance can be
+    shared between multiple threads. Each thread uses its own (or a pooled)
+    connection and signs requests using its own action and method.
+    """
+    connection = None
+    action = None
+    method = None
+
+def _context_property(name, doc):
+    def fget(self):
+        return getattr(self._get_request_context(), name)
+
+    def fset(self, value):
+        setattr(self._get_request_context(), name, value)
+
+    return property(fget, fset, doc=doc)
+
 class ConnectionKey(object):
     """
     A Base Connection class to derive from.
+
+    Connection instances are thread-safe. The underlying HTTP connection and
+    the action and method of the request which is currently being made are
+    stored per thread (see L{RequestContext}).
     """
     #conn_classes = (LoggingHTTPSConnection)
     conn_classes = (LibcloudHTTPConnection, LibcloudHTTPSConnection)
 
     responseCls = Response
     rawResponseCls = RawResponse
-    connection = None
     host = '127.0.0.1'
     port = (80, 443)
     secure = 1
     driver = None
-    action = None
+    connection_pool = None
+    rate_limiter = None
+    response_cache = None
+    metrics_sink = None
+    single_flight = None
+    circuit_breaker = None
+    # Socket timeouts in seconds (None means no timeout). read_timeout
+    # applies to every socket operation once the connection is established
+    connect_timeout = None
+    read_timeout = None
+    # Request parameters which are not included in the response cache key
+    # (e.g. parameters which change on every request)
+    cache_ignored_params = ()
+
+    connection = _context_property('connection',
+                                   'HTTP connection used by this thread.')
+    action = _context_property('action',
+                               'Action of the current request.')
+    method = _context_property('method',
+                               'HTTP method of the current request.')
 
     def __init__(self, key, secure=True, host=None, force_port=None):
         """
@@ -264,6 +820,48 @@ class ConnectionKey(object):
 
         @returns: A connection
         """
+        host, port = self._get_host_and_port(host=host, port=port)
+        kwargs = {'host': host, 'port': port}
+
+        connection = self.conn_classes[self.secure](**kwargs)
+        # You can uncoment this line, if you setup a reverse proxy server
+        # which proxies to your endpoint, and lets you easily capture
+        # connections in cleartext when you setup the proxy to do SSL
+        # for you
+        #connection = self.conn_classes[False]("127.0.0.1", 8080)
+
+        self.connection = connection
+
+    def warmup(self, host=None):
+        """
+        Resolve the API host (some providers authenticate to obtain it) and
+        establish a connection to it, so the first request doesn't have to.
+
+        The connection is put into the connection pool if pooling is
+        enabled, otherwise it's used by the next request to the host (made
+        by any thread).
+
+        @type host: C{str}
+        @param host: Optional host to override our default
+        """
+        host = host or self.host
+        self.connect(host=host)
+        connection = self.connection
+        connection.connect()
+        key = self._get_pool_key(host)
+
+        if self.connection_pool is not None:
+            self.connection_pool.put(key, connection)
+        else:
+            warm_connections = self.__dict__.setdefault('_warm_connections',
+                                                        {})
+            previous = warm_connections.pop(key, None)
+            warm_connections[key] = connection
+
+            if previous is not None:
+                previous.close()
+
+    def _get_host_and_port(self, host=None, port=None):
         host = host or self.host
 
         # port might be included in service url, so pick it if it's present
@@ -272,16 +870,89 @@ class ConnectionKey(object):
         else:
             port = port or self.port[self.secure]
 
-        kwargs = {'host': host, 'port': int(port)}
+        return host, int(port)
 
-        connection = self.conn_classes[self.secure](**kwargs)
-        # You can uncoment this line, if you setup a reverse proxy server
-        # which proxies to your endpoint, and lets you easily capture
-        # connections in cleartext when you setup the proxy to do SSL
-        # for you
-        #connection = self.conn_classes[False]("127.0.0.1", 8080)
+    def _get_pool_key(self, host):
+        host, port = self._get_host_and_port(host=host)
+        return (self.conn_classes[self.secure], host, port)
 
-        self.connection = connection
+    def _acquire_connection(self, host):
+        """
+        Point self.connection to a connection for the provided host.
+
+        If a connection pool is used and it holds an idle connection for this
+        host, the idle connection is reused, otherwise a new one is created.
+
+        @rtype: C{bool}
+        @return: True if an existing connection has been reused.
+        """
+        if self.connection_pool is not None:
+            connection = self.connection_pool.get(self._get_pool_key(host))
+        else:
+            # Connection established by warmup()
+            warm_connections = self.__dict__.get('_warm_connections', None)
+            connection = None
+
+            if warm_connections:
+                connection = warm_connections.pop(self._get_pool_key(host),
+                                                  None)
+
+        if connection is not None:
+            self.connection = connection
+            return True
+
+        self.connect(host=host)
+        return False
+
+    def _release_connection(self, host, response, connection=None):
+        """
+        Return the current (or the provided) connection to the pool (if
+        pooling is enabled) once the response body has been consumed.
+        """
+        if self.connection_pool is None:
+            return
+
+        if getattr(response, 'will_close', False):
+            # Server doesn't support keep-alive or asked us to close the
+            # connection
+            return
+
+        self.connection_pool.put(self._get_pool_key(host),
+                                 connection or self.connection)
+
+    def _close_connection(self, connection=None):
+        """
+        Close the current (or the provided) connection so it's never
+        reused.
+        """
+        try:
+            (connection or self.connection).close()
+        except Exception:
+            pass
+
+    def _discard_response(self, host, response):
+        """
+        Read the rest of a response which isn't returned to the caller and
+        release the connection.
+        """
+        try:
+            response.read()
+        except Exception:
+            self._close_connection()
+            raise
+
+        self._release_connection(host=host, response=response)
+
+    def _get_request_context(self):
+        # Lazily created since not all the subclasses call our constructor.
+        # dict.setdefault is atomic so concurrent callers get the same object
+        context = self.__dict__.get('_request_context', None)
+
+        if context is None:
+            context = self.__dict__.setdefault('_request_context',
+                                               RequestContext())
+
+        return context
 
     def _user_agent(self):
         return 'libcloud/%s (%s)%s' % (
@@ -308,7 +979,8 @@ class ConnectionKey(object):
                 headers=None,
                 method='GET',
                 raw=False,
-                host=None):
+                host=None,
+                stream=False):
         """
         Request a given `action`.
 
@@ -341,6 +1013,14 @@ class ConnectionKey(object):
         @param host: To which host to send the request. If not specified,
                      self.host is used.
 
+        @type stream: C{bool}
+        @param stream: True to return a response whose body hasn't been read
+                       yet so it can be parsed incrementally (see
+                       L{Response.__init__}). The connection is released
+                       once the body has been read to the end. If a
+                       response cache or single-flight is used, the body
+                       is read into memory before it's returned.
+
         @return: An instance of type I{responseCls}
         """
         if params is None:
@@ -348,14 +1028,61 @@ class ConnectionKey(object):
         if headers is None:
             headers = {}
 
+        single_flight = self.single_flight
+
+        if single_flight is not None and method == 'GET' and not raw:
+            # Key is built before the default (signature, timestamp, etc.)
+            # parameters are added
+            key = self._get_cache_key(host=host or self.host, action=action,
+                                      params=params)
+            key += (tuple(sorted(headers.items())), stream)
+
+            def func():
+                return self._request(action=action, params=params, data=data,
+                                     headers=headers, method=method,
+                                     host=host, stream=stream)
+
+            response, shared = single_flight.do(key, func,
+                                                timeout=self.read_timeout)
+
+            if shared:
+                response = copy_response(response)
+
+            return response
+
+        return self._request(action=action, params=params, data=data,
+                             headers=headers, method=method, raw=raw,
+                             host=host, stream=stream)
+
+    def _request(self, action, params, data, headers, method, raw=False,
+                 host=None, stream=False):
+        from libcloud.common.deadline import check_deadline
+
         self.action = action
         self.method = method
+
+        cache = self.response_cache
+        cache_key = None
+        cached_response = None
+        if cache is not None and method == 'GET' and not raw:
+            # Key is built before the default (signature, timestamp, etc.)
+            # parameters are added
+            cache_key = self._get_cache_key(host=host or self.host,
+                                            action=action, params=params)
+            # Streamed responses are not interchangeable with parsed ones
+            cache_key += (stream, )
+            cached_response = cache.get(cache_key)
+
         # Extend default parameters
         params = self.add_default_params(params)
         # Extend default headers
         headers = self.add_default_headers(headers)
         # We always send a user-agent header
         headers.update({'User-Agent': self._user_agent()})
+
+        if not raw or getattr(self.rawResponseCls, 'decompress', False):
+            self._add_accept_encoding_header(headers)
+
         host = host or self.host
         headers.update({'Host': host})
         # Encode data if necessary
@@ -365,6 +1092,9 @@ class ConnectionKey(object):
         if data is not None:
             headers.update({'Content-Length': str(len(data))})
 
+        if cached_response is not None:
+            headers.update(cache.get_conditional_headers(cached_response))
+
         params, headers = self.pre_connect_hook(params, headers)
 
         if params:
@@ -372,9 +1102,272 @@ class ConnectionKey(object):
         else:
             url = action
 
+        rate_limiter = self.rate_limiter
+        attempt = 0
+
+        metrics_sink = self.metrics_sink
+        metrics = None
+
+        if metrics_sink is not None:
+            from libcloud.common.metrics import RequestMetrics
+            from libcloud.common.metrics import MeteredResponse
+            from libcloud.common.metrics import get_driver_method
+            from libcloud.common.metrics import finish_metrics
+
+            driver_method = get_driver_method(self.driver)
+
+        circuit_breaker = self.circuit_breaker
+
+        if circuit_breaker is not None:
+            circuit_key = (self.driver.__class__, host)
+
+        while True:
+            check_deadline()
+
+            if circuit_breaker is not None:
+                try:
+                    circuit_breaker.before_request(circuit_key)
+                except CircuitOpenError, e:
+                    e.driver = self.driver
+                    raise
+
+            if rate_limiter is not None:
+                rate_limiter.wait(method=method, action=action)
+
+            if metrics_sink is not None:
+                metrics = RequestMetrics(
+                    provider=getattr(self.driver, 'name', None),
+                    driver_method=driver_method, method=method,
+                    action=action, host=host, attempt=attempt)
+                metrics.bytes_sent = len(data or '')
+
+            start = time.time()
+
+            try:
+                http_response = self._make_request(host=host, method=method,
+                                                   url=url, data=data,
+                                                   headers=headers, raw=raw,
+                                                   metrics=metrics)
+            except Exception, e:
+                if (circuit_breaker is not None and
+                    not self._is_deadline_error(e)):
+                    # Errors caused by the deadline of the caller don't say
+                    # anything about the health of the endpoint
+                    circuit_breaker.record_failure(circuit_key)
+                if metrics is not None:
+                    finish_metrics(metrics_sink, metrics, error=e)
+                raise
+
+            if circuit_breaker is not None:
+                # Raw responses are read by the caller, only the time needed
+                # to send the request is known
+                circuit_breaker.record_result(
+                    circuit_key, elapsed=time.time() - start,
+                    status=getattr(http_response, 'status', None))
+
+            if metrics is not None and not raw:
+                # Metrics are reported once the body has been read
+                metrics.ttfb = metrics.elapsed()
+                metrics.status = http_response.status
+                http_response = MeteredResponse(http_response, metrics,
+                                                metrics_sink)
+
+            if (raw or rate_limiter is None or
+                not rate_limiter.is_throttled(http_response.status) or
+                attempt >= rate_limiter.max_retries):
+                break
+
+            # Request has been throttled, back off and try again
+            self._discard_response(host=host, response=http_response)
+            rate_limiter.throttled(method=method, action=action,
+                                   attempt=attempt,
+                                   headers=dict(http_response.getheaders()))
+            attempt += 1
+
+        if raw:
+            # Connection is used until the response body has been read by
+            # the caller so it's never returned to the pool
+            response = self.rawResponseCls()
+            response.http_connection = self.connection
+
+            if metrics is not None:
+                response.metrics = metrics
+        elif (cached_response is not None and
+              http_response.status == httplib.NOT_MODIFIED):
+            # Cached response is still valid, no need to parse it again
+            self._discard_response(host=host, response=http_response)
+            response = cache.copy_response(cached_response)
+        else:
+            # Streamed responses which may be shared with other callers (by
+            # the cache or single-flight) are read into memory, so only
+            # their parsing is incremental
+            shared = (cache_key is not None or
+                      (method == 'GET' and self.single_flight is not None))
+
+            try:
+                if stream:
+                    response = self.responseCls(http_response, stream=True)
+
+                    if shared:
+                        response._buffer_body()
+                else:
+                    response = self.responseCls(http_response)
+            except Exception:
+                # Body may have been read only partially, the rest of it
+                # would be read by the next request on this connection
+                self._close_connection()
+                raise
+
+            if stream and not shared:
+                # Connection is released once the caller has read the body
+                response.body = self._get_releasing_reader(
+                    host=host, response=http_response, reader=response.body)
+            else:
+                self._release_connection(host=host, response=http_response)
+
+            if cache_key is not None:
+                cache.set(cache_key, response)
+
+        response.connection = self
+        return response
+
+    def _get_releasing_reader(self, host, response, reader):
+        """
+        Return a L{ReleasingReader} which releases the current connection
+        once the body of a streamed response has been read.
+        """
+        connection = self.connection
+
+        def release():
+            self._release_connection(host=host, response=response,
+                                     connection=connection)
+
+        def discard():
+            self._close_connection(connection=connection)
+
+        return ReleasingReader(reader, release=release, discard=discard)
+
+    def _add_accept_encoding_header(self, headers):
+        """
+        Ask for a compressed response unless the caller has already set the
+        Accept-Encoding header.
+        """
+        for key in headers.keys():
+            if key.lower() == 'accept-encoding':
+                return
+
+        headers['Accept-Encoding'] = ','.join(SUPPORTED_CONTENT_ENCODINGS)
+
+    def _get_cache_key(self, host, action, params):
+        """
+        Return the key under which the response to a GET request is cached.
+        """
+        params = [(key, value) for key, value in params.items()
+                  if key not in self.cache_ignored_params]
+        params.sort()
+        return (self.__class__, getattr(self, 'user_id', None), self.key,
+                host, action, tuple(params))
+
+    def _make_request(self, host, method, url, data, headers, raw=False,
+                      metrics=None):
+        """
+        Acquire a connection and send a request.
+
+        @type metrics: L{RequestMetrics}
+        @param metrics: If provided, connect time is recorded.
+
+        @return: httplib response for non-raw requests, None otherwise.
+        """
         # Removed terrible hack...this a less-bad hack that doesn't execute a
         # request twice, but it's still a hack.
-        self.connect(host=host)
+        reused = self._acquire_connection(host=host)
+        start = time.time()
+        self._set_timeouts(self.connection)
+
+        if metrics is not None and not reused:
+            # httplib connects lazily, connect explicitly so the connect
+            # time can be measured separately
+            if getattr(self.connection, 'sock', False) is None:
+                self.connection.connect()
+
+            metrics.connect_time = time.time() - start
+
+        try:
+            return self._send_request(method=method, url=url, data=data,
+                                      headers=headers, raw=raw)
+        except socket.timeout:
+            raise
+        except (socket.error, httplib.HTTPException):
+            if not reused:
+                raise
+
+            if not raw and method.upper() not in IDEMPOTENT_METHODS:
+                # Body has been sent, the server may have processed the
+                # request. Raw requests only send the headers here.
+                self.connection.close()
+                raise
+
+            # Pooled connection has been closed by the server while it was
+            # idle, retry once using a fresh connection.
+            self.connection.close()
+            self.connect(host=host)
+            self._set_timeouts(self.connection)
+            return self._send_request(method=method, url=url, data=data,
+                                      headers=headers, raw=raw)
+
+    def _is_deadline_error(self, error):
+        """
+        Return True if the provided error has been caused by the deadline of
+        the current call (a socket timeout which was capped by the deadline
+        is raised once the deadline has passed).
+        """
+        if isinstance(error, DeadlineExceededError):
+            return True
+
+        if not isinstance(error, socket.timeout):
+            return False
+
+        from libcloud.common.deadline import get_remaining
+
+        remaining = get_remaining()
+        return remaining is not None and remaining <= 0
+
+    def _set_timeouts(self, connection):
+        """
+        Apply connect_timeout and read_timeout (capped by the deadline of the
+        current call) to the connection. If a timeout is used, a connection
+        which is not connected yet is connected using the connect timeout.
+
+        @raise DeadlineExceededError: If the deadline has passed.
+        """
+        from libcloud.common.deadline import get_timeout
+
+        connect_timeout = get_timeout(self.connect_timeout)
+        read_timeout = get_timeout(self.read_timeout)
+
+        if (getattr(connection, 'sock', False) is None and
+            (connect_timeout is not None or read_timeout is not None)):
+            if connect_timeout is not None:
+                connection.timeout = connect_timeout
+
+            connection.connect()
+
+        sock = getattr(connection, 'sock', None)
+
+        if sock is not None:
+            # Timeout is always set, so a reused connection doesn't keep the
+            # timeout set by an earlier call which had a deadline
+            if read_timeout is None:
+                read_timeout = socket.getdefaulttimeout()
+
+            sock.settimeout(read_timeout)
+
+    def _send_request(self, method, url, data, headers, raw=False):
+        """
+        Send a request using the current connection.
+
+        @return: httplib response for non-raw requests, None otherwise.
+        """
         try:
             # @TODO: Should we just pass File object as body to request method
             # instead of dealing with splitting and sending the file ourselves?
@@ -392,12 +1385,9 @@ class ConnectionKey(object):
             raise ssl.SSLError(str(e))
 
         if raw:
-            response = self.rawResponseCls()
-        else:
-            response = self.responseCls(self.connection.getresponse())
+            return None
 
-        response.connection = self
-        return response
+        return self.connection.getresponse()
 
     def add_default_params(self, params):
         """
@@ -0,0 +1,135 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+HTTP conditional request (ETag / Last-Modified) cache.
+
+Assign a L{ResponseCache} instance to the C{response_cache} attribute of a
+connection class or a connection instance (C{driver.connection}) to enable it.
+Responses to GET requests which include an ETag or a Last-Modified header are
+cached together with the parsed body. Repeated requests are sent with the
+If-None-Match and If-Modified-Since headers and if the provider responds with
+304 Not Modified, the cached response is returned without parsing the body
+again.
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import httplib
+import threading
+
+from libcloud.common.base import copy_response
+
+__all__ = [
+    "ResponseCache"
+    ]
+
+# Maximum number of cached responses
+DEFAULT_MAX_SIZE = 100
+
+
+class ResponseCache(object):
+    """
+    Cache of the responses to idempotent (GET) requests.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        @type max_size: C{int}
+        @param max_size: Maximum number of cached responses. When the cache
+                         is full, the least recently used entry is removed.
+        """
+        self.max_size = max_size
+        self._entries = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a cached response or None.
+
+        @type key: C{tuple}
+        @param key: Cache key (see L{ConnectionKey._get_cache_key}).
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+
+            if entry is None:
+                return None
+
+            self._counter += 1
+            entry[0] = self._counter
+            return entry[1]
+
+    def set(self, key, response):
+        """
+        Cache a response if it was successful and includes a validator
+        (ETag or Last-Modified header).
+
+        @rtype: C{bool}
+        @return: True if the response has been cached.
+        """
+        if response.status != httplib.OK:
+            return False
+
+        if not self.get_conditional_headers(response):
+            return False
+
+        with self._lock:
+            self._counter += 1
+            self._entries[key] = [self._counter, response]
+
+            while len(self._entries) > self.max_size:
+                oldest = min(self._entries.items(), key=lambda item: item[1][0])
+                del self._entries[oldest[0]]
+
+        return True
+
+    def remove(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_conditional_headers(self, response):
+        """
+        Return the request headers used to revalidate a cached response.
+
+        @rtype: C{dict}
+        """
+        headers = {}
+
+        for key, value in response.headers.items():
+            key = key.lower()
+
+            if key == 'etag':
+                headers['If-None-Match'] = value
+            elif key == 'last-modified':
+                headers['If-Modified-Since'] = value
+
+        return headers
+
+    def copy_response(self, response):
+        """
+        Return a copy of a cached response which can be returned to the
+        caller. The parsed body is shared with the cached response.
+        """
+        return copy_response(response)
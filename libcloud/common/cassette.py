@@ -0,0 +1,430 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Record and replay provider HTTP exchanges.
+
+Recording (real requests are made and stored in the cassette):
+
+    cassette = Cassette('/tmp/ec2.cassette')
+    EC2Connection.conn_classes = cassette.get_connection_classes('record')
+    driver.list_nodes()
+    cassette.save()
+
+Replaying (no network access is needed):
+
+    cassette = Cassette('/tmp/ec2.cassette', latency=0.05, max_concurrency=4)
+    EC2Connection.conn_classes = cassette.get_connection_classes('replay')
+    driver.list_nodes()
+
+Requests are matched by the HTTP method, host, path, query parameters and
+request body (except for raw requests, e.g. object uploads, whose body is
+streamed). Parameters which change on every request (signatures,
+timestamps, etc., see C{Cassette.ignored_params}) are ignored. Provider
+specific parameters are taken from the C{cache_ignored_params} attribute of
+the connection class which is passed to C{get_connection_classes}:
+
+    EC2Connection.conn_classes = cassette.get_connection_classes(
+        'replay', EC2Connection)
+
+If the same request has been recorded multiple times, the recorded
+responses are replayed in order (and then again from the start).
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import time
+import gzip
+import hashlib
+import base64
+import httplib
+import urlparse
+import threading
+
+from cStringIO import StringIO
+
+try:
+    from urlparse import parse_qsl
+except ImportError:
+    # Python 2.5
+    from cgi import parse_qsl
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from libcloud.common.types import LibcloudError
+from libcloud.httplib_ssl import LibcloudHTTPSConnection
+
+__all__ = [
+    "Cassette"
+    ]
+
+# Query parameters which are not used when matching requests
+IGNORED_PARAMS = ('Signature', 'SignatureMethod', 'SignatureVersion',
+                  'Timestamp', 'Expires', 'AWSAccessKeyId', 'signature',
+                  'apiKey', 'api_key')
+
+# Response headers which are not replayed (body is stored without the
+# transfer encoding and the connection is never kept alive)
+SKIPPED_HEADERS = ('transfer-encoding', 'connection')
+
+
+class Cassette(object):
+    """
+    A set of recorded HTTP exchanges which is stored in a gzip compressed
+    file with one JSON encoded exchange per line.
+    """
+
+    ignored_params = IGNORED_PARAMS
+
+    def __init__(self, path, latency=0, latency_factor=None,
+                 max_concurrency=None):
+        """
+        @type path: C{str}
+        @param path: Path of the cassette file. Existing file is loaded.
+
+        @type latency: C{float}
+        @param latency: Replay delay (in seconds) which is added to every
+                        response.
+
+        @type latency_factor: C{float}
+        @param latency_factor: If provided, recorded duration of the request
+                               multiplied by this factor is used as the
+                               replay delay (e.g. 1 to replay at the
+                               recorded speed).
+
+        @type max_concurrency: C{int}
+        @param max_concurrency: Maximum number of requests which are being
+                                replayed at the same time (simulates
+                                provider side concurrency). Unlimited if None.
+        """
+        self.path = path
+        self.latency = latency
+        self.latency_factor = latency_factor
+        self.exchanges = []
+        self._index = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+        if max_concurrency:
+            self._semaphore = threading.Semaphore(max_concurrency)
+        else:
+            self._semaphore = None
+
+        try:
+            self.load()
+        except IOError:
+            pass
+
+    def load(self):
+        fp = gzip.open(self.path, 'rb')
+
+        try:
+            exchanges = [json.loads(line) for line in fp if line.strip()]
+        finally:
+            fp.close()
+
+        for exchange in exchanges:
+            exchange['body'] = base64.b64decode(exchange['body'])
+
+        with self._lock:
+            self.exchanges = []
+            self._index = {}
+            self._positions = {}
+
+            for exchange in exchanges:
+                self._add(exchange)
+
+    def save(self):
+        with self._lock:
+            exchanges = list(self.exchanges)
+
+        fp = gzip.open(self.path, 'wb')
+
+        try:
+            for exchange in exchanges:
+                exchange = dict(exchange)
+                exchange['body'] = base64.b64encode(exchange['body'])
+                fp.write(json.dumps(exchange) + '\n')
+        finally:
+            fp.close()
+
+    def add(self, method, host, url, status, reason, headers, body,
+            elapsed=0, request_body=None):
+        """
+        Add an exchange to the cassette.
+
+        @type headers: C{list}
+        @param headers: List of (name, value) response header tuples.
+
+        @type request_body: C{str}
+        @param request_body: Body of the request (only its hash is stored).
+
+        @rtype: C{dict}
+        @return: Added exchange.
+        """
+        exchange = {'method': method, 'host': host, 'url': url,
+                    'status': status, 'reason': reason,
+                    'headers': [list(header) for header in headers],
+                    'body': body, 'elapsed': elapsed,
+                    'request_body_hash': get_body_hash(request_body)}
+
+        with self._lock:
+            self._add(exchange)
+
+        return exchange
+
+    def find(self, method, host, url, request_body=None):
+        """
+        Return the next recorded exchange which matches the request.
+
+        @rtype: C{dict}
+        """
+        key = self._get_key(method, host, url, get_body_hash(request_body))
+
+        with self._lock:
+            matching = self._index.get(key, None)
+
+            if not matching:
+                raise LibcloudError('No recorded response for %s %s%s' %
+                                    (method, host, url))
+
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return matching[position % len(matching)]
+
+    def get_connection_classes(self, mode, connection_cls=None):
+        """
+        Return (HTTP, HTTPS) connection classes bound to this cassette which
+        can be assigned to C{ConnectionKey.conn_classes}.
+
+        @type mode: C{str}
+        @param mode: 'record' or 'replay'.
+
+        @type connection_cls: C{type}
+        @param connection_cls: Optional L{ConnectionKey} subclass. Its
+                               C{cache_ignored_params} are ignored when
+                               matching requests.
+
+        @rtype: C{tuple}
+        """
+        if connection_cls is not None:
+            self.ignore_params(connection_cls.cache_ignored_params)
+
+        if mode == 'record':
+            bases = (RecordingHTTPConnection, RecordingHTTPSConnection)
+        elif mode == 'replay':
+            bases = (ReplayHTTPConnection, ReplayHTTPConnection)
+        else:
+            raise ValueError('Invalid mode: %s' % (mode))
+
+        return tuple([type(base.__name__, (base, ), {'cassette': self})
+                      for base in bases])
+
+    def ignore_params(self, params):
+        """
+        Don't use the provided query parameters when matching requests.
+
+        @type params: C{list}
+        @param params: Parameter names.
+        """
+        with self._lock:
+            ignored_params = list(self.ignored_params)
+            ignored_params.extend([param for param in params
+                                   if param not in ignored_params])
+            self.ignored_params = tuple(ignored_params)
+
+            exchanges = self.exchanges
+            self.exchanges = []
+            self._index = {}
+            self._positions = {}
+
+            for exchange in exchanges:
+                self._add(exchange)
+
+    def _add(self, exchange):
+        key = self._get_key(exchange['method'], exchange['host'],
+                            exchange['url'],
+                            exchange.get('request_body_hash', None))
+        self.exchanges.append(exchange)
+        self._index.setdefault(key, []).append(exchange)
+
+    def _get_delay(self, exchange):
+        delay = self.latency or 0
+
+        if self.latency_factor is not None:
+            delay += exchange.get('elapsed', 0) * self.latency_factor
+
+        return delay
+
+    def _get_key(self, method, host, url, body_hash=None):
+        parsed = urlparse.urlparse(url)
+        params = [(key, value) for key, value in
+                  parse_qsl(parsed[4], keep_blank_values=True)
+                  if key not in self.ignored_params]
+        params.sort()
+        return (method.upper(), host, parsed[2], tuple(params), body_hash)
+
+
+def get_body_hash(body):
+    """
+    Return MD5 hash of a request body or None if the body is empty.
+    """
+    if not body:
+        return None
+
+    return hashlib.md5(body).hexdigest()
+
+
+class FakeSocket(object):
+    def __init__(self, data):
+        self.data = data
+
+    def makefile(self, mode, bufsize=None):
+        return StringIO(self.data)
+
+
+def build_response(exchange, method):
+    """
+    Build a C{httplib.HTTPResponse} from a recorded exchange.
+    """
+    lines = ['HTTP/1.1 %s %s' % (exchange['status'], exchange['reason'])]
+
+    for key, value in exchange['headers']:
+        key_lower = key.lower()
+
+        if key_lower in SKIPPED_HEADERS:
+            continue
+
+        # Responses to HEAD requests include the length of the resource
+        if key_lower == 'content-length' and method != 'HEAD':
+            continue
+
+        lines.append('%s: %s' % (key, value))
+
+    if method != 'HEAD':
+        lines.append('Content-Length: %d' % (len(exchange['body'])))
+
+    data = '\r\n'.join(lines) + '\r\n\r\n' + exchange['body']
+
+    response = httplib.HTTPResponse(FakeSocket(data), method=method)
+    response.begin()
+    return response
+
+
+class RecordingConnection(object):
+    """
+    Mixin which records the exchanges made using a HTTP(S) connection.
+    """
+
+    cassette = None
+    connection_cls = None
+
+    def __init__(self, *args, **kwargs):
+        self.connection_cls.__init__(self, *args, **kwargs)
+
+    def request(self, method, url, body=None, headers=None):
+        self._start_exchange(method, url, body)
+        return self.connection_cls.request(self, method, url, body,
+                                           headers or {})
+
+    def putrequest(self, method, url, *args, **kwargs):
+        # Body of a raw request is streamed and isn't used for matching
+        self._start_exchange(method, url)
+        return self.connection_cls.putrequest(self, method, url, *args,
+                                              **kwargs)
+
+    def getresponse(self):
+        response = self.connection_cls.getresponse(self)
+        body = response.read()
+        method, url, request_body, start = self._exchange
+        elapsed = time.time() - start
+
+        exchange = self.cassette.add(method=method, host=self.host, url=url,
+                                     status=response.status,
+                                     reason=response.reason,
+                                     headers=response.getheaders(),
+                                     body=body, elapsed=elapsed,
+                                     request_body=request_body)
+        return build_response(exchange, method)
+
+    def _start_exchange(self, method, url, body=None):
+        self._exchange = (method, url, body, time.time())
+
+
+class RecordingHTTPConnection(RecordingConnection, httplib.HTTPConnection):
+    connection_cls = httplib.HTTPConnection
+
+
+class RecordingHTTPSConnection(RecordingConnection, LibcloudHTTPSConnection):
+    connection_cls = LibcloudHTTPSConnection
+
+
+class ReplayHTTPConnection(object):
+    """
+    Connection which replays exchanges recorded in a cassette instead of
+    making real requests.
+    """
+
+    cassette = None
+
+    def __init__(self, host, port=None, *args, **kwargs):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self._request = None
+
+    def connect(self):
+        pass
+
+    def close(self):
+        pass
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = (method, url, body)
+
+    def putrequest(self, method, url, *args, **kwargs):
+        self._request = (method, url, None)
+
+    def putheader(self, header, *values):
+        pass
+
+    def endheaders(self, *args):
+        pass
+
+    def send(self, data):
+        pass
+
+    def getresponse(self):
+        method, url, body = self._request
+        exchange = self.cassette.find(method=method, host=self.host, url=url,
+                                      request_body=body)
+        delay = self.cassette._get_delay(exchange)
+        semaphore = self.cassette._semaphore
+
+        if semaphore is not None:
+            semaphore.acquire()
+
+        try:
+            if delay:
+                time.sleep(delay)
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        return build_response(exchange, method)
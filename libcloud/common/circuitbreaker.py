@@ -0,0 +1,208 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per endpoint circuit breaker.
+
+Assign a L{CircuitBreaker} instance to the C{circuit_breaker} attribute of a
+connection class or a connection instance (C{driver.connection}) to enable
+it:
+
+    driver.connection.circuit_breaker = CircuitBreaker()
+
+The same instance can be shared by multiple drivers, circuits are kept per
+(driver class, host).
+
+A circuit opens after C{failure_threshold} consecutive failed requests
+(connection errors, 5xx responses and, if C{slow_threshold} is set,
+responses which took longer than that). While a circuit is open, requests
+to the endpoint fail immediately with L{CircuitOpenError}. After
+C{reset_timeout} seconds the circuit becomes half-open and a limited number
+of probe requests is let through. A successful probe closes the circuit, a
+failed one opens it again.
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import time
+import threading
+
+from libcloud.common.types import CircuitOpenError
+
+__all__ = [
+    "CircuitBreaker",
+    "CLOSED",
+    "OPEN",
+    "HALF_OPEN"
+    ]
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class Circuit(object):
+    """
+    State of a single endpoint.
+    """
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.probe_started_at = None
+
+
+class CircuitBreaker(object):
+    """
+    Tracks failures per endpoint and rejects requests to the endpoints which
+    keep failing.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30,
+                 slow_threshold=None, half_open_max_calls=1,
+                 clock=time.time):
+        """
+        @type failure_threshold: C{int}
+        @param failure_threshold: Number of consecutive failures after which
+                                  the circuit opens.
+
+        @type reset_timeout: C{float}
+        @param reset_timeout: How many seconds the circuit stays open before
+                              probe requests are let through.
+
+        @type slow_threshold: C{float}
+        @param slow_threshold: If provided, requests which take longer than
+                               this many seconds (until the response headers
+                               are received) count as failures.
+
+        @type half_open_max_calls: C{int}
+        @param half_open_max_calls: Maximum number of concurrent probe
+                                    requests while the circuit is half-open.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_threshold = slow_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, key):
+        """
+        Called before a request is made.
+
+        @raise CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            circuit = self._circuits.get(key, None)
+
+            if circuit is None or circuit.state == CLOSED:
+                return
+
+            now = self.clock()
+
+            if circuit.state == OPEN:
+                retry_after = circuit.opened_at + self.reset_timeout - now
+
+                if retry_after > 0:
+                    raise CircuitOpenError('Circuit for %s is open' %
+                                           (key[1], ), host=key[1],
+                                           retry_after=retry_after)
+
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+
+            if (circuit.probes >= self.half_open_max_calls and
+                now - circuit.probe_started_at < self.reset_timeout):
+                # Wait for the probes which are in progress. Probes which
+                # never reported back are ignored after reset_timeout.
+                raise CircuitOpenError('Circuit for %s is half-open' %
+                                       (key[1], ), host=key[1],
+                                       retry_after=0)
+
+            if circuit.probes >= self.half_open_max_calls:
+                circuit.probes = 0
+
+            circuit.probes += 1
+            circuit.probe_started_at = now
+
+    def record_result(self, key, status=None, elapsed=None):
+        """
+        Record the result of a request which has received a response.
+
+        @type status: C{int}
+        @param status: HTTP status code (None for raw requests).
+
+        @type elapsed: C{float}
+        @param elapsed: Time until the response headers were received.
+        """
+        if status is not None and status >= 500:
+            self.record_failure(key)
+        elif (self.slow_threshold is not None and elapsed is not None and
+              elapsed > self.slow_threshold):
+            self.record_failure(key)
+        else:
+            self.record_success(key)
+
+    def record_success(self, key):
+        with self._lock:
+            circuit = self._circuits.get(key, None)
+
+            if circuit is not None:
+                # Circuits are only kept for failing endpoints
+                del self._circuits[key]
+
+    def record_failure(self, key):
+        with self._lock:
+            circuit = self._circuits.get(key, None)
+
+            if circuit is None:
+                circuit = self._circuits[key] = Circuit()
+
+            circuit.failures += 1
+
+            if (circuit.state == HALF_OPEN or
+                circuit.failures >= self.failure_threshold):
+                circuit.state = OPEN
+                circuit.opened_at = self.clock()
+
+    def get_state(self, key):
+        """
+        Return state of the circuit (L{CLOSED}, L{OPEN} or L{HALF_OPEN}).
+        """
+        with self._lock:
+            circuit = self._circuits.get(key, None)
+
+            if circuit is None:
+                return CLOSED
+
+            if (circuit.state == OPEN and
+                self.clock() >= circuit.opened_at + self.reset_timeout):
+                return HALF_OPEN
+
+            return circuit.state
+
+    def reset(self, key=None):
+        """
+        Close the circuit for the provided key (or all the circuits).
+        """
+        with self._lock:
+            if key is None:
+                self._circuits = {}
+            else:
+                self._circuits.pop(key, None)
@@ -13,9 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
 import hashlib
-import hmac
 import time
 import urllib
 
@@ -26,6 +24,7 @@ except:
 
 from libcloud.common.base import ConnectionUserAndKey, Response
 from libcloud.common.types import MalformedResponseError
+from libcloud.common.signing import sign
 
 class CloudStackResponse(Response):
     def parse_body(self):
@@ -52,8 +51,7 @@ class CloudStackConnection(ConnectionUserAndKey):
         signature.sort(key=lambda x: x[0])
         signature = urllib.urlencode(signature)
         signature = signature.lower().replace('+', '%20')
-        signature = hmac.new(self.key, msg=signature, digestmod=hashlib.sha1)
-        return base64.b64encode(signature.digest())
+        return sign(self.key, signature, digestmod=hashlib.sha1)
 
     def add_default_params(self, params):
         params['apiKey'] = self.user_id
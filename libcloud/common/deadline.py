@@ -0,0 +1,131 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per call deadlines.
+
+A deadline bounds the total time spent by all the requests made by the
+current thread inside the block, including the requests made by driver
+methods which send more than one request (e.g. EC2 list_nodes) and the
+authentication requests:
+
+    with Deadline(10):
+        nodes = driver.list_nodes()
+
+Socket timeouts of each request are capped by the remaining time and
+L{DeadlineExceededError} is raised if the deadline passes before a request
+is sent. Nested deadlines can only shorten the outer one.
+"""
+
+import time
+import threading
+
+from libcloud.common.types import DeadlineExceededError
+
+__all__ = [
+    "Deadline",
+    "get_remaining",
+    "get_timeout",
+    "check_deadline"
+    ]
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """
+    Context manager which sets a deadline for the current thread.
+    """
+
+    def __init__(self, seconds):
+        """
+        @type seconds: C{float}
+        @param seconds: Number of seconds from entering the block.
+        """
+        self.seconds = seconds
+        self.expires_at = None
+
+    def __enter__(self):
+        expires_at = time.time() + self.seconds
+        stack = _get_stack()
+
+        if stack:
+            expires_at = min(expires_at, stack[-1])
+
+        self.expires_at = expires_at
+        stack.append(expires_at)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _get_stack().pop()
+        return False
+
+
+def _get_stack():
+    stack = getattr(_local, 'stack', None)
+
+    if stack is None:
+        stack = _local.stack = []
+
+    return stack
+
+
+def get_remaining():
+    """
+    Return number of seconds left until the deadline of the current thread
+    or None if no deadline is set.
+
+    @rtype: C{float}
+    """
+    stack = getattr(_local, 'stack', None)
+
+    if not stack:
+        return None
+
+    return stack[-1] - time.time()
+
+
+def check_deadline():
+    """
+    @raise DeadlineExceededError: If the deadline has passed.
+    """
+    remaining = get_remaining()
+
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError()
+
+
+def get_timeout(timeout):
+    """
+    Return the provided socket timeout capped by the time left until the
+    deadline.
+
+    @type timeout: C{float}
+    @param timeout: Timeout in seconds or None for no timeout.
+
+    @raise DeadlineExceededError: If the deadline has passed.
+    """
+    remaining = get_remaining()
+
+    if remaining is None:
+        return timeout
+
+    if remaining <= 0:
+        raise DeadlineExceededError()
+
+    if timeout is None:
+        return remaining
+
+    return min(timeout, remaining)
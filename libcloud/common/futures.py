@@ -0,0 +1,470 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Asynchronous driver API.
+
+Python versions supported by libcloud don't include an event loop, so the
+asynchronous API is built on top of a bounded pool of worker threads. Every
+call returns a L{Future} right away and the underlying driver method (and as
+such, the provider specific request signing and response parsing) runs on
+one of the workers.
+
+The shared pool used by default starts at most C{DEFAULT_MAX_WORKERS} worker
+threads, calls made while all of them are busy are queued. Use
+L{set_default_max_workers} to change the limit or pass a dedicated
+L{WorkerPool} to L{AsyncDriver}.
+
+Example:
+
+    >>> from libcloud.compute.drivers.dummy import DummyNodeDriver
+    >>> from libcloud.common.futures import AsyncDriver
+    >>> driver = AsyncDriver(DummyNodeDriver(0))
+    >>> future = driver.list_nodes()
+    >>> sorted([node.name for node in future.result()])
+    ['dummy-1', 'dummy-2']
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import sys
+import Queue
+import threading
+
+from libcloud.common.types import LazyList
+from libcloud.common.metrics import DriverMethod
+
+__all__ = [
+    "Future",
+    "WorkerPool",
+    "AsyncDriver",
+    "BatchExecutor",
+    "get_default_pool",
+    "set_default_max_workers"
+    ]
+
+# Maximum number of worker threads used by the default pool
+DEFAULT_MAX_WORKERS = 20
+
+# Maximum number of concurrent batch calls per provider if the driver doesn't
+# specify its own limit (max_concurrent_requests attribute)
+DEFAULT_PROVIDER_CONCURRENCY = 10
+
+
+class Future(object):
+    """
+    Result of an asynchronous call.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._done = False
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def done(self):
+        """
+        @rtype: C{bool}
+        @return: True if the call has finished (successfully or not).
+        """
+        return self._done
+
+    def result(self, timeout=None):
+        """
+        Wait for the call to finish and return its result. If the call raised
+        an exception, the same exception is raised here.
+
+        @type timeout: C{float}
+        @param timeout: How many seconds to wait. Defaults to no limit.
+        """
+        self._wait(timeout=timeout)
+
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Wait for the call to finish and return the exception it raised or
+        None if it finished successfully.
+
+        @type timeout: C{float}
+        @param timeout: How many seconds to wait. Defaults to no limit.
+        """
+        self._wait(timeout=timeout)
+
+        if self._exc_info:
+            return self._exc_info[1]
+
+        return None
+
+    def add_done_callback(self, callback):
+        """
+        Call C{callback} with this future as the only argument when the call
+        finishes. If it has already finished, C{callback} is called right
+        away.
+        """
+        with self._condition:
+            if not self._done:
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def set_result(self, result):
+        self._finish(result=result, exc_info=None)
+
+    def set_exception_info(self, exc_info):
+        self._finish(result=None, exc_info=exc_info)
+
+    def _wait(self, timeout=None):
+        with self._condition:
+            if not self._done:
+                self._condition.wait(timeout)
+
+            if not self._done:
+                raise RuntimeError('Timed out after %s seconds' % (timeout))
+
+    def _finish(self, result, exc_info):
+        with self._condition:
+            self._result = result
+            self._exc_info = exc_info
+            self._done = True
+            self._condition.notifyAll()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+
+class WorkerPool(object):
+    """
+    A bounded pool of worker threads which execute submitted calls.
+
+    A new worker thread is started for each submitted call until there are
+    C{max_workers} of them. After that, calls are queued.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        @type max_workers: C{int}
+        @param max_workers: Maximum number of worker threads.
+        """
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule C{func(*args, **kwargs)} to be executed by a worker thread.
+
+        @rtype: L{Future}
+        """
+        future = Future()
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit calls after shutdown')
+
+            self._queue.put((future, func, args, kwargs))
+
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work)
+                worker.setDaemon(True)
+                self._workers.append(worker)
+                worker.start()
+
+        return future
+
+    def shutdown(self, wait=True):
+        """
+        Stop the worker threads once all the submitted calls have finished.
+
+        @type wait: C{bool}
+        @param wait: True to block until all the workers have exited.
+        """
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+
+        for worker in workers:
+            self._queue.put(None)
+
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            future, func, args, kwargs = item
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                future.set_exception_info(sys.exc_info())
+            else:
+                future.set_result(result)
+
+
+_default_pool = None
+_default_max_workers = DEFAULT_MAX_WORKERS
+_default_pool_lock = threading.Lock()
+
+def get_default_pool():
+    """
+    Return the shared L{WorkerPool}. It has C{DEFAULT_MAX_WORKERS} workers
+    unless changed using L{set_default_max_workers}.
+    """
+    global _default_pool
+
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WorkerPool(max_workers=_default_max_workers)
+
+    return _default_pool
+
+
+def set_default_max_workers(max_workers):
+    """
+    Set the maximum number of worker threads of the shared pool.
+
+    Workers are started lazily, so a higher limit takes effect with the next
+    submitted call. Workers which are already running are kept if the limit
+    is lowered.
+
+    @type max_workers: C{int}
+    @param max_workers: Maximum number of worker threads.
+    """
+    global _default_max_workers
+
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+
+    with _default_pool_lock:
+        _default_max_workers = max_workers
+
+        if _default_pool is not None:
+            _default_pool.max_workers = max_workers
+
+
+class AsyncDriver(object):
+    """
+    Wraps a compute, storage or load balancer driver and turns every public
+    method into a method which returns a L{Future}.
+
+    At most C{max_workers} calls of the pool run at the same time, the
+    others wait in the pool queue until a worker is free.
+
+    Non-callable attributes are passed through as they are.
+    """
+
+    def __init__(self, driver, pool=None):
+        """
+        @type driver: C{object}
+        @param driver: Driver instance (e.g. C{NodeDriver} or
+                       C{StorageDriver}).
+
+        @type pool: L{WorkerPool}
+        @param pool: Pool used to execute the calls. Defaults to the shared
+                     pool returned by L{get_default_pool}
+                     (C{DEFAULT_MAX_WORKERS} workers, see
+                     L{set_default_max_workers}).
+        """
+        self.driver = driver
+        self.pool = pool or get_default_pool()
+
+    def __getattr__(self, name):
+        value = getattr(self.driver, name)
+
+        if name.startswith('_') or not callable(value):
+            return value
+
+        def call_async(*args, **kwargs):
+            return self.pool.submit(_call_and_load, self.driver, name, value,
+                                    *args, **kwargs)
+
+        call_async.__name__ = name
+        call_async.__doc__ = value.__doc__
+        return call_async
+
+    def __repr__(self):
+        return '<AsyncDriver: driver=%r>' % (self.driver)
+
+
+class BatchExecutor(object):
+    """
+    Executes many independent driver calls concurrently.
+
+    The number of calls which run at the same time is limited per provider
+    (driver class). The limit is shared between all the batches which use the
+    same provider and the same C{max_concurrency}, so running multiple
+    batches at once doesn't overload the provider. Batches which use a
+    different C{max_concurrency} are limited separately.
+
+    >>> from libcloud.compute.drivers.dummy import DummyNodeDriver
+    >>> driver = DummyNodeDriver(0)
+    >>> batch = driver.batch()
+    >>> for node in driver.list_nodes():
+    ...     batch.add(driver.reboot_node, node)
+    >>> batch.run()
+    [True, True]
+    """
+
+    _semaphores = {}
+    _semaphores_lock = threading.Lock()
+
+    def __init__(self, driver, max_concurrency=None, pool=None):
+        """
+        @type driver: C{object}
+        @param driver: Driver instance the calls are made against.
+
+        @type max_concurrency: C{int}
+        @param max_concurrency: Maximum number of concurrent calls against
+                                this provider. Defaults to the driver's
+                                C{max_concurrent_requests} attribute or
+                                C{DEFAULT_PROVIDER_CONCURRENCY}.
+
+        @type pool: L{WorkerPool}
+        @param pool: Pool used to execute the calls. Defaults to the shared
+                     pool returned by L{get_default_pool}.
+        """
+        self.driver = driver
+        self.max_concurrency = (max_concurrency or
+                                getattr(driver, 'max_concurrent_requests',
+                                        None) or
+                                DEFAULT_PROVIDER_CONCURRENCY)
+        self.pool = pool or get_default_pool()
+        self._calls = []
+
+    def add(self, method, *args, **kwargs):
+        """
+        Add a call to the batch.
+
+        @type method: C{str} or C{callable}
+        @param method: Driver method name (e.g. 'reboot_node') or a callable.
+        """
+        if callable(method):
+            # Only the driver's own methods are attributed to it
+            name = None
+            if getattr(method, 'im_self', None) is self.driver:
+                name = method.__name__
+        else:
+            name = method
+            method = getattr(self.driver, method)
+
+        self._calls.append((name, method, args, kwargs))
+
+    def map(self, method, items):
+        """
+        Add a call to C{method} for each item in C{items} (the item is passed
+        as the only argument) and run the batch.
+
+        @rtype: C{list}
+        """
+        for item in items:
+            self.add(method, item)
+
+        return self.run()
+
+    def run(self):
+        """
+        Run all the calls which have been added to the batch and wait for
+        them to finish.
+
+        Calls are submitted to the pool only once the provider limit allows
+        them to run, so the calling thread blocks while the limit is
+        reached (it would block waiting for the results anyway) and the
+        pool threads are never blocked by it.
+
+        @rtype: C{list}
+        @return: Results in the same order the calls have been added. If a
+                 call raised an exception, the exception instance is
+                 returned in its place.
+        """
+        calls, self._calls = self._calls, []
+        semaphore = self._get_semaphore()
+        futures = []
+
+        for name, method, args, kwargs in calls:
+            # Acquire here and not in the worker so the pool threads never
+            # block waiting on a provider limit
+            semaphore.acquire()
+
+            try:
+                future = self.pool.submit(_call_and_release, semaphore,
+                                          self.driver, name, method,
+                                          *args, **kwargs)
+            except Exception:
+                semaphore.release()
+                raise
+
+            futures.append(future)
+
+        results = []
+        for future in futures:
+            error = future.exception()
+
+            if error is not None:
+                results.append(error)
+            else:
+                results.append(future.result())
+
+        return results
+
+    def _get_semaphore(self):
+        # Semaphore is never replaced, batches which are still running
+        # keep counting against the limit they have been started with
+        key = (self.driver.__class__, self.max_concurrency)
+
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(key, None)
+
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency)
+                self._semaphores[key] = semaphore
+
+        return semaphore
+
+
+def _call_and_release(semaphore, driver, name, func, *args, **kwargs):
+    try:
+        return _call_and_load(driver, name, func, *args, **kwargs)
+    finally:
+        semaphore.release()
+
+
+def _call_and_load(driver, name, func, *args, **kwargs):
+    with DriverMethod(driver, name):
+        result = func(*args, **kwargs)
+
+        if isinstance(result, LazyList):
+            # Make sure all the pages are retrieved by the worker and not
+            # lazily by the caller
+            result._load_all()
+
+    return result
@@ -24,6 +24,7 @@ except ImportError:
 from libcloud.common.types import InvalidCredsError, LibcloudError
 from libcloud.common.types import MalformedResponseError
 from libcloud.common.base import ConnectionUserAndKey, Response
+from libcloud.common.signing import get_prefixed_hash
 from libcloud.compute.base import NodeLocation
 
 HOST = 'api.gogrid.com'
@@ -73,6 +74,7 @@ class GoGridConnection(ConnectionUserAndKey):
 
     host = HOST
     responseCls = GoGridResponse
+    cache_ignored_params = ('sig',)
 
     def add_default_params(self, params):
         params["api_key"] = self.user_id
@@ -84,7 +86,8 @@ class GoGridConnection(ConnectionUserAndKey):
 
     def get_signature(self, key, secret):
         """ create sig from md5 of key + secret + time """
-        m = hashlib.md5(key+secret+str(int(time.time())))
+        m = get_prefixed_hash(key + secret, str(int(time.time())),
+                              hashfunc=hashlib.md5)
         return m.hexdigest()
 
 class GoGridIpAddress(object):
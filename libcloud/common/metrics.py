@@ -0,0 +1,344 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Request metrics.
+
+Assign a sink (an object with a C{record(metrics)} method, for example a
+L{HistogramAggregator}) to the C{metrics_sink} attribute of a connection
+class or a connection instance (C{driver.connection}). A L{RequestMetrics}
+instance is reported for every HTTP request once its response body has been
+read (or the request has failed). Object uploads are reported once the
+status of the upload response has been received.
+
+Requests made inside a L{DriverMethod} block are attributed to the outermost
+driver method which is being called by the current thread. Other requests are
+reported with a C{driver_method} of None.
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import time
+import threading
+
+__all__ = [
+    "RequestMetrics",
+    "MeteredResponse",
+    "HistogramAggregator",
+    "DriverMethod",
+    "get_driver_method",
+    "DEFAULT_BUCKETS"
+    ]
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60)
+
+_local = threading.local()
+
+
+class RequestMetrics(object):
+    """
+    Metrics of a single HTTP request.
+
+    All the times are in seconds. C{connect_time} is None if no new
+    connection has been established for the request, C{ttfb} (time to first
+    byte) is the time until the response headers have been received and
+    C{total_time} is the time until the response body has been read.
+    """
+
+    def __init__(self, provider=None, driver_method=None, method=None,
+                 action=None, host=None, attempt=0):
+        self.provider = provider
+        self.driver_method = driver_method
+        self.method = method
+        self.action = action
+        self.host = host
+        self.attempt = attempt
+        self.status = None
+        self.error = None
+        self.connect_time = None
+        self.ttfb = None
+        self.total_time = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.start_time = time.time()
+        self.reported = False
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def __repr__(self):
+        return (('<RequestMetrics: provider=%s, driver_method=%s, method=%s, '
+                 'action=%s, status=%s, ttfb=%s, total_time=%s>')
+                % (self.provider, self.driver_method, self.method,
+                   self.action, self.status, self.ttfb, self.total_time))
+
+
+def _get_calls():
+    calls = getattr(_local, 'calls', None)
+
+    if calls is None:
+        calls = _local.calls = []
+
+    return calls
+
+
+def get_driver_method(driver):
+    """
+    Return the name of the outermost C{driver} method which is being called
+    by the current thread (see L{DriverMethod}) or None.
+    """
+    for calling_driver, name in getattr(_local, 'calls', ()):
+        if calling_driver is driver:
+            return name
+
+    return None
+
+
+class DriverMethod(object):
+    """
+    Context manager which attributes the requests made by the current thread
+    inside the block to a driver method::
+
+        with DriverMethod(driver, 'list_nodes'):
+            nodes = driver.list_nodes()
+
+    Nothing is recorded unless a metrics sink is set for the driver
+    connection. Calls made using L{AsyncDriver} and L{BatchExecutor} are
+    attributed automatically.
+    """
+
+    def __init__(self, driver, name):
+        self.driver = driver
+        self.name = name
+        self._recorded = False
+
+    def __enter__(self):
+        connection = getattr(self.driver, 'connection', None)
+
+        if (self.name is not None and
+            getattr(connection, 'metrics_sink', None) is not None):
+            _get_calls().append((self.driver, self.name))
+            self._recorded = True
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._recorded:
+            _get_calls().pop()
+            self._recorded = False
+
+        return False
+
+
+class MeteredResponse(object):
+    """
+    Wraps a HTTP response, counts the received bytes and reports the metrics
+    to the sink once the whole body has been read.
+    """
+
+    def __init__(self, response, metrics, sink):
+        self.response = response
+        self.metrics = metrics
+        self.sink = sink
+
+    def read(self, amt=None):
+        if amt is None:
+            data = self.response.read()
+        else:
+            data = self.response.read(amt)
+
+        self.metrics.bytes_received += len(data)
+
+        if amt is None or not data:
+            self.finish()
+
+        return data
+
+    def finish(self, error=None):
+        """
+        Report the metrics (only the first call has an effect).
+        """
+        finish_metrics(self.sink, self.metrics, error=error)
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+def finish_metrics(sink, metrics, error=None):
+    """
+    Record the total time of a request and report its metrics to the sink.
+    Only the first call for a request has an effect.
+    """
+    if metrics.reported:
+        return
+
+    metrics.reported = True
+    metrics.total_time = metrics.elapsed()
+
+    if error is not None:
+        metrics.error = error
+
+    record_metrics(sink, metrics)
+
+
+def record_metrics(sink, metrics):
+    try:
+        sink.record(metrics)
+    except Exception:
+        # A broken sink should never break the request
+        pass
+
+
+class HistogramAggregator(object):
+    """
+    In-process metrics sink which aggregates latencies into histograms per
+    provider, driver method and HTTP method.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        @type buckets: C{tuple}
+        @param buckets: Sorted upper bounds (in seconds) of the histogram
+                        buckets. Values larger than the last bound are put
+                        into an additional overflow bucket.
+        """
+        self.buckets = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        key = (metrics.provider, metrics.driver_method, metrics.method)
+
+        with self._lock:
+            stats = self._stats.get(key, None)
+
+            if stats is None:
+                stats = self._stats[key] = {
+                    'count': 0,
+                    'errors': 0,
+                    'statuses': {},
+                    'bytes_sent': 0,
+                    'bytes_received': 0,
+                    'total_time': self._new_histogram(),
+                    'ttfb': self._new_histogram(),
+                    'connect_time': self._new_histogram()
+                }
+
+            stats['count'] += 1
+            stats['bytes_sent'] += metrics.bytes_sent
+            stats['bytes_received'] += metrics.bytes_received
+
+            if metrics.error is not None:
+                stats['errors'] += 1
+
+            if metrics.status is not None:
+                statuses = stats['statuses']
+                statuses[metrics.status] = statuses.get(metrics.status, 0) + 1
+
+            for name in ['total_time', 'ttfb', 'connect_time']:
+                value = getattr(metrics, name)
+
+                if value is not None:
+                    self._add_value(stats[name], value)
+
+    def get_stats(self):
+        """
+        Return the aggregated metrics.
+
+        @rtype: C{dict}
+        @return: Dictionary keyed by (provider, driver method, HTTP method).
+                 Latency histograms contain 'count', 'sum', 'min', 'max',
+                 'buckets' (list of (upper bound, count) tuples) and 'p50',
+                 'p90' and 'p99' estimates.
+        """
+        result = {}
+
+        with self._lock:
+            for key, stats in self._stats.items():
+                item = dict(stats)
+                item['statuses'] = dict(stats['statuses'])
+
+                for name in ['total_time', 'ttfb', 'connect_time']:
+                    item[name] = self._summarize(stats[name])
+
+                result[key] = item
+
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def _new_histogram(self):
+        return {'count': 0, 'sum': 0.0, 'min': None, 'max': None,
+                'counts': [0] * (len(self.buckets) + 1)}
+
+    def _add_value(self, histogram, value):
+        index = len(self.buckets)
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+
+        histogram['counts'][index] += 1
+        histogram['count'] += 1
+        histogram['sum'] += value
+
+        if histogram['min'] is None or value < histogram['min']:
+            histogram['min'] = value
+
+        if histogram['max'] is None or value > histogram['max']:
+            histogram['max'] = value
+
+    def _summarize(self, histogram):
+        bounds = list(self.buckets) + [None]
+        summary = {
+            'count': histogram['count'],
+            'sum': histogram['sum'],
+            'min': histogram['min'],
+            'max': histogram['max'],
+            'buckets': zip(bounds, histogram['counts'])
+        }
+
+        for name, quantile in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+            summary[name] = self._get_quantile(histogram, quantile)
+
+        return summary
+
+    def _get_quantile(self, histogram, quantile):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls into
+        (capped by the maximum recorded value).
+        """
+        if not histogram['count']:
+            return None
+
+        rank = quantile * histogram['count']
+        seen = 0
+
+        for i, count in enumerate(histogram['counts']):
+            seen += count
+
+            if seen >= rank and count:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], histogram['max'])
+
+                return histogram['max']
+
+        return histogram['max']
@@ -16,7 +16,11 @@
 """
 Common utilities for Rackspace Cloud Servers and Cloud Files
 """
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
 import httplib
+import threading
 from urllib2 import urlparse
 from libcloud.common.base import ConnectionUserAndKey
 from libcloud.compute.types import InvalidCredsError, MalformedResponseError
@@ -37,6 +41,7 @@ class RackspaceBaseConnection(ConnectionUserAndKey):
         self.storage_url = None
         self.auth_token = None
         self.__host = None
+        self._auth_lock = threading.Lock()
         super(RackspaceBaseConnection, self).__init__(
             user_id, key, secure=secure)
 
@@ -54,6 +59,16 @@ class RackspaceBaseConnection(ConnectionUserAndKey):
         # Default to server_host
         return self._get_host(url_key=self._url_key)
 
+    def _get_service_url(self, url_key):
+        """
+        Return a service URL returned by the authentication request
+        (authenticate first if needed).
+        """
+        if not self.auth_token:
+            self._populate_hosts_and_request_paths()
+
+        return getattr(self, url_key)
+
     def _get_request_path(self, url_key):
         value_key = '__request_path_%s' % (url_key)
         value = getattr(self, value_key, None)
@@ -80,51 +95,62 @@ class RackspaceBaseConnection(ConnectionUserAndKey):
         after an initial authentication request. If we haven't made that
         request yet, do it here. Otherwise, just return the management host.
         """
-        if not self.auth_token:
-            # Initial connection used for authentication
-            conn = self.conn_classes[self.secure](
-                self.auth_host, self.port[self.secure])
-            conn.request(
-                method='GET',
-                url='/%s' % (AUTH_API_VERSION),
-                headers={
-                    'X-Auth-User': self.user_id,
-                    'X-Auth-Key': self.key
-                }
-            )
-
-            resp = conn.getresponse()
-
-            if resp.status == httplib.NO_CONTENT:
-                # HTTP NO CONTENT (204): auth successful
-                headers = dict(resp.getheaders())
-
-                try:
-                    self.server_url = headers['x-server-management-url']
-                    self.storage_url = headers['x-storage-url']
-                    self.cdn_management_url = headers['x-cdn-management-url']
-                    self.lb_url = self.server_url.replace("servers", "ord.loadbalancers")
-                    self.auth_token = headers['x-auth-token']
-                except KeyError, e:
-                    # Returned 204 but has missing information in the header, something is wrong
-                    raise MalformedResponseError('Malformed response',
-                                                 body='Missing header: %s' % (str(e)),
-                                                 driver=self.driver)
-            elif resp.status == httplib.UNAUTHORIZED:
-                # HTTP UNAUTHORIZED (401): auth failed
-                raise InvalidCredsError()
-            else:
-                # Any response code != 401 or 204, something is wrong
+        with self._auth_lock:
+            # Other thread could have authenticated while we were waiting
+            if self.auth_token:
+                return
+
+            self._authenticate()
+
+    def _authenticate(self):
+        """
+        Authenticate and store the returned auth token and service URLs.
+        """
+        # Initial connection used for authentication
+        conn = self.conn_classes[self.secure](
+            self.auth_host, self.port[self.secure])
+        self._set_timeouts(conn)
+        conn.request(
+            method='GET',
+            url='/%s' % (AUTH_API_VERSION),
+            headers={
+                'X-Auth-User': self.user_id,
+                'X-Auth-Key': self.key
+            }
+        )
+
+        resp = conn.getresponse()
+
+        if resp.status == httplib.NO_CONTENT:
+            # HTTP NO CONTENT (204): auth successful
+            headers = dict(resp.getheaders())
+
+            try:
+                self.server_url = headers['x-server-management-url']
+                self.storage_url = headers['x-storage-url']
+                self.cdn_management_url = headers['x-cdn-management-url']
+                self.lb_url = self.server_url.replace("servers", "ord.loadbalancers")
+                self.auth_token = headers['x-auth-token']
+            except KeyError, e:
+                # Returned 204 but has missing information in the header, something is wrong
                 raise MalformedResponseError('Malformed response',
-                        body='code: %s body:%s' % (resp.status, ''.join(resp.body.readlines())),
-                        driver=self.driver)
-
-            for key in ['server_url', 'storage_url', 'cdn_management_url',
-                        'lb_url']:
-                scheme, server, request_path, param, query, fragment = (
-                    urlparse.urlparse(getattr(self, key)))
-                # Set host to where we want to make further requests to
-                setattr(self, '__%s' % (key), server)
-                setattr(self, '__request_path_%s' % (key), request_path)
-
-            conn.close()
+                                             body='Missing header: %s' % (str(e)),
+                                             driver=self.driver)
+        elif resp.status == httplib.UNAUTHORIZED:
+            # HTTP UNAUTHORIZED (401): auth failed
+            raise InvalidCredsError()
+        else:
+            # Any response code != 401 or 204, something is wrong
+            raise MalformedResponseError('Malformed response',
+                    body='code: %s body:%s' % (resp.status, ''.join(resp.body.readlines())),
+                    driver=self.driver)
+
+        for key in ['server_url', 'storage_url', 'cdn_management_url',
+                    'lb_url']:
+            scheme, server, request_path, param, query, fragment = (
+                urlparse.urlparse(getattr(self, key)))
+            # Set host to where we want to make further requests to
+            setattr(self, '__%s' % (key), server)
+            setattr(self, '__request_path_%s' % (key), request_path)
+
+        conn.close()
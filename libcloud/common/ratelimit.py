@@ -0,0 +1,299 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Client side request rate limiting.
+
+A L{RateLimiter} can be assigned to the C{rate_limiter} attribute of a
+connection class (provider wide) or a connection instance
+(C{driver.connection}). Requests are then scheduled so they don't exceed the
+configured rates and throttled requests are retried with exponential backoff
+and jitter.
+
+Example (Rackspace):
+
+    limits = driver.ex_limits()
+    limiter = RateLimiter.from_limits(limits['rate'],
+                                      path_prefix=driver.connection.server_url)
+    driver.connection.rate_limiter = limiter
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import re
+import time
+import random
+import httplib
+import threading
+
+__all__ = [
+    "TokenBucket",
+    "RateLimiter",
+    "UNIT_SECONDS"
+    ]
+
+UNIT_SECONDS = {
+    'SECOND': 1,
+    'MINUTE': 60,
+    'HOUR': 60 * 60,
+    'DAY': 24 * 60 * 60
+}
+
+# Status codes which indicate that the request has been throttled
+THROTTLE_STATUS_CODES = (httplib.REQUEST_ENTITY_TOO_LARGE,
+                         httplib.SERVICE_UNAVAILABLE)
+
+
+class TokenBucket(object):
+    """
+    Token bucket which refills at a constant rate.
+
+    Tokens are reserved ahead of time so concurrent callers are scheduled one
+    after another instead of all waking up at the same time.
+    """
+
+    def __init__(self, rate, capacity=None, tokens=None, clock=time.time):
+        """
+        @type rate: C{float}
+        @param rate: Number of tokens added per second.
+
+        @type capacity: C{float}
+        @param capacity: Maximum number of tokens (burst size). Defaults to
+                         one second worth of tokens, but at least 1.
+
+        @type tokens: C{float}
+        @param tokens: Number of tokens available initially. Defaults to
+                       C{capacity}.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, self.rate))
+        self.clock = clock
+
+        if tokens is None:
+            tokens = self.capacity
+
+        self._tokens = min(float(tokens), self.capacity)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Reserve tokens and return how many seconds the caller needs to wait
+        before they are available.
+
+        @rtype: C{float}
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0
+
+            return -self._tokens / self.rate
+
+    def drain(self):
+        """
+        Remove all the available tokens.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0)
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = max(0, now - self._last)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last = now
+
+
+class RateLimiter(object):
+    """
+    Schedules requests according to a set of rate limits and computes the
+    backoff delay for throttled requests.
+    """
+
+    def __init__(self, max_retries=3, backoff_base=1, backoff_max=60,
+                 throttle_status_codes=THROTTLE_STATUS_CODES,
+                 path_prefix=None):
+        """
+        @type max_retries: C{int}
+        @param max_retries: How many times a throttled request is retried.
+
+        @type backoff_base: C{float}
+        @param backoff_base: Base delay (in seconds) of the exponential
+                             backoff.
+
+        @type backoff_max: C{float}
+        @param backoff_max: Maximum backoff delay (in seconds).
+
+        @type throttle_status_codes: C{tuple}
+        @param throttle_status_codes: Response status codes which indicate
+                                      that a request has been throttled.
+
+        @type path_prefix: C{str}
+        @param path_prefix: Prefix which is removed from the request path
+                            before it's matched against the limit regular
+                            expressions.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttle_status_codes = throttle_status_codes
+        self.path_prefix = path_prefix
+        self.sleep = time.sleep
+        self._limits = []
+
+    @classmethod
+    def from_limits(cls, limits, **kwargs):
+        """
+        Create a rate limiter from a list of limit dictionaries with 'value',
+        'unit' and optional 'verb', 'regex' and 'remaining' keys (e.g. the
+        'rate' item returned by C{RackspaceNodeDriver.ex_limits()}).
+
+        @rtype: L{RateLimiter}
+        """
+        limiter = cls(**kwargs)
+
+        for limit in limits:
+            remaining = limit.get('remaining', None)
+
+            if remaining is not None:
+                remaining = int(remaining)
+
+            limiter.add_limit(value=int(limit['value']),
+                              unit=limit.get('unit', 'SECOND'),
+                              verb=limit.get('verb', None),
+                              regex=limit.get('regex', None),
+                              remaining=remaining)
+
+        return limiter
+
+    def add_limit(self, value, unit='SECOND', verb=None, regex=None,
+                  burst=None, remaining=None):
+        """
+        Add a rate limit.
+
+        @type value: C{int}
+        @param value: Number of requests allowed per C{unit}.
+
+        @type unit: C{str}
+        @param unit: SECOND, MINUTE, HOUR or DAY.
+
+        @type verb: C{str}
+        @param verb: HTTP method the limit applies to (all methods if None).
+
+        @type regex: C{str}
+        @param regex: Regular expression which is matched against the request
+                      path (all the paths if None).
+
+        @type burst: C{int}
+        @param burst: Maximum number of requests which can be made in a burst.
+                      Defaults to C{value}.
+
+        @type remaining: C{int}
+        @param remaining: Number of requests which can still be made right
+                          now (defaults to C{burst}).
+        """
+        rate = float(value) / UNIT_SECONDS[unit.upper()]
+        bucket = TokenBucket(rate=rate, capacity=burst or value,
+                             tokens=remaining)
+
+        if regex is not None:
+            regex = re.compile(regex)
+
+        if verb is not None:
+            verb = verb.upper()
+
+        self._limits.append((verb, regex, bucket))
+        return bucket
+
+    def wait(self, method, action):
+        """
+        Block until a request with the provided method and path can be made.
+
+        @rtype: C{float}
+        @return: Number of seconds waited.
+        """
+        delay = 0
+
+        for bucket in self._get_buckets(method=method, action=action):
+            delay = max(delay, bucket.reserve())
+
+        if delay > 0:
+            self.sleep(delay)
+
+        return delay
+
+    def is_throttled(self, status):
+        return status in self.throttle_status_codes
+
+    def throttled(self, method, action, attempt, headers=None):
+        """
+        Called when a request has been throttled. Drains the matching buckets
+        (so other requests slow down as well) and sleeps for the backoff
+        delay.
+
+        @type attempt: C{int}
+        @param attempt: Number of retries already made for this request.
+
+        @type headers: C{dict}
+        @param headers: Response headers.
+
+        @rtype: C{float}
+        @return: Number of seconds waited.
+        """
+        for bucket in self._get_buckets(method=method, action=action):
+            bucket.drain()
+
+        delay = self.get_backoff_delay(attempt=attempt, headers=headers)
+        self.sleep(delay)
+        return delay
+
+    def get_backoff_delay(self, attempt, headers=None):
+        """
+        Return exponential backoff delay with "full" jitter. If the provider
+        returned a Retry-After header, it's used as a lower bound.
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, delay)
+
+        retry_after = None
+        for key, value in (headers or {}).items():
+            if key.lower() == 'retry-after':
+                retry_after = value
+
+        if retry_after is not None and str(retry_after).isdigit():
+            delay = max(delay, min(self.backoff_max, int(retry_after)))
+
+        return delay
+
+    def _get_buckets(self, method, action):
+        buckets = []
+
+        if self.path_prefix and action.startswith(self.path_prefix):
+            action = action[len(self.path_prefix):]
+
+        for verb, regex, bucket in self._limits:
+            if verb is not None and verb != method.upper():
+                continue
+
+            if regex is not None and not regex.search(action):
+                continue
+
+            buckets.append(bucket)
+
+        return buckets
@@ -0,0 +1,123 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Request signing helpers shared by the drivers.
+
+Keying a HMAC object hashes the (padded) secret key, so keyed objects are
+created once per credential and digest type and then copied for every
+signature.
+"""
+
+import hmac
+import base64
+import urllib
+
+from hashlib import sha1, md5
+
+__all__ = [
+    "get_hmac",
+    "sign",
+    "get_prefixed_hash",
+    "canonical_query_string",
+    "clear_cache"
+    ]
+
+# Maximum number of cached keyed HMAC / hash objects
+MAX_CACHE_SIZE = 100
+
+_hmacs = {}
+_hashes = {}
+
+
+def get_hmac(key, digestmod=sha1):
+    """
+    Return a new HMAC object keyed with C{key}.
+
+    @rtype: C{hmac.HMAC}
+    """
+    cache_key = (key, digestmod)
+    prototype = _hmacs.get(cache_key, None)
+
+    if prototype is None:
+        if len(_hmacs) >= MAX_CACHE_SIZE:
+            _hmacs.clear()
+
+        prototype = hmac.new(key, digestmod=digestmod)
+        _hmacs[cache_key] = prototype
+
+    return prototype.copy()
+
+
+def sign(key, string_to_sign, digestmod=sha1):
+    """
+    Return base64 encoded HMAC signature of C{string_to_sign}.
+
+    @rtype: C{str}
+    """
+    signature = get_hmac(key, digestmod=digestmod)
+    signature.update(string_to_sign)
+    return base64.b64encode(signature.digest())
+
+
+def get_prefixed_hash(prefix, data, hashfunc=md5):
+    """
+    Return a hash object of C{prefix + data}. State after hashing the
+    (constant) prefix is cached.
+
+    @rtype: C{hashlib} hash object
+    """
+    cache_key = (prefix, hashfunc)
+    prototype = _hashes.get(cache_key, None)
+
+    if prototype is None:
+        if len(_hashes) >= MAX_CACHE_SIZE:
+            _hashes.clear()
+
+        prototype = hashfunc(prefix)
+        _hashes[cache_key] = prototype
+
+    result = prototype.copy()
+    result.update(data)
+    return result
+
+
+def canonical_query_string(params, safe='-_~'):
+    """
+    Return query string with parameters sorted by name and names and values
+    percent encoded (RFC 3986), as used by the AWS style signatures.
+
+    @type params: C{dict}
+    @param params: Request parameters.
+
+    @type safe: C{str}
+    @param safe: Characters which are not encoded in the values.
+
+    @rtype: C{str}
+    """
+    quote = urllib.quote
+    items = params.items()
+    items.sort()
+    return '&'.join([quote(key, safe='') + '=' + quote(value, safe=safe)
+                     for key, value in items])
+
+
+def clear_cache():
+    """
+    Remove all the cached keyed objects (e.g. after the credentials have been
+    rotated).
+    """
+    _hmacs.clear()
+    _hashes.clear()
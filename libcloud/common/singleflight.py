@@ -0,0 +1,153 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deduplication of concurrent identical requests.
+
+Assign a L{SingleFlight} instance to the C{single_flight} attribute of a
+connection class or a connection instance (C{driver.connection}) to enable
+it:
+
+    driver.connection.single_flight = SingleFlight()
+
+If a GET request is made while an identical request (same host, action,
+parameters and headers) is already in progress in another thread, the
+request is not sent. Instead, the thread waits for the request which is in
+progress and gets a copy of its response (the parsed body is shared), or
+the same exception if it has failed.
+
+The wait is bounded by the read timeout of the connection and by the
+deadline of the waiting thread (see L{libcloud.common.deadline}).
+"""
+
+# Backward compatibility for Python 2.5
+from __future__ import with_statement
+
+import sys
+import socket
+import threading
+
+from libcloud.common.deadline import check_deadline, get_timeout
+
+__all__ = [
+    "SingleFlight"
+    ]
+
+
+class Call(object):
+    """
+    A call which is in progress.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time and shares its result with the
+    callers which have asked for the same key in the meantime.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, timeout=None):
+        """
+        Call C{func} unless a call with the same key is already in progress,
+        in which case wait for it and return its result.
+
+        @type key: C{tuple}
+        @param key: Hashable key identifying the call.
+
+        @type func: C{callable}
+        @param func: Called without arguments.
+
+        @type timeout: C{float}
+        @param timeout: Maximum number of seconds to wait for a call made by
+                        other thread (capped by the deadline of the current
+                        thread) or None to wait until it finishes.
+
+        @rtype: C{tuple}
+        @return: (result, shared) tuple. C{shared} is True if the result of
+                 a call made by other thread is returned.
+
+        @raise DeadlineExceededError: If the deadline of the current thread
+                                      passes while waiting.
+        @raise socket.timeout: If the timeout passes while waiting.
+        """
+        with self._lock:
+            call = self._calls.get(key, None)
+
+            if call is None:
+                call = self._calls[key] = Call()
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if not leader:
+            self._wait(call, timeout)
+
+            if call.exc_info is not None:
+                raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.event.set()
+
+        return call.result, False
+
+    def _wait(self, call, timeout):
+        try:
+            # Raises DeadlineExceededError if the deadline has passed
+            call.event.wait(get_timeout(timeout))
+        finally:
+            if not call.event.isSet():
+                with self._lock:
+                    call.waiters -= 1
+
+        if call.event.isSet():
+            return
+
+        check_deadline()
+        raise socket.timeout('timed out waiting for an identical request')
+
+    def in_flight(self, key):
+        """
+        Return the number of callers which are waiting for a call with the
+        provided key (including the one making the call) or 0 if no such
+        call is in progress.
+        """
+        with self._lock:
+            call = self._calls.get(key, None)
+
+            if call is None:
+                return 0
+
+            return call.waiters + 1
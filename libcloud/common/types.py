@@ -18,7 +18,11 @@ __all__ = [
     "MalformedResponseError",
     "InvalidCredsError",
     "InvalidCredsException",
-    "LazyList"
+    "CircuitOpenError",
+    "DeadlineExceededError",
+    "LazyList",
+    "SlotsObject",
+    "lazy_dict_property"
     ]
 
 
@@ -71,6 +75,73 @@ class InvalidCredsError(LibcloudError):
 InvalidCredsException = InvalidCredsError
 
 
+class CircuitOpenError(LibcloudError):
+    """Exception used when a request is not made because the endpoint has
+    been failing recently (see L{libcloud.common.circuitbreaker})."""
+
+    def __init__(self, value, host=None, retry_after=None, driver=None):
+        self.value = value
+        self.host = host
+        self.retry_after = retry_after
+        self.driver = driver
+
+
+class DeadlineExceededError(LibcloudError):
+    """Exception used when the deadline of a call has passed before all of
+    its requests have completed (see L{libcloud.common.deadline})."""
+
+    def __init__(self, value='Deadline exceeded', driver=None):
+        self.value = value
+        self.driver = driver
+
+
+class SlotsObject(object):
+    """
+    Base class for the memory compact model classes (nodes, objects, etc.)
+    which store their attributes in C{__slots__}.
+
+    Subclasses which don't declare C{__slots__} get a C{__dict__} as usual.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        # Objects without a __dict__ can't be pickled using the protocols
+        # 0 and 1 by default
+        state = dict(getattr(self, '__dict__', {}))
+
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def lazy_dict_property(name, doc=None):
+    """
+    Return a property which stores a dictionary in the attribute C{name}.
+    Empty dictionary is only created when the property is first accessed.
+    """
+    def fget(self):
+        value = getattr(self, name)
+
+        if value is None:
+            value = {}
+            setattr(self, name, value)
+
+        return value
+
+    def fset(self, value):
+        setattr(self, name, value)
+
+    return property(fget, fset, doc=doc)
+
+
 class LazyList(object):
 
     def __init__(self, get_more, value_dict=None):
@@ -34,6 +34,7 @@ from libcloud.common.base import ConnectionKey, ConnectionUserAndKey
 from libcloud.httplib_ssl import LibcloudHTTPSConnection
 from libcloud.common.base import LibcloudHTTPConnection
 from libcloud.common.types import LibcloudError
+from libcloud.common.types import SlotsObject, lazy_dict_property
 
 
 # How long to wait for the node to come online after creating it
@@ -62,7 +63,7 @@ __all__ = [
     ]
 
 
-class Node(object):
+class Node(SlotsObject):
     """
     Provide a common interface for handling nodes of all types.
 
@@ -108,6 +109,9 @@ class Node(object):
 
     """
 
+    __slots__ = ('id', 'name', 'state', 'public_ip', 'private_ip', 'driver',
+                 '_uuid', '_extra')
+
     def __init__(self, id, name, state, public_ip, private_ip,
                  driver, extra=None):
         self.id = str(id) if id else None
@@ -116,8 +120,22 @@ class Node(object):
         self.public_ip = public_ip
         self.private_ip = private_ip
         self.driver = driver
-        self.uuid = self.get_uuid()
-        self.extra = extra or {}
+        self._uuid = None
+        self._extra = extra or None
+
+    extra = lazy_dict_property('_extra', 'Driver specific attributes.')
+
+    def _get_uuid(self):
+        # Computed on first access and cached
+        if self._uuid is None:
+            self._uuid = self.get_uuid()
+
+        return self._uuid
+
+    def _set_uuid(self, value):
+        self._uuid = value
+
+    uuid = property(_get_uuid, _set_uuid, doc='Unique hash of this node.')
 
     def get_uuid(self):
         """Unique hash for this node
@@ -192,7 +210,7 @@ class Node(object):
                    self.driver.name))
 
 
-class NodeSize(object):
+class NodeSize(SlotsObject):
     """
     A Base NodeSize class to derive from.
 
@@ -216,6 +234,8 @@ class NodeSize(object):
     4
     """
 
+    __slots__ = ('id', 'name', 'ram', 'disk', 'bandwidth', 'price', 'driver')
+
     def __init__(self, id, name, ram, disk, bandwidth, price, driver):
         self.id = str(id)
         self.name = name
@@ -232,7 +252,7 @@ class NodeSize(object):
                    self.price, self.driver.name))
 
 
-class NodeImage(object):
+class NodeImage(SlotsObject):
     """
     An operating system image.
 
@@ -255,18 +275,22 @@ class NodeImage(object):
 
     """
 
+    __slots__ = ('id', 'name', 'driver', '_extra')
+
     def __init__(self, id, name, driver, extra=None):
         self.id = str(id)
         self.name = name
         self.driver = driver
-        self.extra = extra or {}
+        self._extra = extra or None
+
+    extra = lazy_dict_property('_extra', 'Driver specific attributes.')
 
     def __repr__(self):
         return (('<NodeImage: id=%s, name=%s, driver=%s  ...>')
                 % (self.id, self.name, self.driver.name))
 
 
-class NodeLocation(object):
+class NodeLocation(SlotsObject):
     """
     A physical location where nodes can be.
 
@@ -277,6 +301,8 @@ class NodeLocation(object):
     'US'
     """
 
+    __slots__ = ('id', 'name', 'country', 'driver')
+
     def __init__(self, id, name, country, driver):
         self.id = str(id)
         self.name = name
@@ -348,6 +374,10 @@ class NodeDriver(object):
 
     NODE_STATE_MAP = {}
 
+    # Maximum number of concurrent calls made by a batch (None means the
+    # default from libcloud.common.futures is used)
+    max_concurrent_requests = None
+
     def __init__(self, key, secret=None, secure=True, host=None, port=None):
         """
         @keyword    key:    API key or username to used
@@ -385,7 +415,6 @@ class NodeDriver(object):
         self.connection = self.connectionCls(*args)
 
         self.connection.driver = self
-        self.connection.connect()
 
     def create_node(self, **kwargs):
         """Create a new node instance.
@@ -464,6 +493,30 @@ class NodeDriver(object):
         raise NotImplementedError(
             'list_locations not implemented for this driver')
 
+    def warmup(self):
+        """
+        Establish the connection to the provider (and authenticate if the
+        provider requires it) before the first request.
+
+        Connections are otherwise established lazily by the first request.
+        """
+        self.connection.warmup()
+
+    def batch(self, max_concurrency=None):
+        """
+        Return a L{BatchExecutor} which runs many independent calls against
+        this driver concurrently.
+
+        @type max_concurrency: C{int}
+        @param max_concurrency: Optional override for the per-provider
+                                concurrency limit.
+
+        @rtype: L{libcloud.common.futures.BatchExecutor}
+        """
+        from libcloud.common.futures import BatchExecutor
+
+        return BatchExecutor(driver=self, max_concurrency=max_concurrency)
+
     def deploy_node(self, **kwargs):
         """
         Create a new node, and start deployment.
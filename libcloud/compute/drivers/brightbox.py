@@ -18,7 +18,9 @@ Brightbox Driver
 import httplib
 import base64
 
+from libcloud.utils import iter_json_array
 from libcloud.common.base import ConnectionUserAndKey, Response
+from libcloud.common.deadline import check_deadline
 from libcloud.compute.types import Provider, NodeState, InvalidCredsError
 from libcloud.compute.base import NodeDriver
 from libcloud.compute.base import Node, NodeImage, NodeSize, NodeLocation
@@ -58,7 +60,9 @@ class BrightboxConnection(ConnectionUserAndKey):
 
         authorization = 'Basic ' + base64.encodestring('%s:%s' % (self.user_id, self.key)).rstrip()
 
+        check_deadline()
         self.connect()
+        self._set_timeouts(self.connection)
 
         response = self.connection.request(method='POST', url='/token', body=body, headers={
             'Host': self.host,
@@ -180,14 +184,19 @@ class BrightboxNodeDriver(NodeDriver):
         return response.status == httplib.ACCEPTED
 
     def list_nodes(self):
-        data = self.connection.request('/%s/servers' % API_VERSION).object
+        # Servers are decoded and converted one by one so the whole decoded
+        # response doesn't need to be kept in memory
+        response = self.connection.request('/%s/servers' % API_VERSION,
+                                           stream=True)
 
-        return map(self._to_node, data)
+        return [self._to_node(data) for data in iter_json_array(response.body)]
 
     def list_images(self):
-        data = self.connection.request('/%s/images' % API_VERSION).object
+        response = self.connection.request('/%s/images' % API_VERSION,
+                                           stream=True)
 
-        return map(self._to_image, data)
+        return [self._to_image(data)
+                for data in iter_json_array(response.body)]
 
     def list_sizes(self):
         data = self.connection.request('/%s/server_types' % API_VERSION).object
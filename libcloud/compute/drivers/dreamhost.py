@@ -86,6 +86,9 @@ class DreamhostResponse(Response):
     Response class for DreamHost PS
     """
 
+    # API errors are reported in the body
+    parse_eagerly = True
+
     def parse_body(self):
         resp = json.loads(self.body)
         if resp['result'] != 'success':
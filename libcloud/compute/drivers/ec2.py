@@ -19,18 +19,18 @@ Amazon EC2 driver
 from __future__ import with_statement
 
 import base64
-import hmac
 import os
 import time
-import urllib
 import copy
 
 from hashlib import sha256
 from xml.etree import ElementTree as ET
 
 from libcloud.utils import fixxpath, findtext, findattr, findall
+from libcloud.utils import IterParser
 from libcloud.common.base import ConnectionUserAndKey
 from libcloud.common.aws import AWSBaseResponse
+from libcloud.common.signing import sign, canonical_query_string
 from libcloud.common.types import (InvalidCredsError, MalformedResponseError,
                                    LibcloudError)
 from libcloud.compute.providers import Provider
@@ -217,20 +217,9 @@ class EC2Connection(ConnectionUserAndKey):
                        HTTPRequestURI + "\n" +
                        CanonicalizedQueryString <from the preceding step>
         """
-        keys = params.keys()
-        keys.sort()
-        pairs = []
-        for key in keys:
-            pairs.append(urllib.quote(key, safe='') + '=' +
-                         urllib.quote(params[key], safe='-_~'))
-
-        qs = '&'.join(pairs)
+        qs = canonical_query_string(params)
         string_to_sign = '\n'.join(('GET', self.host, path, qs))
-
-        b64_hmac = base64.b64encode(
-            hmac.new(secret_key, string_to_sign, digestmod=sha256).digest()
-        )
-        return b64_hmac
+        return sign(secret_key, string_to_sign, digestmod=sha256)
 
 
 class ExEC2AvailabilityZone(object):
@@ -386,10 +375,14 @@ class EC2NodeDriver(NodeDriver):
 
     def list_nodes(self):
         params = {'Action': 'DescribeInstances'}
-        elem = self.connection.request(self.path, params=params).object
+        # Reservations are parsed and converted one by one so the whole
+        # response doesn't need to be kept in memory
+        response = self.connection.request(self.path, params=params,
+                                           stream=True)
+        parser = IterParser(response.body)
         nodes = []
-        for rs in findall(element=elem, xpath='reservationSet/item',
-                          namespace=NAMESPACE):
+        for rs in parser.iterfind(xpath='reservationSet/item',
+                                  namespace=NAMESPACE):
             groups = [g.findtext('')
                       for g in findall(element=rs,
                                        xpath='groupSet/item/groupId',
@@ -421,9 +414,12 @@ class EC2NodeDriver(NodeDriver):
 
     def list_images(self, location=None):
         params = {'Action': 'DescribeImages'}
-        images = self._to_images(
-            self.connection.request(self.path, params=params).object
-        )
+        response = self.connection.request(self.path, params=params,
+                                           stream=True)
+        parser = IterParser(response.body)
+        images = [self._to_image(el)
+                  for el in parser.iterfind(xpath='imagesSet/item',
+                                            namespace=NAMESPACE)]
         return images
 
     def list_locations(self):
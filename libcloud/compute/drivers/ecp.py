@@ -127,7 +127,7 @@ class ECPNodeDriver(NodeDriver):
         """
 
         #Make the call
-        res = self.connection.request('/rest/hosting/vm/list').parse_body()
+        res = self.connection.request('/rest/hosting/vm/list').object
 
         #Put together a list of node objects
         nodes=[]
@@ -191,7 +191,7 @@ class ECPNodeDriver(NodeDriver):
                    method='POST',
                    headers=d[0],
                    data=d[1]
-        ).parse_body()
+        ).object
 
         node.state = NodeState.REBOOTING
         #Wait for it to turn off and then continue (to turn it on again)
@@ -199,7 +199,7 @@ class ECPNodeDriver(NodeDriver):
             #Check if it's off.
             response = self.connection.request(
                      '/rest/hosting/vm/%s' % node.id
-                     ).parse_body()
+                     ).object
             if response['vm']['state'] == 'off':
                 node.state = NodeState.TERMINATED
             else:
@@ -214,7 +214,7 @@ class ECPNodeDriver(NodeDriver):
             method='POST',
             headers=d[0],
             data=d[1]
-        ).parse_body()
+        ).object
 
         node.state = NodeState.RUNNING
         return True
@@ -232,7 +232,7 @@ class ECPNodeDriver(NodeDriver):
             method = 'POST',
             headers=d[0],
             data=d[1]
-        ).parse_body()
+        ).object
 
         #Ensure there was no applicationl level error
         node.state = NodeState.PENDING
@@ -241,7 +241,7 @@ class ECPNodeDriver(NodeDriver):
             #Check if it's off.
             response = self.connection.request(
                        '/rest/hosting/vm/%s' % node.id
-                       ).parse_body()
+                       ).object
             if response['vm']['state'] == 'off':
                 node.state = NodeState.TERMINATED
             else:
@@ -255,7 +255,7 @@ class ECPNodeDriver(NodeDriver):
             method='POST',
             headers=d[0],
             data=d[1]
-        ).parse_body()
+        ).object
 
         return True
 
@@ -266,7 +266,7 @@ class ECPNodeDriver(NodeDriver):
 
         #Make the call
         response = self.connection.request(
-            '/rest/hosting/ptemplate/list').parse_body()
+            '/rest/hosting/ptemplate/list').object
 
         #Turn the response into an array of NodeImage objects
         images = []
@@ -287,7 +287,7 @@ class ECPNodeDriver(NodeDriver):
 
         #Make the call
         response = self.connection.request(
-            '/rest/hosting/htemplate/list').parse_body()
+            '/rest/hosting/htemplate/list').object
 
         #Turn the response into an array of NodeSize objects
         sizes = []
@@ -323,7 +323,7 @@ class ECPNodeDriver(NodeDriver):
         """
 
         #Find out what network to put the VM on.
-        res = self.connection.request('/rest/hosting/network/list').parse_body()
+        res = self.connection.request('/rest/hosting/network/list').object
 
         #Use the first / default network because there is no way to specific
         #which one
@@ -345,7 +345,7 @@ class ECPNodeDriver(NodeDriver):
             method='PUT',
             headers = d[0],
             data=d[1]
-        ).parse_body()
+        ).object
 
         #Create a node object and return it.
         n = Node(
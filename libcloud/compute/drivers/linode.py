@@ -93,10 +93,10 @@ class LinodeResponse(Response):
 
         @keyword response: The raw response returned by urllib
         @return: parsed L{LinodeResponse}"""
-        self.body = response.read()
         self.status = response.status
         self.headers = dict(response.getheaders())
         self.error = response.reason
+        self.body = self._read_body(response)
         self.invalid = LinodeException(0xFF,
                                        "Invalid JSON received from server")
 
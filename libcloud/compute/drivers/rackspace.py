@@ -81,6 +81,7 @@ class RackspaceConnection(RackspaceBaseConnection):
     responseCls = RackspaceResponse
     auth_host = AUTH_HOST_US
     _url_key = "server_url"
+    cache_ignored_params = ('cache-busting',)
 
     def __init__(self, user_id, key, secure=True):
         super(RackspaceConnection, self).__init__(user_id, key, secure)
@@ -93,9 +94,7 @@ class RackspaceConnection(RackspaceBaseConnection):
             headers = {}
         if not params:
             params = {}
-        # Due to first-run authentication request, we may not have a path
-        if self.server_url:
-            action = self.server_url + action
+        action = self._get_service_url('server_url') + action
         if method in ("POST", "PUT"):
             headers = {'Content-Type': 'application/xml; charset=UTF-8'}
         if method == "GET":
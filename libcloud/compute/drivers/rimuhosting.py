@@ -44,10 +44,10 @@ class RimuHostingException(Exception):
 
 class RimuHostingResponse(Response):
     def __init__(self, response):
-        self.body = response.read()
         self.status = response.status
         self.headers = dict(response.getheaders())
         self.error = response.reason
+        self.body = self._read_body(response)
 
         if self.success():
             self.object = self.parse_body()
@@ -123,7 +123,6 @@ class RimuHostingNodeDriver(NodeDriver):
         self.connection.api_context = api_context
         self.connection.port = port
         self.connection.driver = self
-        self.connection.connect()
 
     def _order_uri(self, node,resource):
         # Returns the order uri with its resourse appended.
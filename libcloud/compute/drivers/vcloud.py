@@ -245,6 +245,7 @@ class VCloudConnection(ConnectionUserAndKey):
         if not self.token:
             conn = self.conn_classes[self.secure](self.host,
                                                   self.port[self.secure])
+            self._set_timeouts(conn)
             conn.request(method='POST', url='/api/v0.8/login',
                          headers=self._get_auth_headers())
 
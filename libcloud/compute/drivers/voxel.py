@@ -76,6 +76,7 @@ class VoxelConnection(ConnectionUserAndKey):
 
     host = VOXEL_API_HOST
     responseCls = VoxelResponse
+    cache_ignored_params = ('timestamp', 'api_sig')
 
     def add_default_params(self, params):
         params["key"] = self.user_id
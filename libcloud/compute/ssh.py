@@ -16,13 +16,46 @@
 """
 Wraps multiple ways to communicate over SSH
 """
-have_paramiko = False
+import imp
 
-try:
-    import paramiko
-    have_paramiko = True
-except ImportError:
-    pass
+# paramiko is slow to import, so it's imported when it's needed for the
+# first time (see get_paramiko)
+_paramiko = None
+_paramiko_checked = False
+
+def get_paramiko():
+    """
+    Import paramiko on the first call and return the module or None if it
+    can't be imported.
+    """
+    global _paramiko, _paramiko_checked
+
+    if not _paramiko_checked:
+        try:
+            import paramiko
+            _paramiko = paramiko
+        except ImportError:
+            _paramiko = None
+
+        _paramiko_checked = True
+
+    return _paramiko
+
+def _find_paramiko():
+    """
+    Return True if paramiko is installed, without importing it.
+    """
+    try:
+        module_file = imp.find_module('paramiko')[0]
+    except ImportError:
+        return False
+
+    if module_file is not None:
+        module_file.close()
+
+    return True
+
+have_paramiko = _find_paramiko()
 
 # Depending on your version of Paramiko, it may cause a deprecation
 # warning on Python 2.6.
@@ -122,6 +155,11 @@ class ParamikoSSHClient(BaseSSHClient):
                  key=None, timeout=None):
         super(ParamikoSSHClient, self).__init__(hostname, port, username,
                                                 password, key, timeout)
+        paramiko = get_paramiko()
+
+        if paramiko is None:
+            raise ImportError('paramiko is not installed')
+
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
@@ -189,6 +227,6 @@ class ShellOutSSHClient(BaseSSHClient):
     # TODO: write this one
     pass
 
+# ShellOutSSHClient is not implemented yet, so ParamikoSSHClient is always
+# used (deploy_node() checks have_paramiko before creating a client)
 SSHClient = ParamikoSSHClient
-if not have_paramiko:
-    SSHClient = ShellOutSSHClient
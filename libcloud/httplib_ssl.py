@@ -21,10 +21,84 @@ import os
 import re
 import socket
 import ssl
+import threading
 import warnings
 
 import libcloud.security
 
+# CA certificate path lookups keyed by the tuple of candidate paths
+_ca_cert_paths = {}
+
+# SSL contexts keyed by (ca_cert, key_file, cert_file)
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
+def get_ca_cert_path(paths):
+    """Return the first existing CA certificate file from paths
+
+    The lookup is cached, so the file system is only checked once per set
+    of candidate paths. Returns None if none of the files exists.
+    """
+    key = tuple(paths)
+
+    if key not in _ca_cert_paths:
+        available = [cert for cert in key if os.path.exists(cert)]
+
+        if available:
+            _ca_cert_paths[key] = available[0]
+        else:
+            _ca_cert_paths[key] = None
+
+    return _ca_cert_paths[key]
+
+def get_ssl_context(ca_cert=None, key_file=None, cert_file=None):
+    """Return a shared SSL context for the provided CA configuration
+
+    The context (and as such the parsed CA bundle) is built on first use
+    and shared by all the connections which use the same configuration.
+    Returns None on Python versions without ssl.SSLContext (< 2.7.9).
+    """
+    if not hasattr(ssl, 'SSLContext'):
+        return None
+
+    key = (ca_cert, key_file, cert_file)
+    context = _ssl_contexts.get(key, None)
+
+    if context is not None:
+        return context
+
+    _ssl_contexts_lock.acquire()
+    try:
+        context = _ssl_contexts.get(key, None)
+
+        if context is None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLSv1)
+            context.verify_mode = ssl.CERT_REQUIRED
+
+            if ca_cert:
+                context.load_verify_locations(ca_cert)
+
+            if cert_file:
+                context.load_cert_chain(cert_file, key_file)
+
+            _ssl_contexts[key] = context
+    finally:
+        _ssl_contexts_lock.release()
+
+    return context
+
+def clear_ssl_cache():
+    """Clear cached CA certificate path lookups and SSL contexts
+
+    Call this after the CA bundle has been changed on disk.
+    """
+    _ssl_contexts_lock.acquire()
+    try:
+        _ca_cert_paths.clear()
+        _ssl_contexts.clear()
+    finally:
+        _ssl_contexts_lock.release()
+
 class LibcloudHTTPSConnection(httplib.HTTPSConnection):
     """LibcloudHTTPSConnection
 
@@ -65,12 +139,10 @@ class LibcloudHTTPSConnection(httplib.HTTPSConnection):
         if not self.verify:
             return
 
-        ca_certs_available = [cert
-                              for cert in libcloud.security.CA_CERTS_PATH
-                              if os.path.exists(cert)]
-        if ca_certs_available:
+        ca_cert = get_ca_cert_path(libcloud.security.CA_CERTS_PATH)
+        if ca_cert:
             # use first available certificate
-            self.ca_cert = ca_certs_available[0]
+            self.ca_cert = ca_cert
         else:
             if self.strict:
                 raise RuntimeError(libcloud.security.CA_CERTS_UNAVAILABLE_ERROR_MSG)
@@ -97,12 +169,24 @@ class LibcloudHTTPSConnection(httplib.HTTPSConnection):
         else:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect((self.host, self.port))
-        self.sock = ssl.wrap_socket(sock,
-                                    self.key_file,
-                                    self.cert_file,
-                                    cert_reqs=ssl.CERT_REQUIRED,
-                                    ca_certs=self.ca_cert,
-                                    ssl_version=ssl.PROTOCOL_TLSv1)
+
+        context = get_ssl_context(ca_cert=self.ca_cert,
+                                  key_file=self.key_file,
+                                  cert_file=self.cert_file)
+        if context is not None:
+            # shared context, CA bundle is only loaded once
+            if getattr(ssl, 'HAS_SNI', False):
+                self.sock = context.wrap_socket(sock,
+                                                server_hostname=self.host)
+            else:
+                self.sock = context.wrap_socket(sock)
+        else:
+            self.sock = ssl.wrap_socket(sock,
+                                        self.key_file,
+                                        self.cert_file,
+                                        cert_reqs=ssl.CERT_REQUIRED,
+                                        ca_certs=self.ca_cert,
+                                        ssl_version=ssl.PROTOCOL_TLSv1)
         cert = self.sock.getpeercert()
         if not self._verify_hostname(self.host, cert):
             raise ssl.SSLError('Failed to verify hostname')
@@ -14,7 +14,7 @@
 # limitations under the License.
 
 from libcloud.common.base import ConnectionKey
-from libcloud.common.types import LibcloudError
+from libcloud.common.types import LibcloudError, SlotsObject
 
 __all__ = [
         "Member",
@@ -23,7 +23,9 @@ __all__ = [
         "Algorithm"
         ]
 
-class Member(object):
+class Member(SlotsObject):
+
+    __slots__ = ('id', 'ip', 'port')
 
     def __init__(self, id, ip, port):
         self.id = str(id) if id else None
@@ -41,11 +43,13 @@ class Algorithm(object):
 
 DEFAULT_ALGORITHM = Algorithm.ROUND_ROBIN
 
-class LoadBalancer(object):
+class LoadBalancer(SlotsObject):
     """
     Provide a common interface for handling Load Balancers.
     """
 
+    __slots__ = ('id', 'name', 'state', 'ip', 'port', 'driver')
+
     def __init__(self, id, name, state, ip, port, driver):
         self.id = str(id) if id else None
         self.name = name
@@ -83,6 +87,10 @@ class Driver(object):
     _ALGORITHM_TO_VALUE_MAP = {}
     _VALUE_TO_ALGORITHM_MAP = {}
 
+    # Maximum number of concurrent calls made by a batch (None means the
+    # default from libcloud.common.futures is used)
+    max_concurrent_requests = None
+
     def __init__(self, key, secret=None, secure=True, host=None, port=None):
         self.key = key
         self.secret = secret
@@ -101,7 +109,6 @@ class Driver(object):
 
         self.connection = self.connectionCls(*args)
         self.connection.driver = self
-        self.connection.connect()
 
     def list_protocols(self):
         """
@@ -211,6 +218,30 @@ class Driver(object):
         raise NotImplementedError, \
                 'balancer_list_members not implemented for this driver'
 
+    def warmup(self):
+        """
+        Establish the connection to the provider (and authenticate if the
+        provider requires it) before the first request.
+
+        Connections are otherwise established lazily by the first request.
+        """
+        self.connection.warmup()
+
+    def batch(self, max_concurrency=None):
+        """
+        Return a L{BatchExecutor} which runs many independent calls against
+        this driver concurrently.
+
+        @type max_concurrency: C{int}
+        @param max_concurrency: Optional override for the per-provider
+                                concurrency limit.
+
+        @rtype: L{libcloud.common.futures.BatchExecutor}
+        """
+        from libcloud.common.futures import BatchExecutor
+
+        return BatchExecutor(driver=self, max_concurrency=max_concurrency)
+
     def _value_to_algorithm(self, value):
         """
         Return C{LBAlgorithm} based on the value.
@@ -20,6 +20,9 @@ from libcloud.loadbalancer.base import DEFAULT_ALGORITHM
 from libcloud.loadbalancer.types import State, LibcloudLBImmutableError
 from libcloud.utils import reverse_dict
 
+class CloudStackLoadBalancer(LoadBalancer):
+    "Subclass of LoadBalancer so we can store our extension attributes."
+
 class CloudStackLBDriver(CloudStackDriverMixIn, Driver):
     """Driver for CloudStack load balancers."""
 
@@ -103,7 +106,7 @@ class CloudStackLBDriver(CloudStackDriverMixIn, Driver):
         return [self._to_member(m, balancer.ex_private_port) for m in members]
 
     def _to_balancer(self, obj):
-        balancer = LoadBalancer(
+        balancer = CloudStackLoadBalancer(
             id=obj['id'],
             name=obj['name'],
             state=self.LB_STATE_MAP.get(obj['state'], State.UNKNOWN),
@@ -45,6 +45,7 @@ class RackspaceConnection(RackspaceBaseConnection):
     responseCls = RackspaceResponse
     auth_host = AUTH_HOST_US
     _url_key = "lb_url"
+    cache_ignored_params = ('cache-busing',)
 
     def __init__(self, user_id, key, secure=True):
         super(RackspaceConnection, self).__init__(user_id, key, secure)
@@ -56,8 +57,7 @@ class RackspaceConnection(RackspaceBaseConnection):
             headers = {}
         if not params:
             params = {}
-        if self.lb_url:
-            action = self.lb_url + action
+        action = self._get_service_url('lb_url') + action
         if method in ('POST', 'PUT'):
             headers['Content-Type'] = 'application/json'
         if method == 'GET':
@@ -17,11 +17,6 @@ from __future__ import with_statement
 A class which handles loading the pricing files.
 """
 
-try:
-    import json
-except:
-    import simplejson as json
-
 import os.path
 from os.path import join as pjoin
 
@@ -66,6 +61,11 @@ def get_pricing(driver_type, driver_name, pricing_file_path=None):
     with open(pricing_file_path) as fp:
         content = fp.read()
 
+    try:
+        import json
+    except ImportError:
+        import simplejson as json
+
     pricing_data = json.loads(content)
     size_pricing = pricing_data[driver_type][driver_name]
 
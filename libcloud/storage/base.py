@@ -20,23 +20,65 @@ Provides base classes for working with storage
 # Backward compatibility for Python 2.5
 from __future__ import with_statement
 
+import os
+import re
+import mmap
+import time
 import httplib
 import os.path                          # pylint: disable-msg=W0404
 import hashlib
 from os.path import join as pjoin
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 from libcloud import utils
 from libcloud.common.types import LibcloudError
+from libcloud.common.types import SlotsObject, lazy_dict_property
 from libcloud.common.base import ConnectionUserAndKey
+from libcloud.common.metrics import finish_metrics
+from libcloud.common.deadline import Deadline, get_remaining
 from libcloud.storage.types import ObjectDoesNotExistError
+from libcloud.storage.types import ObjectHashMismatchError
+
+# Default size of the chunks in which objects are read and written
+CHUNK_SIZE = utils.CHUNK_SIZE
+
+# Size of a single byte range used by parallel downloads
+PARALLEL_DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Number of byte ranges which are downloaded at once
+PARALLEL_DOWNLOAD_MAX_CONCURRENCY = 4
 
-CHUNK_SIZE = 8096
+# Suffix of the file which holds the state of a resumable download
+DOWNLOAD_STATE_SUFFIX = '.download-state'
 
-class Object(object):
+MD5_HASH_RE = re.compile('^[0-9a-f]{32}$')
+
+
+def get_range_header(start, end=None):
+    """
+    Return value of the Range header for the provided byte range.
+
+    @type end: C{int}
+    @param end: Offset of the last byte (inclusive) or None for the rest of
+                the object.
+    """
+    if end is None:
+        return 'bytes=%d-' % (start)
+
+    return 'bytes=%d-%d' % (start, end)
+
+class Object(SlotsObject):
     """
     Represents an object (BLOB).
     """
 
+    __slots__ = ('name', 'size', 'hash', 'container', 'driver', '_extra',
+                 '_meta_data')
+
     def __init__(self, name, size, hash, extra, meta_data, container,
                  driver):
         """
@@ -66,10 +108,13 @@ class Object(object):
         self.size = size
         self.hash = hash
         self.container = container
-        self.extra = extra or {}
-        self.meta_data = meta_data or {}
+        self._extra = extra or None
+        self._meta_data = meta_data or None
         self.driver = driver
 
+    extra = lazy_dict_property('_extra', 'Extra attributes.')
+    meta_data = lazy_dict_property('_meta_data', 'Object meta data.')
+
     def get_cdn_url(self):
         return self.driver.get_object_cdn_url(obj=self)
 
@@ -92,11 +137,13 @@ class Object(object):
         return ('<Object: name=%s, size=%s, hash=%s, provider=%s ...>' %
                 (self.name, self.size, self.hash, self.driver.name))
 
-class Container(object):
+class Container(SlotsObject):
     """
     Represents a container (bucket) which can hold multiple objects.
     """
 
+    __slots__ = ('name', 'driver', '_extra')
+
     def __init__(self, name, extra, driver):
         """
         @type name: C{str}
@@ -110,9 +157,11 @@ class Container(object):
         """
 
         self.name = name
-        self.extra = extra or {}
+        self._extra = extra or None
         self.driver = driver
 
+    extra = lazy_dict_property('_extra', 'Extra attributes.')
+
     def list_objects(self):
         return self.driver.list_container_objects(container=self)
 
@@ -160,6 +209,28 @@ class StorageDriver(object):
     name = None
     hash_type = 'md5'
 
+    # Maximum number of concurrent calls made by a batch (None means the
+    # default from libcloud.common.futures is used)
+    max_concurrent_requests = None
+
+    # Size (in bytes) of the chunks in which objects are read from responses
+    # and files and written to files and connections
+    chunk_size = CHUNK_SIZE
+
+    # Objects of this size (in bytes) or larger are downloaded by
+    # download_object() in byte ranges which are fetched concurrently. Only
+    # used by the drivers which implement _get_range_response (None disables
+    # parallel downloads)
+    parallel_download_threshold = None
+    parallel_download_chunk_size = PARALLEL_DOWNLOAD_CHUNK_SIZE
+    parallel_download_max_concurrency = PARALLEL_DOWNLOAD_MAX_CONCURRENCY
+
+    # If True, download_object() keeps partially downloaded files (with a
+    # small state file next to them) and the next call resumes the download
+    # where it has stopped. Only used by the drivers which implement
+    # _get_range_response
+    resumable_downloads = False
+
     def __init__(self, key, secret=None, secure=True, host=None, port=None):
         self.key = key
         self.secret = secret
@@ -180,7 +251,6 @@ class StorageDriver(object):
         self.connection = self.connectionCls(*args)
 
         self.connection.driver = self
-        self.connection.connect()
 
     def list_containters(self):
         """
@@ -379,6 +449,30 @@ class StorageDriver(object):
         raise NotImplementedError(
             'delete_container not implemented for this driver')
 
+    def warmup(self):
+        """
+        Establish the connection to the provider (and authenticate if the
+        provider requires it) before the first request.
+
+        Connections are otherwise established lazily by the first request.
+        """
+        self.connection.warmup()
+
+    def batch(self, max_concurrency=None):
+        """
+        Return a L{BatchExecutor} which runs many independent calls against
+        this driver concurrently.
+
+        @type max_concurrency: C{int}
+        @param max_concurrency: Optional override for the per-provider
+                                concurrency limit.
+
+        @rtype: L{libcloud.common.futures.BatchExecutor}
+        """
+        from libcloud.common.futures import BatchExecutor
+
+        return BatchExecutor(driver=self, max_concurrency=max_concurrency)
+
     def _get_object(self, obj, callback, callback_kwargs, response,
                     success_status_code=None):
         """
@@ -438,14 +532,59 @@ class StorageDriver(object):
                                    exists.
 
         @type chunk_size: C{int}
-        @param chunk_size: Optional chunk size (defaults to L{libcloud.storage.base.CHUNK_SIZE}, 8kb)
+        @param chunk_size: Optional chunk size (defaults to the driver
+                           chunk_size attribute)
 
         @rtype: C{bool}
         @return: True on success, False otherwise.
         """
 
-        chunk_size = chunk_size or CHUNK_SIZE
+        chunk_size = chunk_size or self.chunk_size
+        file_path = self._get_file_path(obj=obj,
+                                        destination_path=destination_path,
+                                        overwrite_existing=overwrite_existing)
+
+        stream = utils.read_in_chunks(response, chunk_size)
+
+        try:
+            data_read = stream.next()
+        except StopIteration:
+            # Empty response?
+            return False
+
+        bytes_transferred = 0
+
+        with open(file_path, 'wb') as file_handle:
+            while len(data_read) > 0:
+                file_handle.write(data_read)
+                bytes_transferred += len(data_read)
+
+                try:
+                    data_read = stream.next()
+                except StopIteration:
+                    data_read = ''
+
+        if int(obj.size) != int(bytes_transferred):
+            # Transfer failed, support retry?
+            if delete_on_failure:
+                try:
+                    os.unlink(file_path)
+                except Exception:
+                    pass
+
+            return False
 
+        return True
+
+    def _get_file_path(self, obj, destination_path, overwrite_existing=False):
+        """
+        Return path of the file an object is saved to.
+
+        @type destination_path: C{str}
+        @param destination_path: Full path to a file or a directory (in which
+                                 case the object name is used as the file
+                                 name).
+        """
         base_name = os.path.basename(destination_path)
 
         if not base_name and not os.path.exists(destination_path):
@@ -464,38 +603,368 @@ class StorageDriver(object):
                 'overwrite_existing=False',
                 driver=self)
 
-        stream = utils.read_in_chunks(response, chunk_size)
+        return file_path
 
-        try:
-            data_read = stream.next()
-        except StopIteration:
-            # Empty response?
+    def _use_parallel_download(self, obj):
+        """
+        Return True if the object should be downloaded in parallel byte
+        ranges.
+        """
+        if self.parallel_download_threshold is None or obj.size is None:
             return False
 
-        bytes_transferred = 0
+        return int(obj.size) >= self.parallel_download_threshold
+
+    def _use_ranged_download(self, obj):
+        """
+        Return True if the object should be downloaded using range requests
+        (see L{_download_object_ranged}).
+        """
+        if obj.size is None:
+            return False
+
+        return self.resumable_downloads or self._use_parallel_download(obj)
+
+    def _download_object_ranged(self, obj, destination_path,
+                                overwrite_existing=False,
+                                delete_on_failure=True):
+        """
+        Download an object in parallel byte ranges or as a resumable
+        download, depending on the driver settings.
+        """
+        if self._use_parallel_download(obj):
+            return self._download_object_parallel(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure)
+
+        return self._download_object_resumable(
+            obj=obj, destination_path=destination_path,
+            overwrite_existing=overwrite_existing,
+            delete_on_failure=delete_on_failure)
+
+    def _get_range_response(self, obj, start, end=None, if_range=None):
+        """
+        Send a GET request for a byte range of the object.
+
+        Drivers which support the Range header implement this method.
+
+        @type start: C{int}
+        @param start: Offset of the first byte.
+
+        @type end: C{int}
+        @param end: Offset of the last byte (inclusive) or None for the rest
+                    of the object.
+
+        @type if_range: C{str}
+        @param if_range: Optional object hash. If the provider supports the
+                         If-Range header and the object has changed, the whole
+                         object is returned (with status 200).
+
+        @rtype: C{RawResponse}
+        """
+        raise NotImplementedError(
+            '_get_range_response not implemented for this driver')
+
+    def _download_object_parallel(self, obj, destination_path,
+                                  overwrite_existing=False,
+                                  delete_on_failure=True):
+        """
+        Download an object in byte ranges which are fetched concurrently and
+        written at their offsets into a preallocated file. If the object hash
+        is an MD5 hash, the downloaded file is verified against it.
+
+        @rtype: C{bool}
+        @return: True on success, False otherwise.
+        """
+        file_path = self._get_file_path(obj=obj,
+                                        destination_path=destination_path,
+                                        overwrite_existing=overwrite_existing)
+        size = int(obj.size)
+        chunk_size = self.parallel_download_chunk_size
 
         with open(file_path, 'wb') as file_handle:
-            while len(data_read) > 0:
-                file_handle.write(data_read)
-                bytes_transferred += len(data_read)
+            file_handle.truncate(size)
 
-                try:
-                    data_read = stream.next()
-                except StopIteration:
-                    data_read = ''
+        # Deadline of the caller (if any) applies to the workers as well
+        expires_at = None
+        remaining = get_remaining()
 
-        if int(obj.size) != int(bytes_transferred):
-            # Transfer failed, support retry?
+        if remaining is not None:
+            expires_at = time.time() + remaining
+
+        from libcloud.common.futures import WorkerPool
+
+        pool = WorkerPool(max_workers=self.parallel_download_max_concurrency)
+        futures = []
+
+        try:
+            for start in xrange(0, size, chunk_size):
+                end = min(start + chunk_size, size) - 1
+                futures.append(pool.submit(self._download_range, obj=obj,
+                                           file_path=file_path, start=start,
+                                           end=end, expires_at=expires_at))
+        finally:
+            # Wait for all the ranges, so the file is never deleted while a
+            # range is being written into it
+            for future in futures:
+                future.exception()
+
+            pool.shutdown(wait=False)
+
+        try:
+            for future in futures:
+                # Raises the exception of the first failed range
+                future.result()
+
+            self._verify_file_hash(obj=obj, file_path=file_path)
+        except Exception:
             if delete_on_failure:
                 try:
                     os.unlink(file_path)
                 except Exception:
                     pass
 
+            raise
+
+        return True
+
+    def _download_range(self, obj, file_path, start, end, expires_at=None):
+        """
+        Download a byte range of the object and write it at its offset into
+        the file.
+
+        @type expires_at: C{float}
+        @param expires_at: Time (as returned by C{time.time()}) at which the
+                           deadline of the download expires or None.
+        """
+        if expires_at is not None:
+            with Deadline(expires_at - time.time()):
+                return self._download_range(obj=obj, file_path=file_path,
+                                            start=start, end=end)
+
+        response = self._get_range_response(obj=obj, start=start, end=end)
+        http_response = response.response
+        bytes_transferred = 0
+
+        try:
+            if response.status != httplib.PARTIAL_CONTENT:
+                # E.g. the whole object if the provider ignores the Range
+                # header
+                raise LibcloudError(value='Unexpected status code: %s' %
+                                          (response.status),
+                                    driver=self)
+
+            with open(file_path, 'r+b') as file_handle:
+                file_handle.seek(start)
+
+                for chunk in utils.read_in_chunks(http_response,
+                                                  self.chunk_size):
+                    file_handle.write(chunk)
+                    bytes_transferred += len(chunk)
+        finally:
+            self._close_response(http_response)
+
+        if bytes_transferred != end - start + 1:
+            raise LibcloudError(value='Byte range %s-%s of object %s is '
+                                      'incomplete' % (start, end, obj.name),
+                                driver=self)
+
+        return bytes_transferred
+
+    def _download_object_resumable(self, obj, destination_path,
+                                   overwrite_existing=False,
+                                   delete_on_failure=True):
+        """
+        Download an object into a file which is kept if the download fails,
+        together with a state file which records the object hash and size.
+        If the state matches the object, the next call requests only the
+        remaining bytes (Range: bytes=N-). If the object has changed in the
+        meantime, the download starts again from the beginning.
+
+        @type delete_on_failure: C{bool}
+        @param delete_on_failure: True to delete the downloaded file if its
+                                  hash doesn't match. Partially downloaded
+                                  files are always kept.
+
+        @rtype: C{bool}
+        @return: True on success, False if the download is incomplete (it can
+                 be resumed by calling download_object() again).
+        """
+        file_path = self._get_file_path(obj=obj,
+                                        destination_path=destination_path,
+                                        overwrite_existing=True)
+        state_path = file_path + DOWNLOAD_STATE_SUFFIX
+        size = int(obj.size)
+        offset = self._get_resume_offset(obj=obj, file_path=file_path,
+                                         state_path=state_path)
+
+        if offset is None:
+            if self._read_download_state(state_path=state_path) is not None:
+                # Partial file of a previous download (the object has
+                # changed since) has been created by us, it's replaced
+                self._remove_files([file_path, state_path])
+
+            # New download, raises if the file exists and overwriting is
+            # not allowed
+            self._get_file_path(obj=obj, destination_path=destination_path,
+                                overwrite_existing=overwrite_existing)
+            self._write_download_state(obj=obj, state_path=state_path)
+            open(file_path, 'wb').close()
+            offset = 0
+
+        if offset < size:
+            offset = self._download_remaining(obj=obj, file_path=file_path,
+                                              offset=offset)
+
+        if offset != size:
+            # Keep the partial file for the next attempt
             return False
 
+        try:
+            self._verify_file_hash(obj=obj, file_path=file_path)
+        except ObjectHashMismatchError:
+            self._remove_files([state_path])
+
+            if delete_on_failure:
+                self._remove_files([file_path])
+
+            raise
+
+        self._remove_files([state_path])
         return True
 
+    def _download_remaining(self, obj, file_path, offset):
+        """
+        Request the object data starting at the provided offset and append it
+        to the file.
+
+        @rtype: C{int}
+        @return: Size of the file.
+        """
+        response = self._get_range_response(obj=obj, start=offset,
+                                            if_range=obj.hash)
+        http_response = response.response
+
+        try:
+            if response.status == httplib.OK:
+                # Object has changed or the provider has ignored the Range
+                # header, the whole object is returned
+                offset = 0
+            elif response.status == httplib.PARTIAL_CONTENT:
+                etag = (response.headers or {}).get('etag', None)
+
+                if etag and obj.hash and etag.replace('"', '') != obj.hash:
+                    # Partial file and its state are stale, the next call
+                    # starts again from the beginning
+                    self._remove_files([file_path,
+                                        file_path + DOWNLOAD_STATE_SUFFIX])
+                    raise LibcloudError(value='Object %s has changed since '
+                                              % (obj.name) +
+                                              'the download has started',
+                                        driver=self)
+            elif response.status == httplib.NOT_FOUND:
+                raise ObjectDoesNotExistError(object_name=obj.name,
+                                              value='', driver=self)
+            else:
+                raise LibcloudError(value='Unexpected status code: %s' %
+                                          (response.status),
+                                    driver=self)
+
+            with open(file_path, 'r+b') as file_handle:
+                file_handle.seek(offset)
+                file_handle.truncate()
+
+                for chunk in utils.read_in_chunks(http_response,
+                                                  self.chunk_size):
+                    file_handle.write(chunk)
+                    offset += len(chunk)
+        finally:
+            # Body of a response which is not read to the end must never be
+            # left on the connection
+            self._close_response(http_response)
+
+        return offset
+
+    def _get_resume_offset(self, obj, file_path, state_path):
+        """
+        Return the offset a download can be resumed from or None if there is
+        no partially downloaded file of this object.
+        """
+        state = self._read_download_state(state_path=state_path)
+
+        if (state is None or not os.path.exists(file_path) or
+            state.get('name') != obj.name or
+            state.get('hash') != obj.hash or
+            state.get('size') != int(obj.size)):
+            return None
+
+        offset = os.path.getsize(file_path)
+
+        if offset > int(obj.size):
+            return None
+
+        return offset
+
+    def _read_download_state(self, state_path):
+        if not os.path.exists(state_path):
+            return None
+
+        try:
+            with open(state_path, 'rb') as file_handle:
+                return json.loads(file_handle.read())
+        except (IOError, ValueError):
+            return None
+
+    def _write_download_state(self, obj, state_path):
+        state = {'name': obj.name, 'hash': obj.hash, 'size': int(obj.size)}
+
+        with open(state_path, 'wb') as file_handle:
+            file_handle.write(json.dumps(state))
+
+    def _close_response(self, http_response):
+        """
+        Close a raw response whose body won't be read.
+        """
+        close = getattr(http_response, 'close', None)
+
+        if close is not None:
+            close()
+
+    def _remove_files(self, paths):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _verify_file_hash(self, obj, file_path):
+        """
+        Compare MD5 hash of the file to the object hash (if the object hash
+        is an MD5 hash).
+
+        @raise ObjectHashMismatchError: If the hashes don't match.
+        """
+        if self.hash_type != 'md5' or not obj.hash:
+            return
+
+        expected_hash = obj.hash.lower()
+
+        if not MD5_HASH_RE.match(expected_hash):
+            # E.g. ETag of an object uploaded using S3 multipart upload
+            return
+
+        data_hash = hashlib.md5()
+
+        with open(file_path, 'rb') as file_handle:
+            for chunk in utils.read_in_chunks(file_handle, self.chunk_size):
+                data_hash.update(chunk)
+
+        if data_hash.hexdigest() != expected_hash:
+            raise ObjectHashMismatchError(
+                value='MD5 hash checksum does not match',
+                object_name=obj.name, driver=self)
+
     def _upload_object(self, object_name, content_type, upload_func,
                        upload_func_kwargs, request_path, request_method='PUT',
                        headers=None, file_path=None, iterator=None):
@@ -540,9 +1009,25 @@ class StorageDriver(object):
         upload_func_kwargs['response'] = response
         success, data_hash, bytes_transferred = upload_func(**upload_func_kwargs)
 
+        metrics = getattr(response, 'metrics', None)
+
+        if metrics is not None:
+            metrics.bytes_sent += bytes_transferred
+
         if not success:
-            raise LibcloudError(value='Object upload failed, Perhaps a timeout?',
-                                driver=self)
+            error = LibcloudError(value='Object upload failed, Perhaps a timeout?',
+                                  driver=self)
+
+            if metrics is not None:
+                finish_metrics(response.connection.metrics_sink, metrics,
+                               error=error)
+            raise error
+
+        if metrics is not None:
+            # Body of an upload response is usually never read, so the
+            # metrics are reported once the status has been received
+            metrics.status = response.status
+            finish_metrics(response.connection.metrics_sink, metrics)
 
         result_dict = { 'response': response, 'data_hash': data_hash,
                         'bytes_transferred': bytes_transferred }
@@ -561,7 +1046,8 @@ class StorageDriver(object):
                          or a File like object with read method.
 
         @type chunk_size: C{int}
-        @param chunk_size: Optional chunk size (defaults to CHUNK_SIZE)
+        @param chunk_size: Optional chunk size (defaults to the driver
+                           chunk_size attribute)
 
         @rtype: C{tuple}
         @return: First item is a boolean indicator of success, second
@@ -569,7 +1055,7 @@ class StorageDriver(object):
                  is the number of transferred bytes.
         """
 
-        chunk_size = chunk_size or CHUNK_SIZE
+        chunk_size = chunk_size or self.chunk_size
 
         data_hash = None
         if calculate_hash:
@@ -630,27 +1116,78 @@ class StorageDriver(object):
         """
         Upload a file to the server.
 
+        The file is mapped into memory and sent in slices of the mapping, so
+        the data is not copied into intermediate strings.
+
         @type response: C{RawResponse}
         @param response: RawResponse object.
 
         @type file_path: C{str}
         @param file_path: Path to a local file.
 
-        @type iterator: C{}
-        @param response: An object which implements an iterator interface (File
-                         object, etc.)
-
         @rtype: C{tuple}
         @return: First item is a boolean indicator of success, second
                  one is the uploaded data MD5 hash and the third one
                  is the number of transferred bytes.
         """
-        with open (file_path, 'rb') as file_handle:
-            success, data_hash, bytes_transferred = (
-                self._stream_data(
-                    response=response,
-                    iterator=iter(file_handle),
-                    chunked=chunked,
-                    calculate_hash=calculate_hash))
+        with open(file_path, 'rb') as file_handle:
+            file_size = os.fstat(file_handle.fileno()).st_size
+
+            if file_size == 0:
+                # Empty files can't be mapped
+                return self._stream_data(response=response,
+                                         iterator=file_handle,
+                                         chunked=chunked,
+                                         calculate_hash=calculate_hash)
+
+            mapping = mmap.mmap(file_handle.fileno(), file_size,
+                                access=mmap.ACCESS_READ)
+
+            try:
+                return self._send_mapping(response=response, mapping=mapping,
+                                          chunked=chunked,
+                                          calculate_hash=calculate_hash)
+            finally:
+                mapping.close()
+
+    def _send_mapping(self, response, mapping, chunked=False,
+                      calculate_hash=True):
+        """
+        Send a file which is mapped into memory over an http connection.
 
-        return success, data_hash, bytes_transferred
+        @rtype: C{tuple}
+        @return: Same as L{_stream_data}.
+        """
+        connection = response.connection.connection
+        chunk_size = self.chunk_size
+
+        data_hash = None
+        if calculate_hash:
+            data_hash = hashlib.md5()
+
+        bytes_transferred = 0
+        for offset in xrange(0, len(mapping), chunk_size):
+            chunk = buffer(mapping, offset, chunk_size)
+
+            try:
+                if chunked:
+                    connection.send('%X\r\n' % (len(chunk)))
+                    connection.send(chunk)
+                    connection.send('\r\n')
+                else:
+                    connection.send(chunk)
+            except Exception:
+                # Timeout, etc. _upload_object reports the failed upload
+                return False, None, bytes_transferred
+
+            bytes_transferred += len(chunk)
+            if calculate_hash:
+                data_hash.update(chunk)
+
+        if chunked:
+            connection.send('0\r\n\r\n')
+
+        if calculate_hash:
+            data_hash = data_hash.hexdigest()
+
+        return True, data_hash, bytes_transferred
@@ -15,7 +15,6 @@
 
 import base64
 import hashlib
-import hmac
 import httplib
 import time
 import urllib
@@ -26,8 +25,10 @@ from xml.etree import ElementTree
 from libcloud import utils
 from libcloud.common.base import ConnectionUserAndKey, Response
 from libcloud.common.types import LazyList
+from libcloud.common.signing import sign
 
-from libcloud.storage.base import Object, Container, StorageDriver, CHUNK_SIZE
+from libcloud.storage.base import Object, Container, StorageDriver
+from libcloud.storage.base import get_range_header
 from libcloud.storage.types import ContainerAlreadyExistsError, \
                                    ContainerDoesNotExistError, \
                                    ContainerIsNotEmptyError, \
@@ -103,9 +104,14 @@ class AtmosConnection(ConnectionUserAndKey):
         ]
         signature.extend([k + ':' + collapse(v) for k, v in xhdrs])
         signature = '\n'.join(signature)
-        key = base64.b64decode(self.key)
-        signature = hmac.new(key, signature, hashlib.sha1).digest()
-        return base64.b64encode(signature)
+        return sign(self._get_secret_key(), signature, digestmod=hashlib.sha1)
+
+    def _get_secret_key(self):
+        # Secret is base64 encoded, decode it only once
+        if getattr(self, '_secret_key', None) is None:
+            self._secret_key = base64.b64decode(self.key)
+
+        return self._secret_key
 
 class AtmosDriver(StorageDriver):
     connectionCls = AtmosConnection
@@ -248,7 +254,7 @@ class AtmosDriver(StorageDriver):
             iterator = iter(iterator)
 
         data_hash = hashlib.md5()
-        generator = utils.read_in_chunks(iterator, CHUNK_SIZE, True)
+        generator = utils.read_in_chunks(iterator, self.chunk_size, True)
         bytes_transferred = 0
         try:
             chunk = generator.next()
@@ -300,6 +306,12 @@ class AtmosDriver(StorageDriver):
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
                       delete_on_failure=True):
+        if self._use_ranged_download(obj):
+            return self._download_object_ranged(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure)
+
         path = self._namespace_path(obj.container.name + '/' + obj.name)
         response = self.connection.request(path, method='GET', raw=True)
 
@@ -322,10 +334,21 @@ class AtmosDriver(StorageDriver):
                                 response=response,
                                 callback_kwargs={
                                     'iterator': response.response,
-                                    'chunk_size': chunk_size
+                                    'chunk_size': chunk_size or
+                                                  self.chunk_size
                                 },
                                 success_status_code=httplib.OK)
 
+    def _get_range_response(self, obj, start, end=None, if_range=None):
+        # Object hash is an MD5 hash stored in the user meta data and not an
+        # ETag, so If-Range can't be used. A resumed download of an object
+        # which has changed (but kept its size) is only detected by the MD5
+        # check once the remaining bytes have been downloaded.
+        path = self._namespace_path(obj.container.name + '/' + obj.name)
+        headers = {'Range': get_range_header(start, end)}
+        return self.connection.request(path, method='GET', headers=headers,
+                                       raw=True)
+
     def delete_object(self, obj):
         path = self._namespace_path(obj.container.name + '/' + obj.name)
         try:
@@ -359,18 +382,16 @@ class AtmosDriver(StorageDriver):
             ('uid', self.key),
             ('expires', expiry),
         ]
-        params.append(('signature', self._cdn_signature(path, params)))
+        params.append(('signature', self._cdn_signature(path, expiry)))
 
         params = urllib.urlencode(params)
         path = self.path + path
         return urlparse.urlunparse((protocol, self.host, path, '', params, ''))
 
-    def _cdn_signature(self, path, params):
-        key = base64.b64decode(self.secret)
+    def _cdn_signature(self, path, expiry):
         signature = '\n'.join(['GET', path.lower(), self.key, expiry])
-        signature = hmac.new(key, signature, hashlib.sha1).digest()
-
-        return base64.b64encode(signature)
+        return sign(self.connection._get_secret_key(), signature,
+                    digestmod=hashlib.sha1)
 
     def _list_objects(self, tree, object_type=None):
         listing = tree.find(self._emc_tag('DirectoryList'))
@@ -27,6 +27,7 @@ from libcloud.common.base import Response, RawResponse
 
 from libcloud.storage.providers import Provider
 from libcloud.storage.base import Object, Container, StorageDriver
+from libcloud.storage.base import get_range_header
 from libcloud.storage.types import ContainerAlreadyExistsError
 from libcloud.storage.types import ContainerDoesNotExistError
 from libcloud.storage.types import ContainerIsNotEmptyError
@@ -157,7 +158,7 @@ class CloudFilesStorageDriver(StorageDriver):
         if response.status == httplib.NO_CONTENT:
             return []
         elif response.status == httplib.OK:
-            return self._to_container_list(json.loads(response.body))
+            return self._to_container_list(response.object)
 
         raise LibcloudError('Unexpected status code: %s' % (response.status))
 
@@ -259,6 +260,12 @@ class CloudFilesStorageDriver(StorageDriver):
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
                         delete_on_failure=True):
+        if self._use_ranged_download(obj):
+            return self._download_object_ranged(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure)
+
         container_name = obj.container.name
         object_name = obj.name
         response = self.connection.request('/%s/%s' % (container_name,
@@ -284,9 +291,20 @@ class CloudFilesStorageDriver(StorageDriver):
         return self._get_object(obj=obj, callback=read_in_chunks,
                                 response=response,
                                 callback_kwargs={ 'iterator': response.response,
-                                                 'chunk_size': chunk_size},
+                                                 'chunk_size': chunk_size or
+                                                               self.chunk_size},
                                 success_status_code=httplib.OK)
 
+    def _get_range_response(self, obj, start, end=None, if_range=None):
+        headers = {'Range': get_range_header(start, end)}
+
+        if if_range:
+            headers['If-Range'] = '"%s"' % (if_range)
+        return self.connection.request('/%s/%s' % (obj.container.name,
+                                                   obj.name),
+                                       method='GET', headers=headers,
+                                       raw=True)
+
     def upload_object(self, file_path, container, object_name, extra=None,
                       verify_hash=True):
         """
@@ -362,7 +380,7 @@ class CloudFilesStorageDriver(StorageDriver):
             # Empty or inexistent container
             return [], None, True
         elif response.status == httplib.OK:
-            objects = self._to_object_list(json.loads(response.body), container)
+            objects = self._to_object_list(response.object, container)
 
             # TODO: Is this really needed?
             if len(objects) == 0:
@@ -13,23 +13,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import sys
 import time
+import random
 import httplib
 import urllib
-import copy
-import base64
-import hmac
+import threading
 
-from hashlib import sha1
+from hashlib import sha1, md5
 from xml.etree.ElementTree import Element, SubElement, tostring
 
+from libcloud import utils
 from libcloud.utils import fixxpath, findtext, in_development_warning
-from libcloud.utils import read_in_chunks
+from libcloud.utils import read_in_chunks, IterParser
 from libcloud.common.types import InvalidCredsError, LibcloudError
+from libcloud.common.futures import WorkerPool
 from libcloud.common.base import ConnectionUserAndKey, RawResponse
 from libcloud.common.aws import AWSBaseResponse
+from libcloud.common.signing import sign
 
 from libcloud.storage.base import Object, Container, StorageDriver
+from libcloud.storage.base import get_range_header
 from libcloud.storage.types import ContainerIsNotEmptyError
 from libcloud.storage.types import InvalidContainerNameError
 from libcloud.storage.types import ContainerDoesNotExistError
@@ -49,6 +54,36 @@ S3_AP_NORTHEAST_HOST = 's3-ap-northeast-1.amazonaws.com'
 API_VERSION = '2006-03-01'
 NAMESPACE = 'http://s3.amazonaws.com/doc/%s/' % (API_VERSION)
 
+# Query parameters which are a part of the signed resource
+SUB_RESOURCES = [ 'acl', 'location', 'logging', 'notification', 'partNumber',
+                  'policy', 'requestPayment', 'torrent', 'uploadId',
+                  'uploads', 'versionId', 'versioning', 'versions' ]
+
+# Files larger than this are uploaded using the multipart upload API
+MULTIPART_THRESHOLD = 100 * 1024 * 1024
+
+# Size of a single part. Larger parts are used for files which would need
+# more than MULTIPART_MAX_PARTS parts.
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Minimum size of a part (all the parts except the last one must be at least
+# 5 MB, otherwise S3 rejects the upload once all the parts have been sent)
+MULTIPART_MIN_CHUNK_SIZE = 5 * 1024 * 1024
+
+# Maximum number of parts of a single upload
+MULTIPART_MAX_PARTS = 10000
+
+# Number of parts which are uploaded (and buffered in memory) at once
+MULTIPART_MAX_CONCURRENCY = 4
+
+# How many times an upload of a single part is retried
+MULTIPART_MAX_RETRIES = 3
+
+# Base and maximum delay (in seconds) of the exponential backoff between the
+# attempts to upload a part
+MULTIPART_BACKOFF_BASE = 0.5
+MULTIPART_BACKOFF_MAX = 20
+
 
 class S3Response(AWSBaseResponse):
 
@@ -112,12 +147,12 @@ class S3Connection(ConnectionUserAndKey):
         special_header_values = { 'date': '' }
         amz_header_values = {}
 
-        headers_copy = copy.deepcopy(headers)
-        for key, value in headers_copy.iteritems():
-            if key.lower() in special_header_keys:
-                special_header_values[key.lower()] = value.lower().strip()
-            elif key.lower().startswith('x-amz-'):
-                amz_header_values[key.lower()] = value.strip()
+        for key, value in headers.iteritems():
+            key_lower = key.lower()
+            if key_lower in special_header_keys:
+                special_header_values[key_lower] = value.lower().strip()
+            elif key_lower.startswith('x-amz-'):
+                amz_header_values[key_lower] = value.strip()
 
         if not special_header_values.has_key('content-md5'):
             special_header_values['content-md5'] = ''
@@ -146,16 +181,24 @@ class S3Connection(ConnectionUserAndKey):
             amz_header_string.append('%s:%s' % (key, value))
         amz_header_string = '\n'.join(amz_header_string)
 
+        sub_resources = []
+        for key in sorted(params.keys()):
+            if key in SUB_RESOURCES:
+                if params[key]:
+                    sub_resources.append('%s=%s' % (key, params[key]))
+                else:
+                    sub_resources.append(key)
+
+        if sub_resources:
+            path = '%s?%s' % (path, '&'.join(sub_resources))
+
         values_to_sign = []
         for value in [ string_to_sign, amz_header_string, path]:
             if value:
                 values_to_sign.append(value)
 
         string_to_sign = '\n'.join(values_to_sign)
-        b64_hmac = base64.b64encode(
-            hmac.new(secret_key, string_to_sign, digestmod=sha1).digest()
-        )
-        return b64_hmac
+        return sign(secret_key, string_to_sign, digestmod=sha1)
 
 class S3StorageDriver(StorageDriver):
     name = 'Amazon S3 (standard)'
@@ -163,6 +206,15 @@ class S3StorageDriver(StorageDriver):
     hash_type = 'md5'
     ex_location_name = ''
 
+    multipart_threshold = MULTIPART_THRESHOLD
+    multipart_chunk_size = MULTIPART_CHUNK_SIZE
+    multipart_min_chunk_size = MULTIPART_MIN_CHUNK_SIZE
+    multipart_max_concurrency = MULTIPART_MAX_CONCURRENCY
+    multipart_max_retries = MULTIPART_MAX_RETRIES
+    multipart_max_parts = MULTIPART_MAX_PARTS
+    multipart_backoff_base = MULTIPART_BACKOFF_BASE
+    multipart_backoff_max = MULTIPART_BACKOFF_MAX
+
     def list_containers(self):
         response = self.connection.request('/')
         if response.status == httplib.OK:
@@ -256,6 +308,12 @@ class S3StorageDriver(StorageDriver):
 
     def download_object(self, obj, destination_path, overwrite_existing=False,
                         delete_on_failure=True):
+        if self._use_ranged_download(obj):
+            return self._download_object_ranged(
+                obj=obj, destination_path=destination_path,
+                overwrite_existing=overwrite_existing,
+                delete_on_failure=delete_on_failure)
+
         container_name = self._clean_object_name(obj.container.name)
         object_name = self._clean_object_name(obj.name)
 
@@ -283,11 +341,21 @@ class S3StorageDriver(StorageDriver):
         return self._get_object(obj=obj, callback=read_in_chunks,
                                 response=response,
                                 callback_kwargs={ 'iterator': response.response,
-                                                  'chunk_size': chunk_size},
+                                                  'chunk_size': chunk_size or
+                                                                self.chunk_size},
                                 success_status_code=httplib.OK)
 
     def upload_object(self, file_path, container, object_name, extra=None,
                       verify_hash=True, ex_storage_class=None):
+        if (os.path.exists(file_path) and
+            os.path.getsize(file_path) > self.multipart_threshold):
+            return self._put_object_multipart(container=container,
+                                              object_name=object_name,
+                                              extra=extra,
+                                              file_path=file_path,
+                                              verify_hash=verify_hash,
+                                              storage_class=ex_storage_class)
+
         upload_func = self._upload_file
         upload_func_kwargs = { 'file_path': file_path }
 
@@ -300,11 +368,13 @@ class S3StorageDriver(StorageDriver):
 
     def upload_object_via_stream(self, iterator, container, object_name,
                                  extra=None, ex_storage_class=None):
-        # Amazon S3 does not support chunked transfer encoding.
-        # Using multipart upload to "emulate" it would mean unnecessary
-        # buffering of data in memory.
-        raise NotImplementedError(
-            'upload_object_via_stream not implemented for this driver')
+        # Amazon S3 does not support chunked transfer encoding, so the
+        # multipart upload API is used. At most multipart_max_concurrency + 1
+        # parts are buffered in memory.
+        return self._put_object_multipart(container=container,
+                                          object_name=object_name,
+                                          extra=extra, iterator=iterator,
+                                          storage_class=ex_storage_class)
 
     def delete_object(self, obj):
         object_name = self._clean_object_name(name=obj.name)
@@ -323,6 +393,18 @@ class S3StorageDriver(StorageDriver):
         name = urllib.quote(name)
         return name
 
+    def _get_range_response(self, obj, start, end=None, if_range=None):
+        container_name = self._clean_object_name(obj.container.name)
+        object_name = self._clean_object_name(obj.name)
+        headers = {'Range': get_range_header(start, end)}
+
+        if if_range:
+            headers['If-Range'] = '"%s"' % (if_range)
+        return self.connection.request('/%s/%s' % (container_name,
+                                                   object_name),
+                                       method='GET', headers=headers,
+                                       raw=True)
+
     def _get_more(self, last_key, value_dict):
         container = value_dict['container']
         params = {}
@@ -331,13 +413,16 @@ class S3StorageDriver(StorageDriver):
             params['marker'] = last_key
 
         response = self.connection.request('/%s' % (container.name),
-                                           params=params)
+                                           params=params, stream=True)
 
         if response.status == httplib.OK:
-            objects = self._to_objs(obj=response.object,
-                                       xpath='Contents', container=container)
-            is_truncated = response.object.findtext(fixxpath(xpath='IsTruncated',
-                                                   namespace=NAMESPACE)).lower()
+            # Objects are parsed and converted one by one, elements which
+            # are not yielded (e.g. IsTruncated) are kept in parser.root
+            parser = IterParser(response.body)
+            objects = [self._to_obj(element, container) for element in
+                       parser.iterfind(xpath='Contents', namespace=NAMESPACE)]
+            is_truncated = findtext(element=parser.root, xpath='IsTruncated',
+                                    namespace=NAMESPACE).lower()
             exhausted = (is_truncated == 'false')
 
             if (len(objects) > 0):
@@ -352,24 +437,15 @@ class S3StorageDriver(StorageDriver):
     def _put_object(self, container, object_name, upload_func,
                     upload_func_kwargs, extra=None, file_path=None,
                     iterator=None, verify_hash=True, storage_class=None):
-        headers = {}
         extra = extra or {}
-        storage_class = storage_class or 'standard'
-        if storage_class not in ['standard', 'reduced_redundancy']:
-            raise ValueError('Invalid storage class value: %s' % (storage_class))
-
-        headers['x-amz-storage-class'] = storage_class.upper()
+        headers = self._get_object_headers(extra=extra,
+                                           storage_class=storage_class)
 
         container_name_cleaned = container.name
         object_name_cleaned = self._clean_object_name(object_name)
         content_type = extra.get('content_type', None)
         meta_data = extra.get('meta_data', None)
 
-        if meta_data:
-            for key, value in meta_data.iteritems():
-                key = 'x-amz-meta-%s' % (key)
-                headers[key] = value
-
         request_path = '/%s/%s' % (container_name_cleaned, object_name_cleaned)
         # TODO: Let the underlying exceptions bubble up and capture the SIGPIPE
         # here.
@@ -405,6 +481,308 @@ class S3StorageDriver(StorageDriver):
             raise LibcloudError('Unexpected status code, status_code=%s' % (response.status),
                                 driver=self)
 
+    def _get_object_headers(self, extra, storage_class=None):
+        """
+        Return storage class and meta data headers for an object upload.
+        """
+        headers = {}
+        storage_class = storage_class or 'standard'
+        if storage_class not in ['standard', 'reduced_redundancy']:
+            raise ValueError('Invalid storage class value: %s' % (storage_class))
+
+        headers['x-amz-storage-class'] = storage_class.upper()
+        meta_data = extra.get('meta_data', None)
+
+        if meta_data:
+            for key, value in meta_data.iteritems():
+                key = 'x-amz-meta-%s' % (key)
+                headers[key] = value
+
+        return headers
+
+    def _put_object_multipart(self, container, object_name, extra=None,
+                              file_path=None, iterator=None,
+                              verify_hash=True, storage_class=None):
+        """
+        Upload an object using the multipart upload API.
+
+        Parts are uploaded concurrently (at most multipart_max_concurrency at
+        a time) and each part is retried up to multipart_max_retries times
+        with an exponential backoff. If the upload fails, it's aborted so
+        the parts which have already been uploaded are deleted.
+
+        Files are split into at most multipart_max_parts parts, the part
+        size grows with the file size. Streams which need more parts fail
+        once the last allowed part has been read.
+
+        @raise ValueError: If multipart_chunk_size is smaller than the
+                           minimum part size.
+        """
+        if self.multipart_chunk_size < self.multipart_min_chunk_size:
+            raise ValueError('multipart_chunk_size must be at least %d '
+                             'bytes' % (self.multipart_min_chunk_size))
+
+        extra = extra or {}
+        headers = self._get_object_headers(extra=extra,
+                                           storage_class=storage_class)
+        meta_data = extra.get('meta_data', None)
+
+        if file_path and not os.path.exists(file_path):
+            raise OSError('File %s does not exist' % (file_path))
+
+        if iterator is not None and not hasattr(iterator, 'next'):
+            raise AttributeError('iterator object must implement next() ' +
+                                 'method.')
+
+        content_type = extra.get('content_type', None)
+
+        if not content_type:
+            content_type, _ = utils.guess_file_mime_type(file_path or
+                                                         object_name)
+
+            if not content_type:
+                raise AttributeError(
+                    'File content-type could not be guessed and' +
+                    ' no content_type value provided')
+
+        headers['Content-Type'] = content_type
+        request_path = '/%s/%s' % (container.name,
+                                   self._clean_object_name(object_name))
+        upload_id = self._initiate_multipart_upload(request_path=request_path,
+                                                    headers=headers)
+
+        try:
+            if file_path:
+                parts = self._get_file_parts(file_path=file_path)
+            else:
+                parts = self._get_stream_parts(iterator=iterator)
+
+            etags, digests, bytes_transferred = self._upload_parts(
+                object_name=object_name, request_path=request_path,
+                upload_id=upload_id, parts=parts, verify_hash=verify_hash)
+            server_hash = self._complete_multipart_upload(
+                request_path=request_path, upload_id=upload_id, etags=etags)
+        except Exception:
+            exc_info = sys.exc_info()
+
+            try:
+                self._abort_multipart_upload(request_path=request_path,
+                                             upload_id=upload_id)
+            except Exception:
+                pass
+
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+        # ETag of an object uploaded in parts is the MD5 hash of the
+        # concatenated part MD5 hashes followed by the number of parts
+        data_hash = '%s-%d' % (md5(''.join(digests)).hexdigest(), len(etags))
+
+        if verify_hash and data_hash != server_hash:
+            raise ObjectHashMismatchError(
+                value='MD5 hash checksum does not match',
+                object_name=object_name, driver=self)
+
+        return Object(name=object_name, size=bytes_transferred,
+                      hash=server_hash, extra=None, meta_data=meta_data,
+                      container=container, driver=self)
+
+    def _get_file_parts(self, file_path):
+        """
+        Yield (part number, read function) tuples. The part data is read by
+        the thread which uploads the part.
+        """
+        file_size = os.path.getsize(file_path)
+        chunk_size = self._get_part_size(file_size=file_size)
+        offset = 0
+        part_number = 1
+
+        while offset < file_size or part_number == 1:
+            size = min(chunk_size, file_size - offset)
+            yield part_number, _FileRange(file_path, offset, size)
+            offset += size
+            part_number += 1
+
+    def _get_stream_parts(self, iterator):
+        """
+        Yield (part number, read function) tuples with the data read from the
+        iterator.
+        """
+        part_number = 1
+
+        for data in read_in_chunks(iterator, self.multipart_chunk_size,
+                                   fill_size=True):
+            if part_number > self.multipart_max_parts:
+                raise LibcloudError(
+                    'Stream is larger than the maximum multipart upload '
+                    'size (%d parts of %d bytes)' %
+                    (self.multipart_max_parts, self.multipart_chunk_size),
+                    driver=self)
+
+            yield part_number, _Buffer(data)
+            part_number += 1
+
+        if part_number == 1:
+            # Empty object
+            yield part_number, _Buffer('')
+
+    def _get_part_size(self, file_size):
+        """
+        Return the size of the parts of a file, so the file is uploaded in at
+        most multipart_max_parts parts.
+        """
+        min_size = (file_size + self.multipart_max_parts - 1) // \
+                   self.multipart_max_parts
+        return max(self.multipart_chunk_size, min_size)
+
+    def _get_part_retry_delay(self, attempt):
+        """
+        Return exponential backoff delay with "full" jitter, so the parts
+        which failed at the same time (e.g. with 503 SlowDown) are not
+        retried at the same time.
+        """
+        delay = min(self.multipart_backoff_max,
+                    self.multipart_backoff_base * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def _upload_parts(self, object_name, request_path, upload_id, parts,
+                      verify_hash=True):
+        """
+        Upload the parts using a bounded pool of threads.
+
+        @rtype: C{tuple}
+        @return: (part ETags, part MD5 digests, number of transferred bytes)
+        """
+        pool = WorkerPool(max_workers=self.multipart_max_concurrency)
+        semaphore = threading.BoundedSemaphore(self.multipart_max_concurrency)
+        failed = threading.Event()
+        futures = []
+
+        try:
+            for part_number, read_data in parts:
+                # Limits the number of parts buffered in memory
+                semaphore.acquire()
+
+                if failed.isSet():
+                    semaphore.release()
+                    break
+
+                futures.append(pool.submit(self._upload_part,
+                                           object_name=object_name,
+                                           request_path=request_path,
+                                           upload_id=upload_id,
+                                           part_number=part_number,
+                                           read_data=read_data,
+                                           verify_hash=verify_hash,
+                                           semaphore=semaphore,
+                                           failed=failed))
+        finally:
+            # Wait for the parts which are in progress so the upload is never
+            # aborted while a part is being uploaded
+            for future in futures:
+                future.exception()
+
+            pool.shutdown(wait=False)
+
+        results = [future.result() for future in futures]
+
+        etags = [etag for etag, digest, size in results]
+        digests = [digest for etag, digest, size in results]
+        bytes_transferred = sum([size for etag, digest, size in results])
+        return etags, digests, bytes_transferred
+
+    def _upload_part(self, object_name, request_path, upload_id, part_number,
+                     read_data, verify_hash, semaphore, failed):
+        try:
+            data = read_data()
+            data_hash = md5(data)
+            attempt = 0
+
+            while True:
+                try:
+                    etag = self._put_part(request_path=request_path,
+                                          upload_id=upload_id,
+                                          part_number=part_number,
+                                          data=data)
+
+                    if verify_hash and etag != data_hash.hexdigest():
+                        raise ObjectHashMismatchError(
+                            value='MD5 hash checksum of part %d does not '
+                                  'match' % (part_number),
+                            object_name=object_name, driver=self)
+
+                    return etag, data_hash.digest(), len(data)
+                except InvalidCredsError:
+                    raise
+                except Exception:
+                    # No point in retrying once the upload is going to be
+                    # aborted
+                    if (attempt >= self.multipart_max_retries or
+                        failed.isSet()):
+                        raise
+
+                    time.sleep(self._get_part_retry_delay(attempt=attempt))
+                    attempt += 1
+        except Exception:
+            failed.set()
+            raise
+        finally:
+            semaphore.release()
+
+    def _put_part(self, request_path, upload_id, part_number, data):
+        params = {'partNumber': str(part_number), 'uploadId': upload_id}
+        response = self.connection.request(request_path, method='PUT',
+                                           params=params, data=data)
+
+        if response.status != httplib.OK:
+            raise LibcloudError('Unexpected status code: %s' %
+                                (response.status), driver=self)
+
+        return response.headers['etag'].replace('"', '')
+
+    def _initiate_multipart_upload(self, request_path, headers):
+        response = self.connection.request(request_path, method='POST',
+                                           params={'uploads': ''},
+                                           headers=headers)
+
+        if response.status != httplib.OK:
+            raise LibcloudError('Unexpected status code: %s' %
+                                (response.status), driver=self)
+
+        return findtext(element=response.object, xpath='UploadId',
+                        namespace=NAMESPACE)
+
+    def _complete_multipart_upload(self, request_path, upload_id, etags):
+        root = Element('CompleteMultipartUpload')
+
+        for index in range(len(etags)):
+            part = SubElement(root, 'Part')
+            SubElement(part, 'PartNumber').text = str(index + 1)
+            SubElement(part, 'ETag').text = '"%s"' % (etags[index])
+
+        response = self.connection.request(request_path, method='POST',
+                                           params={'uploadId': upload_id},
+                                           data=tostring(root))
+
+        if response.status != httplib.OK:
+            raise LibcloudError('Unexpected status code: %s' %
+                                (response.status), driver=self)
+
+        # Errors which occur while the parts are being combined are returned
+        # in the body of a 200 response
+        body = response.object
+
+        if body is None or body.tag == 'Error':
+            raise LibcloudError('Failed to complete multipart upload: %s' %
+                                (response.body), driver=self)
+
+        return findtext(element=body, xpath='ETag',
+                        namespace=NAMESPACE).replace('"', '')
+
+    def _abort_multipart_upload(self, request_path, upload_id):
+        response = self.connection.request(request_path, method='DELETE',
+                                           params={'uploadId': upload_id})
+        return response.status == httplib.NO_CONTENT
+
     def _to_containers(self, obj, xpath):
         return [ self._to_container(element) for element in \
                  obj.findall(fixxpath(xpath=xpath, namespace=NAMESPACE))]
@@ -462,6 +840,37 @@ class S3StorageDriver(StorageDriver):
 
         return obj
 
+class _FileRange(object):
+    """
+    Reads a range of a file when called.
+    """
+
+    def __init__(self, file_path, offset, size):
+        self.file_path = file_path
+        self.offset = offset
+        self.size = size
+
+    def __call__(self):
+        file_handle = open(self.file_path, 'rb')
+
+        try:
+            file_handle.seek(self.offset)
+            return file_handle.read(self.size)
+        finally:
+            file_handle.close()
+
+class _Buffer(object):
+    """
+    Returns buffered data when called.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __call__(self):
+        data, self.data = self.data, None
+        return data
+
 class S3USWestConnection(S3Connection):
     host = S3_US_WEST_HOST
 
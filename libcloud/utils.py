@@ -14,14 +14,36 @@
 # limitations under the License.
 
 import os
-import mimetypes
 import warnings
-from httplib import HTTPResponse
 
 SHOW_DEPRECATION_WARNING = True
 SHOW_IN_DEVELOPMENT_WARNING = True
 OLD_API_REMOVE_VERSION = '0.6.0'
 
+# Default size of the chunks yielded by read_in_chunks()
+CHUNK_SIZE = 64 * 1024
+
+# Driver classes resolved by get_driver(), keyed by (module, class name)
+_driver_cache = {}
+
+# Classes whose instances are read using read() by read_in_chunks(). Resolved
+# on first use so importing this module doesn't load httplib and the
+# connection classes
+_readable_classes = None
+
+def _get_readable_classes():
+    global _readable_classes
+
+    if _readable_classes is None:
+        from httplib import HTTPResponse
+        from libcloud.common.metrics import MeteredResponse
+        from libcloud.common.base import LoggingResponse
+
+        _readable_classes = (file, HTTPResponse, MeteredResponse,
+                             LoggingResponse)
+
+    return _readable_classes
+
 def read_in_chunks(iterator, chunk_size=None, fill_size=False):
     """
     Return a generator which yields data in chunks.
@@ -38,40 +60,68 @@ def read_in_chunks(iterator, chunk_size=None, fill_size=False):
                       (except for last chunk).
     """
 
-    if isinstance(iterator, (file, HTTPResponse)):
+    chunk_size = chunk_size or CHUNK_SIZE
+
+    if isinstance(iterator, _get_readable_classes()):
         get_data = iterator.read
         args = (chunk_size, )
     else:
         get_data = iterator.next
         args = ()
 
-    data = ''
-    empty = False
+    # Pending data is kept as a list of chunks and only joined once there is
+    # enough of it for a whole chunk, so each byte is copied at most twice
+    # instead of once per appended chunk.
+    pending = []
+    pending_size = 0
 
-    while not empty or len(data) > 0:
-        if not empty:
-            try:
-                chunk = str(get_data(*args))
-                if len(chunk) > 0:
-                    data += chunk
-                else:
-                    empty = True
-            except StopIteration:
-                empty = True
-
-        if len(data) == 0:
-            raise StopIteration
-
-        if fill_size:
-            if empty or len(data) >= chunk_size:
-                yield data[:chunk_size]
-                data = data[chunk_size:]
+    while True:
+        try:
+            chunk = get_data(*args)
+        except StopIteration:
+            break
+
+        if not isinstance(chunk, str):
+            chunk = str(chunk)
+
+        if not chunk:
+            break
+
+        if not fill_size:
+            yield chunk
+            continue
+
+        pending.append(chunk)
+        pending_size += len(chunk)
+
+        if pending_size < chunk_size:
+            continue
+
+        if len(pending) == 1:
+            data = chunk
+        else:
+            data = ''.join(pending)
+
+        offset = 0
+        while pending_size - offset >= chunk_size:
+            if offset == 0 and pending_size == chunk_size:
+                yield data
+            else:
+                yield data[offset:offset + chunk_size]
+            offset += chunk_size
+
+        if offset < pending_size:
+            pending = [data[offset:]]
         else:
-            yield data
-            data = ''
+            pending = []
+        pending_size -= offset
+
+    if pending:
+        yield ''.join(pending)
 
 def guess_file_mime_type(file_path):
     filename = os.path.basename(file_path)
+    import mimetypes
     (mimetype, encoding) = mimetypes.guess_type(filename)
     return mimetype, encoding
 
@@ -197,6 +247,140 @@ def findattr(element, xpath, namespace):
 def findall(element, xpath, namespace):
     return element.findall(fixxpath(xpath=xpath, namespace=namespace))
 
+class IterParser(object):
+    """
+    Incremental XML parser which yields elements as soon as they have been
+    parsed and frees them once the caller is done with them, so neither the
+    whole response body nor the whole tree is held in memory.
+
+    Elements which haven't been yielded are kept, so C{root} can be used to
+    access them once the iteration has finished.
+    """
+
+    def __init__(self, source):
+        """
+        @type source: C{file}
+        @param source: File-like object (e.g. HTTP response) with a read
+                       method.
+        """
+        self.source = source
+        self.root = None
+
+    def iterfind(self, xpath, namespace=None):
+        """
+        Yield elements which match the provided path (relative to the root
+        element, e.g. 'reservationSet/item').
+
+        Yielded element is removed from the tree once the caller requests
+        the next one.
+        """
+        from xml.etree import ElementTree as ET
+
+        tags = xpath.split('/')
+
+        if namespace:
+            tags = ['{%s}%s' % (namespace, tag) for tag in tags]
+
+        last_tag = tags[-1]
+        depth = len(tags)
+        # Ancestors of the element which is currently being parsed
+        stack = []
+
+        for event, element in ET.iterparse(self.source,
+                                           events=('start', 'end')):
+            if event == 'start':
+                if self.root is None:
+                    self.root = element
+
+                stack.append(element)
+                continue
+
+            stack.pop()
+
+            if (element.tag != last_tag or len(stack) != depth or
+                [e.tag for e in stack[1:]] != tags[:-1]):
+                continue
+
+            yield element
+            stack[-1].remove(element)
+            element.clear()
+
+def iter_json_array(source, chunk_size=8192):
+    """
+    Incrementally decode a JSON array and yield its items one by one.
+
+    @type source: C{file}
+    @param source: File-like object (e.g. HTTP response) with a read
+                   method.
+
+    @type chunk_size: C{int}
+    @param chunk_size: Minimum number of bytes read at once.
+    """
+    try:
+        import json
+    except ImportError:
+        import simplejson as json
+
+    decoder = json.JSONDecoder()
+    data = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        while pos < len(data) and data[pos] in ' \t\r\n':
+            pos += 1
+
+        if pos < len(data):
+            char = data[pos]
+
+            if not started:
+                if char != '[':
+                    raise ValueError('Expected a JSON array')
+
+                started = True
+                pos += 1
+                continue
+
+            if char == ']':
+                # Read the rest of the source (e.g. trailing new line), so
+                # the connection of a streamed response can be reused
+                while source.read(chunk_size):
+                    pass
+
+                return
+
+            if char == ',':
+                pos += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(data, pos)
+            except ValueError:
+                if eof:
+                    raise
+
+                end = None
+
+            # Values which end at the end of the buffer (e.g. numbers) might
+            # continue in the next chunk
+            if end is not None and (end < len(data) or eof):
+                yield item
+                pos = end
+                continue
+
+        if eof:
+            raise ValueError('Unexpected end of JSON array')
+
+        # Read at least as much as we already have so large items are not
+        # decoded over and over again
+        chunk = source.read(max(chunk_size, len(data) - pos))
+
+        if not chunk:
+            eof = True
+
+        data, pos = data[pos:] + chunk, 0
+
 def reverse_dict(dictionary):
     return dict([ (value, key) for key, value in dictionary.iteritems() ])
 
@@ -210,7 +394,19 @@ def get_driver(drivers, provider):
     """
     if provider in drivers:
         mod_name, driver_name = drivers[provider]
-        _mod = __import__(mod_name, globals(), locals(), [driver_name])
-        return getattr(_mod, driver_name)
+        key = (mod_name, driver_name)
+        driver = _driver_cache.get(key, None)
+
+        if driver is None:
+            _mod = __import__(mod_name, globals(), locals(), [driver_name])
+            driver = _driver_cache[key] = getattr(_mod, driver_name)
+
+        return driver
 
     raise AttributeError('Provider %s does not exist' % (provider))
+
+def clear_driver_cache():
+    """
+    Remove the driver classes cached by L{get_driver}.
+    """
+    _driver_cache.clear()
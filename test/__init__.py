@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
 import httplib
 import random
 import unittest
@@ -21,6 +22,8 @@ from cStringIO import StringIO
 from urllib2 import urlparse
 from cgi import parse_qs
 
+from libcloud.common.base import ConnectionKey, Response
+
 class LibcloudTestCase(unittest.TestCase):
     def __init__(self, *args, **kwargs):
         self._visited_urls = []
@@ -43,6 +46,46 @@ class LibcloudTestCase(unittest.TestCase):
                          'expected %d, but %d mock methods were executed'
                          % (expected, actual))
 
+def gzip_compress(data):
+    """
+    Return data compressed using the gzip content coding.
+    """
+    buf = StringIO()
+    gzip_file = gzip.GzipFile(fileobj=buf, mode='wb')
+    gzip_file.write(data)
+    gzip_file.close()
+    return buf.getvalue()
+
+class BaseMockDriver(object):
+    """
+    Minimal driver for the connection tests.
+    """
+    name = 'mock'
+
+class FakeClock(object):
+    """
+    Clock which only moves when C{now} is changed by the test.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class CountingResponse(Response):
+    """
+    Response which counts the parsed bodies (in C{parsed}).
+    """
+    parsed = 0
+
+    def parse_body(self):
+        CountingResponse.parsed += 1
+        return self.body.split(',')
+
+class MockConnection(ConnectionKey):
+    responseCls = CountingResponse
+
 class multipleresponse(object):
     """
     A decorator that allows MockHttp objects to return multi responses
@@ -198,11 +241,14 @@ class MockHttpTestCase(MockHttp, unittest.TestCase):
         pass
 
 class StorageMockHttp(MockHttp):
+    # Headers of the last raw request
+    request_headers = {}
+
     def putrequest(self, method, action):
-        pass
+        self.request_headers = {}
 
     def putheader(self, key, value):
-        pass
+        self.request_headers[key] = value
 
     def endheaders(self):
         pass
@@ -0,0 +1,525 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+import socket
+import httplib
+import unittest
+import zlib
+import threading
+
+from cStringIO import StringIO
+from cgi import parse_qs
+from urllib2 import urlparse
+
+import libcloud
+
+from libcloud.common.base import ConnectionKey, ConnectionPool
+from libcloud.common.base import DecompressingReader
+from libcloud.common.base import LoggingConnection, BufferedLogWriter
+from libcloud.common.base import LoggingHTTPConnection, LoggingHTTPSConnection
+
+from test import MockHttp, MockResponse, BaseMockDriver, gzip_compress
+from test import StorageMockHttp, CountingResponse
+
+class TruncatedMockResponse(MockResponse):
+    """
+    Response whose connection is reset after a part of the body is read.
+    """
+
+    def read(self, *args, **kwargs):
+        self.body.read(2)
+        raise socket.error(104, 'Connection reset by peer')
+
+class PoolMockHttp(MockHttp):
+    instances = []
+    stale = False
+
+    def __init__(self, *args, **kwargs):
+        super(PoolMockHttp, self).__init__(*args, **kwargs)
+        self.requests = 0
+        self.closed = False
+        PoolMockHttp.instances.append(self)
+
+    def request(self, method, url, body=None, headers=None, raw=False):
+        if self.requests > 0 and PoolMockHttp.stale:
+            raise socket.error(32, 'Broken pipe')
+
+        self.requests += 1
+        return super(PoolMockHttp, self).request(method, url, body, headers,
+                                                 raw)
+
+    def close(self):
+        self.closed = True
+
+    def _test(self, method, url, body, headers):
+        return (httplib.OK, 'ok', {}, httplib.responses[httplib.OK])
+
+    def _truncated(self, method, url, body, headers):
+        self.responseCls = TruncatedMockResponse
+        return (httplib.OK, 'truncated', {}, httplib.responses[httplib.OK])
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        PoolMockHttp.instances = []
+        PoolMockHttp.stale = False
+        self.pool = ConnectionPool(max_size=2, idle_timeout=30)
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, PoolMockHttp)
+        self.connection.driver = BaseMockDriver()
+        self.connection.connection_pool = self.pool
+
+    def test_connection_pooling_is_disabled_by_default(self):
+        self.connection.connection_pool = None
+        self.connection.request('/test')
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+
+    def test_connection_is_reused(self):
+        self.connection.request('/test')
+        self.connection.request('/test')
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+        self.assertEqual(PoolMockHttp.instances[0].requests, 3)
+
+    def test_connection_is_not_reused_for_a_different_host(self):
+        self.connection.request('/test')
+        self.connection.request('/test', host='other.example.com')
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+
+        key = (PoolMockHttp, 'other.example.com', 443)
+        self.assertEqual(self.pool.size(key), 1)
+
+    def test_idle_connection_expires(self):
+        self.pool.idle_timeout = 0
+        self.connection.request('/test')
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+        self.assertTrue(PoolMockHttp.instances[0].closed)
+
+    def test_pool_max_size(self):
+        key = (PoolMockHttp, 'example.com', 443)
+        connections = [PoolMockHttp('example.com', 443) for i in range(3)]
+
+        for connection in connections:
+            self.pool.put(key, connection)
+
+        self.assertEqual(self.pool.size(key), 2)
+        self.assertTrue(connections[0].closed)
+        self.assertEqual(self.pool.get(key), connections[2])
+
+        self.pool.close()
+        self.assertEqual(self.pool.size(key), 0)
+        self.assertTrue(connections[1].closed)
+
+    def test_stale_connection_is_retried(self):
+        self.connection.request('/test')
+        PoolMockHttp.stale = True
+        response = self.connection.request('/test')
+
+        self.assertEqual(response.status, httplib.OK)
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+        self.assertTrue(PoolMockHttp.instances[0].closed)
+
+    def test_stale_connection_is_not_retried_for_post(self):
+        self.connection.request('/test')
+        PoolMockHttp.stale = True
+        self.assertRaises(socket.error, self.connection.request, '/test',
+                          data='body', method='POST')
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+        self.assertTrue(PoolMockHttp.instances[0].closed)
+
+        PoolMockHttp.stale = False
+        response = self.connection.request('/test', method='POST')
+        self.assertEqual(response.status, httplib.OK)
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+
+    def test_error_on_fresh_connection_is_not_retried(self):
+        self.connection.connection_pool = None
+        self.connection.request('/test')
+        PoolMockHttp.stale = True
+
+        def mock_connect(host=None, port=None):
+            self.connection.connection = PoolMockHttp.instances[0]
+
+        self.connection.connect = mock_connect
+        self.assertRaises(socket.error, self.connection.request, '/test')
+
+    def test_connection_is_not_reused_after_partial_read(self):
+        self.connection.request('/test')
+        self.assertRaises(socket.error, self.connection.request,
+                          '/truncated')
+        self.assertTrue(PoolMockHttp.instances[0].closed)
+        self.assertEqual(self.pool.size((PoolMockHttp, 'example.com', 443)),
+                         0)
+
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+
+    def test_streamed_response_releases_connection_at_eof(self):
+        key = (PoolMockHttp, 'example.com', 443)
+        response = self.connection.request('/test', stream=True)
+        self.assertEqual(self.pool.size(key), 0)
+
+        self.assertEqual(response.body.read(1), 'o')
+        self.assertEqual(response.body.read(1), 'k')
+        self.assertEqual(self.pool.size(key), 0)
+        self.assertEqual(response.body.read(1), '')
+        self.assertEqual(self.pool.size(key), 1)
+
+        # Closing a response which has been read doesn't close the
+        # connection
+        response.body.close()
+        self.assertFalse(PoolMockHttp.instances[0].closed)
+
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+
+    def test_streamed_response_closed_before_eof(self):
+        response = self.connection.request('/test', stream=True)
+        response.body.read(1)
+        response.body.close()
+
+        self.assertTrue(PoolMockHttp.instances[0].closed)
+        self.assertEqual(self.pool.size((PoolMockHttp, 'example.com', 443)),
+                         0)
+
+    def test_warmup(self):
+        self.connection.warmup()
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+        self.assertEqual(self.pool.size((PoolMockHttp, 'example.com', 443)),
+                         1)
+
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+        self.assertEqual(PoolMockHttp.instances[0].requests, 1)
+
+    def test_warmup_without_pool(self):
+        self.connection.connection_pool = None
+        self.connection.warmup()
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 1)
+
+        # Warm connection is only used once
+        self.connection.request('/test')
+        self.assertEqual(len(PoolMockHttp.instances), 2)
+
+class SigningMockConnection(ConnectionKey):
+    def add_default_params(self, params):
+        # Give other threads a chance to run while the request is "signed"
+        time.sleep(0.001)
+        params['signed_action'] = self.action
+        params['signed_method'] = self.method
+        return params
+
+class SigningMockHttp(MockHttp):
+    errors = []
+
+    def request(self, method, url, body=None, headers=None, raw=False):
+        parsed = urlparse.urlparse(url)
+        qs = parse_qs(parsed[4])
+
+        if (qs['signed_action'][0] != parsed[2] or
+            qs['signed_method'][0] != method):
+            SigningMockHttp.errors.append(url)
+
+        # Give other threads a chance to use the same connection
+        time.sleep(0.001)
+        self.response = MockResponse(httplib.OK, parsed[2], {},
+                                     httplib.responses[httplib.OK])
+
+class RawMockHttp(StorageMockHttp):
+    def putrequest(self, method, action):
+        StorageMockHttp.putrequest(self, method, action)
+        self.response = MockResponse(httplib.OK, urlparse.urlparse(action)[2],
+                                     {}, httplib.responses[httplib.OK])
+
+class ThreadSafetyTests(unittest.TestCase):
+    thread_count = 20
+    request_count = 25
+
+    def setUp(self):
+        SigningMockHttp.errors = []
+        self.connection = SigningMockConnection('key', host='example.com')
+        self.connection.conn_classes = (None, SigningMockHttp)
+        self.connection.driver = BaseMockDriver()
+
+    def _run_threads(self):
+        results = []
+        lock = threading.Lock()
+
+        def worker(index):
+            for i in range(self.request_count):
+                action = '/worker/%d/%d' % (index, i)
+                method = ('GET', 'POST')[i % 2]
+                response = self.connection.request(action, method=method)
+                lock.acquire()
+                results.append((action, response.body))
+                lock.release()
+
+        threads = [threading.Thread(target=worker, args=(index, ))
+                   for index in range(self.thread_count)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_shared_connection_concurrent_requests(self):
+        results = self._run_threads()
+
+        self.assertEqual(SigningMockHttp.errors, [])
+        self.assertEqual(len(results), self.thread_count * self.request_count)
+
+        for action, body in results:
+            self.assertEqual(action, body)
+
+    def test_shared_connection_concurrent_requests_with_pool(self):
+        self.connection.connection_pool = ConnectionPool(max_size=5)
+        results = self._run_threads()
+
+        self.assertEqual(SigningMockHttp.errors, [])
+        self.assertEqual(len(results), self.thread_count * self.request_count)
+
+        for action, body in results:
+            self.assertEqual(action, body)
+
+    def test_request_context_is_per_thread(self):
+        self.connection.action = '/main'
+
+        def worker():
+            self.connection.action = '/worker'
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(self.connection.action, '/main')
+
+    def test_raw_response_is_read_by_another_thread(self):
+        self.connection.conn_classes = (None, RawMockHttp)
+        responses = []
+
+        def worker():
+            responses.append(self.connection.request('/worker/raw',
+                                                     raw=True))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        response = self.connection.request('/main/raw', raw=True)
+        self.assertEqual(response.response.read(), '/main/raw')
+        self.assertEqual(responses[0].response.read(), '/worker/raw')
+
+DATA = '<items>%s</items>' % ('<item>value</item>' * 5000)
+
+class EncodingMockHttp(MockHttp):
+    requests = []
+
+    def _gzip(self, method, url, body, headers):
+        EncodingMockHttp.requests.append(headers)
+        return (httplib.OK, gzip_compress(DATA), {'content-encoding': 'gzip'},
+                httplib.responses[httplib.OK])
+
+    def _deflate(self, method, url, body, headers):
+        EncodingMockHttp.requests.append(headers)
+        return (httplib.OK, zlib.compress(DATA),
+                {'Content-Encoding': 'deflate'},
+                httplib.responses[httplib.OK])
+
+    def _plain(self, method, url, body, headers):
+        EncodingMockHttp.requests.append(headers)
+        return (httplib.OK, DATA, {}, httplib.responses[httplib.OK])
+
+class ContentEncodingTests(unittest.TestCase):
+
+    def setUp(self):
+        EncodingMockHttp.requests = []
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, EncodingMockHttp)
+        self.connection.driver = BaseMockDriver()
+
+    def test_accept_encoding_header(self):
+        self.connection.request('/plain')
+        self.assertEqual(EncodingMockHttp.requests[0]['Accept-Encoding'],
+                         'gzip,deflate')
+
+        self.connection.request('/plain',
+                                headers={'accept-encoding': 'identity'})
+        self.assertEqual(EncodingMockHttp.requests[1]['accept-encoding'],
+                         'identity')
+        self.assertFalse('Accept-Encoding' in EncodingMockHttp.requests[1])
+
+    def test_response_is_decompressed(self):
+        self.assertEqual(self.connection.request('/gzip').body, DATA)
+        self.assertEqual(self.connection.request('/deflate').body, DATA)
+        self.assertEqual(self.connection.request('/plain').body, DATA)
+
+    def test_decompressing_reader(self):
+        compressed = gzip_compress(DATA)
+        reader = DecompressingReader(StringIO(compressed), 'gzip',
+                                     chunk_size=100)
+        chunks = []
+
+        while True:
+            chunk = reader.read(1000)
+            if not chunk:
+                break
+            self.assertTrue(len(chunk) <= 1000)
+            chunks.append(chunk)
+
+        self.assertEqual(''.join(chunks), DATA)
+
+    def test_decompressing_reader_raw_deflate(self):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(DATA) + compressor.flush()
+        reader = DecompressingReader(StringIO(compressed), 'deflate')
+        self.assertEqual(reader.read(), DATA)
+
+class LoggingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = LoggingConnection()
+        self.connection.log = StringIO()
+
+    def _get_response(self, body):
+        return MockResponse(httplib.OK, body, {'content-type': 'text/plain'},
+                            httplib.responses[httplib.OK])
+
+    def test_response_is_logged_while_it_is_read(self):
+        response = self.connection._log_response(self._get_response('abcd'))
+        self.assertEqual(response.status, httplib.OK)
+        self.assertEqual(response.read(2), 'ab')
+        self.assertEqual(self.connection.log.getvalue(), '')
+
+        self.assertEqual(response.read(10), 'cd')
+        self.assertEqual(response.read(10), '')
+        log = self.connection.log.getvalue()
+        self.assertTrue('HTTP/1.1 200 OK\r\n' in log)
+        self.assertTrue('Content-Type: text/plain\r\n\r\nabcd\n' in log)
+
+        # Entry is written only once
+        response.read()
+        self.assertEqual(self.connection.log.getvalue(), log)
+
+    def test_logged_body_is_capped(self):
+        self.connection.log_body_max_size = 10
+        response = self.connection._log_response(
+            self._get_response('x' * 1000))
+
+        while response.read(100):
+            pass
+
+        log = self.connection.log.getvalue()
+        self.assertTrue('x' * 10 + '\n# [990 more bytes not logged]' in log)
+        self.assertFalse('x' * 11 in log)
+
+    def test_enable_debug(self):
+        old_conn_classes = ConnectionKey.conn_classes
+        old_log = LoggingHTTPConnection.log
+        fo = StringIO()
+
+        try:
+            # Log is written by the calling thread unless buffering is
+            # requested
+            libcloud.enable_debug(fo)
+            self.assertTrue(LoggingHTTPConnection.log is fo)
+
+            libcloud.enable_debug(fo, buffered=True)
+            self.assertTrue(isinstance(LoggingHTTPConnection.log,
+                                       BufferedLogWriter))
+        finally:
+            ConnectionKey.conn_classes = old_conn_classes
+            LoggingHTTPConnection.log = old_log
+            LoggingHTTPSConnection.log = old_log
+
+    def test_buffered_log_writer(self):
+        fo = StringIO()
+        writer = BufferedLogWriter(fo)
+
+        for i in range(100):
+            writer.write('%d\n' % (i))
+
+        writer.flush()
+        self.assertEqual(fo.getvalue(),
+                         ''.join(['%d\n' % (i) for i in range(100)]))
+
+    def test_buffered_log_writer_drops_entries_when_full(self):
+        lock = threading.Lock()
+
+        class BlockingFile(object):
+            log = ''
+
+            def write(self, data):
+                lock.acquire()
+                lock.release()
+                self.log += data
+
+            def flush(self):
+                pass
+
+        lock.acquire()
+        fo = BlockingFile()
+        writer = BufferedLogWriter(fo, max_queue_size=5)
+
+        for i in range(20):
+            writer.write('x')
+
+        dropped = writer.dropped
+        self.assertTrue(dropped >= 14)
+        lock.release()
+        writer.flush()
+
+        # Number of dropped entries is reported in the log
+        self.assertTrue('# [%d log entries dropped]\n' % (dropped) in fo.log)
+        self.assertEqual(fo.log.count('x'), 20 - dropped)
+
+class LazyParsingTests(unittest.TestCase):
+
+    def setUp(self):
+        CountingResponse.parsed = 0
+
+    def test_body_is_parsed_on_first_access(self):
+        response = CountingResponse(MockResponse(httplib.OK, 'a,b'))
+        self.assertEqual(response.status, httplib.OK)
+        self.assertEqual(CountingResponse.parsed, 0)
+
+        self.assertEqual(response.object, ['a', 'b'])
+        self.assertEqual(response.object, ['a', 'b'])
+        self.assertEqual(CountingResponse.parsed, 1)
+
+    def test_object_can_be_assigned(self):
+        response = CountingResponse(MockResponse(httplib.OK, 'a,b'))
+        response.object = ['c']
+        self.assertEqual(response.object, ['c'])
+        self.assertEqual(CountingResponse.parsed, 0)
+
+    def test_parse_eagerly(self):
+        CountingResponse.parse_eagerly = True
+
+        try:
+            CountingResponse(MockResponse(httplib.OK, 'a,b'))
+            self.assertEqual(CountingResponse.parsed, 1)
+        finally:
+            CountingResponse.parse_eagerly = False
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
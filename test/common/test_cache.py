@@ -0,0 +1,159 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import httplib
+import unittest
+
+from libcloud.common.cache import ResponseCache
+
+from test import MockHttp, BaseMockDriver, CountingResponse, MockConnection
+
+class EagerCountingResponse(CountingResponse):
+    # Count every response which would be parsed
+    parse_eagerly = True
+
+class ConditionalMockHttp(MockHttp):
+    requests = []
+
+    def _items(self, method, url, body, headers):
+        ConditionalMockHttp.requests.append(headers)
+
+        if headers.get('If-None-Match', None) == '"v1"':
+            return (httplib.NOT_MODIFIED, '', {'etag': '"v1"'},
+                    httplib.responses[httplib.NOT_MODIFIED])
+
+        return (httplib.OK, 'a,b,c', {'etag': '"v1"'},
+                httplib.responses[httplib.OK])
+
+    def _modified(self, method, url, body, headers):
+        ConditionalMockHttp.requests.append(headers)
+        last_modified = 'Sat, 01 Jan 2011 00:00:00 GMT'
+
+        if headers.get('If-Modified-Since', None) == last_modified:
+            return (httplib.NOT_MODIFIED, '', {},
+                    httplib.responses[httplib.NOT_MODIFIED])
+
+        return (httplib.OK, 'a', {'Last-Modified': last_modified},
+                httplib.responses[httplib.OK])
+
+    def _nocache(self, method, url, body, headers):
+        ConditionalMockHttp.requests.append(headers)
+        return (httplib.OK, 'a', {}, httplib.responses[httplib.OK])
+
+class CacheMockConnection(MockConnection):
+    responseCls = EagerCountingResponse
+    cache_ignored_params = ('nonce',)
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        CountingResponse.parsed = 0
+        ConditionalMockHttp.requests = []
+        self.connection = CacheMockConnection('key', host='example.com')
+        self.connection.conn_classes = (None, ConditionalMockHttp)
+        self.connection.driver = BaseMockDriver()
+        self.connection.response_cache = ResponseCache()
+
+    def test_etag(self):
+        response1 = self.connection.request('/items')
+        response2 = self.connection.request('/items')
+
+        self.assertEqual(response1.object, ['a', 'b', 'c'])
+        self.assertEqual(response2.status, httplib.OK)
+        self.assertEqual(response2.object, ['a', 'b', 'c'])
+        self.assertEqual(CountingResponse.parsed, 1)
+
+        self.assertFalse('If-None-Match' in ConditionalMockHttp.requests[0])
+        self.assertEqual(ConditionalMockHttp.requests[1]['If-None-Match'],
+                         '"v1"')
+
+        # Callers can modify the headers without affecting the cache
+        response2.headers.pop('etag')
+        self.connection.request('/items')
+        self.assertEqual(CountingResponse.parsed, 1)
+
+    def test_last_modified(self):
+        self.connection.request('/modified')
+        response = self.connection.request('/modified')
+        self.assertEqual(response.object, ['a'])
+        self.assertEqual(CountingResponse.parsed, 1)
+
+    def test_params_are_part_of_the_key(self):
+        self.connection.request('/items', params={'a': '1'})
+        self.connection.request('/items', params={'a': '2'})
+        self.assertEqual(CountingResponse.parsed, 2)
+
+        self.connection.request('/items', params={'a': '2', 'nonce': 'x'})
+        self.assertEqual(CountingResponse.parsed, 2)
+
+    def test_responses_without_validators_are_not_cached(self):
+        self.connection.request('/nocache')
+        self.connection.request('/nocache')
+        self.assertEqual(CountingResponse.parsed, 2)
+        self.assertEqual(len(self.connection.response_cache), 0)
+
+    def test_copied_responses_share_the_parsed_body(self):
+        EagerCountingResponse.parse_eagerly = False
+
+        try:
+            self.connection.request('/items')
+            response1 = self.connection.request('/items')
+            response2 = self.connection.request('/items')
+            self.assertEqual(response1.object, ['a', 'b', 'c'])
+            self.assertEqual(response2.object, ['a', 'b', 'c'])
+            self.assertEqual(CountingResponse.parsed, 1)
+        finally:
+            EagerCountingResponse.parse_eagerly = True
+
+    def test_streamed_response(self):
+        response1 = self.connection.request('/items', stream=True)
+        response2 = self.connection.request('/items', stream=True)
+
+        self.assertEqual(response1.body.read(), 'a,b,c')
+        self.assertEqual(response2.status, httplib.OK)
+        self.assertEqual(response2.body.read(), 'a,b,c')
+        self.assertEqual(ConditionalMockHttp.requests[1]['If-None-Match'],
+                         '"v1"')
+        self.assertEqual(CountingResponse.parsed, 0)
+
+        # Parsed response is cached separately
+        response = self.connection.request('/items')
+        self.assertEqual(response.object, ['a', 'b', 'c'])
+        self.assertFalse('If-None-Match' in ConditionalMockHttp.requests[2])
+
+    def test_only_get_requests_are_cached(self):
+        self.connection.request('/items', method='POST')
+        self.connection.request('/items', method='POST')
+        self.assertEqual(CountingResponse.parsed, 2)
+
+    def test_max_size(self):
+        cache = ResponseCache(max_size=2)
+        self.connection.response_cache = cache
+
+        self.connection.request('/items', params={'a': '1'})
+        self.connection.request('/items', params={'a': '2'})
+        # Mark the first entry as recently used
+        self.connection.request('/items', params={'a': '1'})
+        self.connection.request('/items', params={'a': '3'})
+        self.assertEqual(len(cache), 2)
+
+        self.connection.request('/items', params={'a': '1'})
+        self.assertEqual(CountingResponse.parsed, 3)
+        self.connection.request('/items', params={'a': '2'})
+        self.assertEqual(CountingResponse.parsed, 4)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
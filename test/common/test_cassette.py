@@ -0,0 +1,170 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import time
+import shutil
+import httplib
+import tempfile
+import unittest
+import threading
+
+from libcloud.common.base import ConnectionKey
+from libcloud.common.types import LibcloudError
+from libcloud.common.cassette import Cassette, RecordingConnection
+
+from test import MockHttp, BaseMockDriver
+
+class RecordedMockHttp(MockHttp):
+    counter = 0
+
+    def _items(self, method, url, body, headers):
+        RecordedMockHttp.counter += 1
+        body = 'response %d to %s' % (RecordedMockHttp.counter, url)
+        return (httplib.OK, body, {'x-foo': 'bar'},
+                httplib.responses[httplib.OK])
+
+    def _other(self, method, url, body, headers):
+        return (httplib.OK, 'other', {}, httplib.responses[httplib.OK])
+
+    def _object(self, method, url, body, headers):
+        return (httplib.OK, '', {'content-length': '12345'},
+                httplib.responses[httplib.OK])
+
+class MockRecordingConnection(RecordingConnection, RecordedMockHttp):
+    connection_cls = RecordedMockHttp
+
+class CacheBustingConnection(ConnectionKey):
+    cache_ignored_params = ('cache-busing',)
+
+class CassetteTests(unittest.TestCase):
+
+    def setUp(self):
+        RecordedMockHttp.counter = 0
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'test.cassette')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _get_connection(self, cassette, mode, connection_cls=ConnectionKey):
+        connection = connection_cls('key', host='127.0.0.1', secure=False)
+        connection.driver = BaseMockDriver()
+        connection.conn_classes = cassette.get_connection_classes(
+            mode, connection_cls)
+        return connection
+
+    def _record(self):
+        cassette = Cassette(self.path)
+        connection = self._get_connection(cassette, 'record')
+        # Real connection classes are replaced by a mock
+        connection.conn_classes = (type('MockRecordingConnection',
+                                        (MockRecordingConnection, ),
+                                        {'cassette': cassette}), None)
+        responses = [
+            connection.request('/items', params={'Signature': '1'}),
+            connection.request('/items', params={'Signature': '2'}),
+            connection.request('/other'),
+            connection.request('/object', method='HEAD')]
+        cassette.save()
+        return responses
+
+    def test_record_and_replay(self):
+        recorded = self._record()
+        self.assertEqual(recorded[0].body, 'response 1 to /items?Signature=1')
+        self.assertEqual(recorded[0].headers['x-foo'], 'bar')
+
+        cassette = Cassette(self.path)
+        self.assertEqual(len(cassette.exchanges), 4)
+        connection = self._get_connection(cassette, 'replay')
+
+        # Signature is ignored, responses are replayed in order
+        for i in range(2):
+            response = connection.request('/items', params={'Signature': 'x'})
+            self.assertEqual(response.body, recorded[0].body)
+            self.assertEqual(response.headers['x-foo'], 'bar')
+            response = connection.request('/items', params={'Signature': 'y'})
+            self.assertEqual(response.body, recorded[1].body)
+
+        self.assertEqual(connection.request('/other').body, recorded[2].body)
+
+        response = connection.request('/object', method='HEAD')
+        self.assertEqual(response.body, '')
+        self.assertEqual(response.headers['content-length'], '12345')
+
+        self.assertRaises(LibcloudError, connection.request, '/unknown')
+
+    def test_connection_ignored_params(self):
+        cassette = Cassette(self.path)
+        cassette.add(method='GET', host='127.0.0.1',
+                     url='/items?cache-busing=abcd&id=1', status=httplib.OK,
+                     reason='OK', headers=[], body='ok')
+
+        connection = self._get_connection(cassette, 'replay')
+        self.assertRaises(LibcloudError, connection.request, '/items',
+                          params={'cache-busing': 'efgh', 'id': '1'})
+
+        connection = self._get_connection(cassette, 'replay',
+                                          CacheBustingConnection)
+        response = connection.request('/items',
+                                      params={'cache-busing': 'efgh',
+                                              'id': '1'})
+        self.assertEqual(response.body, 'ok')
+        self.assertRaises(LibcloudError, connection.request, '/items',
+                          params={'cache-busing': 'efgh', 'id': '2'})
+
+    def test_requests_are_matched_by_body(self):
+        cassette = Cassette(self.path)
+        connection = self._get_connection(cassette, 'record')
+        connection.conn_classes = (type('MockRecordingConnection',
+                                        (MockRecordingConnection, ),
+                                        {'cassette': cassette}), None)
+        first = connection.request('/items', data='first', method='POST')
+        second = connection.request('/items', data='second', method='POST')
+        cassette.save()
+
+        connection = self._get_connection(Cassette(self.path), 'replay')
+
+        for i in range(2):
+            response = connection.request('/items', data='second',
+                                          method='POST')
+            self.assertEqual(response.body, second.body)
+
+        response = connection.request('/items', data='first', method='POST')
+        self.assertEqual(response.body, first.body)
+        self.assertRaises(LibcloudError, connection.request, '/items',
+                          data='third', method='POST')
+
+    def test_replay_latency_and_concurrency(self):
+        cassette = Cassette(self.path, latency=0.05, max_concurrency=1)
+        cassette.add(method='GET', host='127.0.0.1', url='/items',
+                     status=httplib.OK, reason='OK', headers=[], body='ok')
+        connection = self._get_connection(cassette, 'replay')
+
+        threads = [threading.Thread(target=connection.request,
+                                    args=('/items', )) for i in range(4)]
+        start = time.time()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(time.time() - start >= 0.2)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,209 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import with_statement
+
+import sys
+import time
+import socket
+import httplib
+import unittest
+
+from libcloud.common.base import ConnectionKey
+from libcloud.common.types import CircuitOpenError, LibcloudError
+from libcloud.common.circuitbreaker import CircuitBreaker
+from libcloud.common.circuitbreaker import CLOSED, OPEN, HALF_OPEN
+from libcloud.common.deadline import Deadline
+
+from test import MockHttp, BaseMockDriver, FakeClock
+
+class FailingMockHttp(MockHttp):
+    requests = 0
+    status = httplib.OK
+
+    def _test(self, method, url, body, headers):
+        FailingMockHttp.requests += 1
+        status = FailingMockHttp.status
+        return (status, 'body', {}, httplib.responses[status])
+
+    def _broken(self, method, url, body, headers):
+        FailingMockHttp.requests += 1
+        raise socket.error('connection refused')
+
+    def _slow(self, method, url, body, headers):
+        # Socket timeout capped by the deadline of the caller
+        FailingMockHttp.requests += 1
+        time.sleep(0.02)
+        raise socket.timeout('timed out')
+
+KEY = (BaseMockDriver, 'example.com')
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10,
+                                      clock=self.clock)
+
+    def _fail(self, count):
+        for i in range(count):
+            self.breaker.record_failure(KEY)
+
+    def test_opens_after_consecutive_failures(self):
+        self._fail(2)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+        self.breaker.before_request(KEY)
+
+        self._fail(1)
+        self.assertEqual(self.breaker.get_state(KEY), OPEN)
+
+        try:
+            self.breaker.before_request(KEY)
+        except CircuitOpenError, e:
+            self.assertTrue(isinstance(e, LibcloudError))
+            self.assertEqual(e.host, 'example.com')
+            self.assertEqual(e.retry_after, 10)
+        else:
+            self.fail('Exception was not thrown')
+
+    def test_success_resets_failure_count(self):
+        self._fail(2)
+        self.breaker.record_success(KEY)
+        self._fail(2)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+
+    def test_circuits_are_per_key(self):
+        self._fail(3)
+        other = (BaseMockDriver, 'other.example.com')
+        self.assertEqual(self.breaker.get_state(other), CLOSED)
+        self.breaker.before_request(other)
+
+    def test_half_open_probe_closes_circuit(self):
+        self._fail(3)
+        self.clock.now += 10
+        self.assertEqual(self.breaker.get_state(KEY), HALF_OPEN)
+
+        # Only one probe is let through
+        self.breaker.before_request(KEY)
+        self.assertRaises(CircuitOpenError, self.breaker.before_request, KEY)
+
+        self.breaker.record_success(KEY)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+        self.breaker.before_request(KEY)
+
+    def test_failed_probe_opens_circuit(self):
+        self._fail(3)
+        self.clock.now += 10
+        self.breaker.before_request(KEY)
+        self._fail(1)
+        self.assertEqual(self.breaker.get_state(KEY), OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.before_request, KEY)
+
+    def test_lost_probe_expires(self):
+        self._fail(3)
+        self.clock.now += 10
+        self.breaker.before_request(KEY)
+        self.clock.now += 10
+        self.breaker.before_request(KEY)
+
+    def test_slow_responses_count_as_failures(self):
+        self.breaker.slow_threshold = 1.0
+        self.breaker.record_result(KEY, status=200, elapsed=0.5)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+
+        for i in range(3):
+            self.breaker.record_result(KEY, status=200, elapsed=2.0)
+
+        self.assertEqual(self.breaker.get_state(KEY), OPEN)
+
+    def test_server_errors_count_as_failures(self):
+        self.breaker.record_result(KEY, status=404)
+
+        for i in range(3):
+            self.breaker.record_result(KEY, status=503)
+
+        self.assertEqual(self.breaker.get_state(KEY), OPEN)
+
+    def test_reset(self):
+        self._fail(3)
+        self.breaker.reset(KEY)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+
+class ConnectionCircuitBreakerTests(unittest.TestCase):
+
+    def setUp(self):
+        FailingMockHttp.requests = 0
+        FailingMockHttp.status = httplib.OK
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10,
+                                      clock=self.clock)
+        self.driver = BaseMockDriver()
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, FailingMockHttp)
+        self.connection.driver = self.driver
+        self.connection.circuit_breaker = self.breaker
+
+    def test_fails_fast_on_server_errors(self):
+        FailingMockHttp.status = httplib.INTERNAL_SERVER_ERROR
+
+        for i in range(2):
+            self.assertRaises(Exception, self.connection.request, '/test')
+
+        try:
+            self.connection.request('/test')
+        except CircuitOpenError, e:
+            self.assertEqual(e.driver, self.driver)
+        else:
+            self.fail('Exception was not thrown')
+
+        self.assertEqual(FailingMockHttp.requests, 2)
+
+        # Probe succeeds and closes the circuit
+        FailingMockHttp.status = httplib.OK
+        self.clock.now += 10
+        self.connection.request('/test')
+        self.connection.request('/test')
+        self.assertEqual(FailingMockHttp.requests, 4)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+
+    def test_connection_errors_count_as_failures(self):
+        for i in range(2):
+            self.assertRaises(socket.error, self.connection.request,
+                              '/broken')
+
+        self.assertRaises(CircuitOpenError, self.connection.request,
+                          '/broken')
+        self.assertEqual(FailingMockHttp.requests, 2)
+
+    def test_deadline_timeouts_are_not_failures(self):
+        def request():
+            with Deadline(0.01):
+                self.connection.request('/slow')
+
+        for i in range(3):
+            self.assertRaises(socket.timeout, request)
+
+        self.assertEqual(FailingMockHttp.requests, 3)
+        self.assertEqual(self.breaker.get_state(KEY), CLOSED)
+
+        # Timeouts without a deadline are
+        for i in range(2):
+            self.assertRaises(socket.timeout, self.connection.request,
+                              '/slow')
+
+        self.assertEqual(self.breaker.get_state(KEY), OPEN)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,143 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import with_statement
+
+import sys
+import socket
+import httplib
+import unittest
+
+from libcloud.common.base import ConnectionKey, ConnectionPool
+from libcloud.common.types import DeadlineExceededError
+from libcloud.common.deadline import Deadline, get_remaining, get_timeout
+from libcloud.common.deadline import check_deadline
+
+from test import MockHttp, BaseMockDriver
+
+class FakeSocket(object):
+    timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+class TimeoutMockHttp(MockHttp):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super(TimeoutMockHttp, self).__init__(*args, **kwargs)
+        self.sock = None
+        self.timeout = None
+        self.connect_timeout = None
+        TimeoutMockHttp.instances.append(self)
+
+    def connect(self):
+        self.connect_timeout = self.timeout
+        self.sock = FakeSocket()
+
+    def _test(self, method, url, body, headers):
+        return (httplib.OK, 'ok', {}, httplib.responses[httplib.OK])
+
+    def _timeout(self, method, url, body, headers):
+        raise socket.timeout('timed out')
+
+class DeadlineTests(unittest.TestCase):
+
+    def test_no_deadline(self):
+        self.assertEqual(get_remaining(), None)
+        self.assertEqual(get_timeout(None), None)
+        self.assertEqual(get_timeout(5), 5)
+        check_deadline()
+
+    def test_timeout_is_capped(self):
+        with Deadline(10):
+            self.assertTrue(get_timeout(None) <= 10)
+            self.assertTrue(get_timeout(20) <= 10)
+            self.assertEqual(get_timeout(1), 1)
+
+        self.assertEqual(get_remaining(), None)
+
+    def test_nested_deadline_can_only_shorten(self):
+        with Deadline(1):
+            with Deadline(100):
+                self.assertTrue(get_remaining() <= 1)
+
+            with Deadline(0):
+                self.assertRaises(DeadlineExceededError, check_deadline)
+
+            self.assertTrue(get_remaining() > 0)
+
+    def test_expired_deadline(self):
+        with Deadline(0):
+            self.assertRaises(DeadlineExceededError, get_timeout, 5)
+
+class ConnectionTimeoutTests(unittest.TestCase):
+
+    def setUp(self):
+        TimeoutMockHttp.instances = []
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, TimeoutMockHttp)
+        self.connection.driver = BaseMockDriver()
+
+    def test_no_timeouts(self):
+        self.connection.request('/test')
+        connection = TimeoutMockHttp.instances[0]
+        # httplib connects lazily
+        self.assertEqual(connection.sock, None)
+
+    def test_connect_and_read_timeouts(self):
+        self.connection.connect_timeout = 2
+        self.connection.read_timeout = 10
+        self.connection.request('/test')
+        connection = TimeoutMockHttp.instances[0]
+        self.assertEqual(connection.connect_timeout, 2)
+        self.assertEqual(connection.sock.timeout, 10)
+
+    def test_read_timeout_is_capped_by_deadline(self):
+        self.connection.read_timeout = 10
+
+        with Deadline(5):
+            self.connection.request('/test')
+
+        self.assertTrue(TimeoutMockHttp.instances[0].sock.timeout <= 5)
+
+    def test_reused_connection_timeout_is_reset(self):
+        self.connection.connection_pool = ConnectionPool()
+
+        with Deadline(5):
+            self.connection.request('/test')
+
+        connection = TimeoutMockHttp.instances[0]
+        self.assertTrue(connection.sock.timeout <= 5)
+
+        self.connection.request('/test')
+        self.assertEqual(len(TimeoutMockHttp.instances), 1)
+        self.assertEqual(connection.sock.timeout, socket.getdefaulttimeout())
+
+    def test_expired_deadline(self):
+        def request():
+            with Deadline(0):
+                self.connection.request('/test')
+
+        self.assertRaises(DeadlineExceededError, request)
+        self.assertEqual(TimeoutMockHttp.instances, [])
+
+    def test_timeout_is_raised(self):
+        self.connection.read_timeout = 1
+        self.assertRaises(socket.timeout, self.connection.request,
+                          '/timeout')
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,248 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+import threading
+import unittest
+
+from libcloud.common.types import LazyList
+from libcloud.common.futures import Future, WorkerPool, AsyncDriver
+from libcloud.common.futures import BatchExecutor, DEFAULT_MAX_WORKERS
+from libcloud.common.futures import get_default_pool, set_default_max_workers
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+from libcloud.storage.drivers.dummy import DummyStorageDriver
+from libcloud.storage.drivers.dummy import DummyFileObject
+from libcloud.storage.types import ContainerDoesNotExistError
+
+class FutureTests(unittest.TestCase):
+
+    def test_result(self):
+        future = Future()
+        self.assertFalse(future.done())
+        future.set_result(5)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 5)
+        self.assertEqual(future.exception(), None)
+
+    def test_exception(self):
+        future = Future()
+
+        try:
+            raise ValueError('foo')
+        except ValueError:
+            future.set_exception_info(sys.exc_info())
+
+        self.assertRaises(ValueError, future.result)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+    def test_timeout(self):
+        future = Future()
+        self.assertRaises(RuntimeError, future.result, 0.01)
+
+    def test_done_callback(self):
+        called = []
+        future = Future()
+        future.add_done_callback(called.append)
+        self.assertEqual(called, [])
+        future.set_result(None)
+        self.assertEqual(called, [future])
+
+        future.add_done_callback(called.append)
+        self.assertEqual(called, [future, future])
+
+class WorkerPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(max_workers=3)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        futures = [self.pool.submit(lambda x: x * 2, i) for i in range(10)]
+        self.assertEqual([f.result() for f in futures],
+                         [i * 2 for i in range(10)])
+
+    def test_max_workers(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'max_running': 0}
+
+        def work():
+            lock.acquire()
+            state['running'] += 1
+            state['max_running'] = max(state['max_running'],
+                                       state['running'])
+            lock.release()
+            time.sleep(0.01)
+            lock.acquire()
+            state['running'] -= 1
+            lock.release()
+
+        futures = [self.pool.submit(work) for i in range(12)]
+
+        for future in futures:
+            future.result()
+
+        self.assertEqual(state['max_running'], 3)
+
+    def test_submit_after_shutdown(self):
+        self.pool.shutdown()
+        self.assertRaises(RuntimeError, self.pool.submit, lambda: None)
+
+    def test_set_default_max_workers(self):
+        pool = get_default_pool()
+        self.assertEqual(pool.max_workers, DEFAULT_MAX_WORKERS)
+
+        try:
+            set_default_max_workers(50)
+            self.assertTrue(get_default_pool() is pool)
+            self.assertEqual(pool.max_workers, 50)
+            self.assertRaises(ValueError, set_default_max_workers, 0)
+        finally:
+            set_default_max_workers(DEFAULT_MAX_WORKERS)
+
+class AsyncDriverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(max_workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_compute_driver(self):
+        driver = AsyncDriver(DummyNodeDriver(0), pool=self.pool)
+        nodes = driver.list_nodes().result()
+        self.assertEqual(len(nodes), 2)
+        self.assertTrue(driver.reboot_node(nodes[0]).result())
+        self.assertEqual(driver.name, 'Dummy Node Provider')
+
+    def test_storage_driver(self):
+        driver = AsyncDriver(DummyStorageDriver('key', 'secret'),
+                             pool=self.pool)
+        container = driver.create_container('test').result()
+        obj = driver.upload_object_via_stream(DummyFileObject(5, 10),
+                                              container, 'test').result()
+        self.assertEqual(obj.size, 50)
+        self.assertEqual(driver.get_object('test', 'test').result().name,
+                         'test')
+
+    def test_lazy_list_is_loaded_by_the_worker(self):
+        class LazyListDriver(object):
+            def list_container_objects(self, container):
+                return LazyList(get_more=self._get_more)
+
+            def _get_more(self, last_key, value_dict):
+                last_key = (last_key or 0) + 1
+                return [last_key], last_key, last_key == 3
+
+        driver = AsyncDriver(LazyListDriver(), pool=self.pool)
+        objects = driver.list_container_objects(None).result()
+        self.assertTrue(objects._all_loaded)
+        self.assertEqual(list(objects), [1, 2, 3])
+
+    def test_exception_is_propagated(self):
+        driver = AsyncDriver(DummyStorageDriver('key', 'secret'),
+                             pool=self.pool)
+        future = driver.get_container('inexistent')
+        self.assertRaises(ContainerDoesNotExistError, future.result)
+
+class ConcurrencyMockDriver(object):
+    max_concurrent_requests = 2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def get_object(self, name):
+        self.lock.acquire()
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.lock.release()
+
+        time.sleep(0.01)
+
+        self.lock.acquire()
+        self.running -= 1
+        self.lock.release()
+
+        if name == 'error':
+            raise ValueError(name)
+
+        return name
+
+class BatchExecutorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(max_workers=5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_results_are_returned_in_order(self):
+        driver = DummyNodeDriver(5)
+        nodes = driver.list_nodes()
+        batch = BatchExecutor(driver, pool=self.pool)
+
+        for node in nodes:
+            batch.add('reboot_node', node)
+        batch.add(lambda: 'last')
+
+        self.assertEqual(batch.run(), [True] * len(nodes) + ['last'])
+
+    def test_exceptions_are_returned_in_place(self):
+        driver = ConcurrencyMockDriver()
+        batch = BatchExecutor(driver, pool=self.pool)
+        results = batch.map('get_object', ['a', 'error', 'b'])
+
+        self.assertEqual(results[0], 'a')
+        self.assertTrue(isinstance(results[1], ValueError))
+        self.assertEqual(results[2], 'b')
+
+    def test_provider_concurrency_limit(self):
+        driver = ConcurrencyMockDriver()
+        batch = BatchExecutor(driver, pool=self.pool)
+        names = [str(i) for i in range(10)]
+
+        self.assertEqual(batch.map(driver.get_object, names), names)
+        self.assertEqual(driver.max_running, 2)
+
+    def test_max_concurrency_override(self):
+        driver = ConcurrencyMockDriver()
+        batch = BatchExecutor(driver, max_concurrency=1, pool=self.pool)
+        batch.map('get_object', ['a', 'b', 'c'])
+        self.assertEqual(driver.max_running, 1)
+
+    def test_limit_is_not_replaced_by_a_different_limit(self):
+        driver = ConcurrencyMockDriver()
+        batch1 = BatchExecutor(driver, max_concurrency=1, pool=self.pool)
+        semaphore = batch1._get_semaphore()
+
+        batch2 = BatchExecutor(driver, max_concurrency=3, pool=self.pool)
+        self.assertFalse(batch2._get_semaphore() is semaphore)
+        self.assertTrue(batch1._get_semaphore() is semaphore)
+
+        batch3 = BatchExecutor(driver, max_concurrency=1, pool=self.pool)
+        self.assertTrue(batch3._get_semaphore() is semaphore)
+
+    def test_driver_batch(self):
+        driver = DummyStorageDriver('key', 'secret')
+        batch = driver.batch(max_concurrency=3)
+        self.assertTrue(isinstance(batch, BatchExecutor))
+        self.assertEqual(batch.max_concurrency, 3)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,199 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import with_statement
+
+import sys
+import socket
+import httplib
+import unittest
+
+from cStringIO import StringIO
+
+from libcloud.common.base import ConnectionKey
+from libcloud.common.metrics import RequestMetrics, MeteredResponse
+from libcloud.common.metrics import HistogramAggregator, DriverMethod
+from libcloud.common.metrics import get_driver_method
+from libcloud.common.futures import AsyncDriver, BatchExecutor
+
+from test import MockHttp
+
+class ListSink(object):
+    def __init__(self):
+        self.metrics = []
+
+    def record(self, metrics):
+        self.metrics.append(metrics)
+
+class MetricsMockHttp(MockHttp):
+    def _items(self, method, url, body, headers):
+        return (httplib.OK, 'x' * 100, {}, httplib.responses[httplib.OK])
+
+    def _error(self, method, url, body, headers):
+        return (httplib.NOT_FOUND, 'not found', {},
+                httplib.responses[httplib.NOT_FOUND])
+
+    def _broken(self, method, url, body, headers):
+        raise socket.error(104, 'Connection reset by peer')
+
+class MockDriver(object):
+    name = 'Mock Provider'
+
+    def __init__(self):
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, MetricsMockHttp)
+        self.connection.driver = self
+
+    def list_items(self):
+        return self._get_items()
+
+    def _get_items(self):
+        return self.connection.request('/items', method='POST',
+                                       data='abcd').object
+
+class ConnectionMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = ListSink()
+        self.driver = MockDriver()
+        self.driver.connection.metrics_sink = self.sink
+
+    def test_metrics_are_reported(self):
+        with DriverMethod(self.driver, 'list_items'):
+            self.driver.list_items()
+        self.assertEqual(len(self.sink.metrics), 1)
+
+        metrics = self.sink.metrics[0]
+        self.assertEqual(metrics.provider, 'Mock Provider')
+        self.assertEqual(metrics.driver_method, 'list_items')
+        self.assertEqual(metrics.method, 'POST')
+        self.assertEqual(metrics.action, '/items')
+        self.assertEqual(metrics.status, httplib.OK)
+        self.assertEqual(metrics.bytes_sent, 4)
+        self.assertEqual(metrics.bytes_received, 100)
+        self.assertEqual(metrics.error, None)
+        self.assertTrue(metrics.connect_time >= 0)
+        self.assertTrue(0 <= metrics.ttfb <= metrics.total_time)
+
+    def test_outermost_driver_method(self):
+        with DriverMethod(self.driver, 'list_all'):
+            with DriverMethod(self.driver, 'list_items'):
+                self.assertEqual(get_driver_method(self.driver), 'list_all')
+                self.driver.list_items()
+
+        self.assertEqual(self.sink.metrics[0].driver_method, 'list_all')
+        self.assertEqual(get_driver_method(self.driver), None)
+
+    def test_driver_method_without_sink(self):
+        self.driver.connection.metrics_sink = None
+
+        with DriverMethod(self.driver, 'list_items'):
+            self.assertEqual(get_driver_method(self.driver), None)
+
+    def test_driver_method_is_not_recorded_by_default(self):
+        self.driver.list_items()
+        self.assertEqual(self.sink.metrics[0].driver_method, None)
+
+    def test_async_driver_method(self):
+        AsyncDriver(self.driver).list_items().result()
+        self.assertEqual(self.sink.metrics[0].driver_method, 'list_items')
+
+    def test_batch_driver_method(self):
+        batch = BatchExecutor(self.driver)
+        batch.add('list_items')
+        batch.add(self.driver.list_items)
+        batch.add(lambda: self.driver.list_items())
+        batch.run()
+
+        methods = sorted([str(metrics.driver_method)
+                          for metrics in self.sink.metrics])
+        self.assertEqual(methods, ['None', 'list_items', 'list_items'])
+
+    def test_error_response(self):
+        self.assertRaises(Exception, self.driver.connection.request,
+                          '/error')
+        self.assertEqual(len(self.sink.metrics), 1)
+        self.assertEqual(self.sink.metrics[0].status, httplib.NOT_FOUND)
+        self.assertEqual(self.sink.metrics[0].driver_method, None)
+
+    def test_failed_request(self):
+        self.assertRaises(socket.error, self.driver.connection.request,
+                          '/broken')
+        self.assertEqual(len(self.sink.metrics), 1)
+        self.assertTrue(isinstance(self.sink.metrics[0].error, socket.error))
+        self.assertEqual(self.sink.metrics[0].status, None)
+
+    def test_broken_sink(self):
+        class BrokenSink(object):
+            def record(self, metrics):
+                raise ValueError()
+
+        self.driver.connection.metrics_sink = BrokenSink()
+        self.assertEqual(self.driver.list_items(), 'x' * 100)
+
+class MeteredResponseTests(unittest.TestCase):
+
+    def test_metrics_are_reported_at_eof(self):
+        sink = ListSink()
+        metrics = RequestMetrics()
+        response = MeteredResponse(StringIO('a' * 25), metrics, sink)
+
+        self.assertEqual(response.read(10), 'a' * 10)
+        self.assertEqual(response.read(20), 'a' * 15)
+        self.assertEqual(sink.metrics, [])
+        self.assertEqual(response.read(10), '')
+        self.assertEqual(response.read(10), '')
+        self.assertEqual(sink.metrics, [metrics])
+        self.assertEqual(metrics.bytes_received, 25)
+
+class HistogramAggregatorTests(unittest.TestCase):
+
+    def test_aggregation(self):
+        aggregator = HistogramAggregator(buckets=(0.1, 1, 10))
+
+        for i in range(100):
+            metrics = RequestMetrics(provider='p', driver_method='list_nodes',
+                                     method='GET')
+            metrics.status = httplib.OK
+            metrics.bytes_received = 10
+            metrics.total_time = 0.05
+            if i >= 90:
+                metrics.total_time = 5
+            if i == 99:
+                metrics.total_time = 20
+                metrics.status = httplib.SERVICE_UNAVAILABLE
+            aggregator.record(metrics)
+
+        stats = aggregator.get_stats()[('p', 'list_nodes', 'GET')]
+        self.assertEqual(stats['count'], 100)
+        self.assertEqual(stats['bytes_received'], 1000)
+        self.assertEqual(stats['statuses'], {200: 99, 503: 1})
+
+        total_time = stats['total_time']
+        self.assertEqual(total_time['count'], 100)
+        self.assertEqual(total_time['min'], 0.05)
+        self.assertEqual(total_time['max'], 20)
+        self.assertEqual(total_time['p50'], 0.1)
+        self.assertEqual(total_time['p90'], 0.1)
+        self.assertEqual(total_time['p99'], 10)
+        self.assertEqual(total_time['buckets'],
+                         [(0.1, 90), (1, 0), (10, 9), (None, 1)])
+        self.assertEqual(stats['ttfb']['count'], 0)
+
+        aggregator.reset()
+        self.assertEqual(aggregator.get_stats(), {})
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,146 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import httplib
+import unittest
+
+from libcloud.common.base import ConnectionKey
+from libcloud.common.ratelimit import TokenBucket, RateLimiter
+
+from test import MockHttp, BaseMockDriver, FakeClock
+
+class ThrottlingMockHttp(MockHttp):
+    throttled_count = 0
+    requests = 0
+
+    def _test(self, method, url, body, headers):
+        ThrottlingMockHttp.requests += 1
+
+        if ThrottlingMockHttp.requests <= ThrottlingMockHttp.throttled_count:
+            return (httplib.SERVICE_UNAVAILABLE, 'slow down',
+                    {'retry-after': '2'},
+                    httplib.responses[httplib.SERVICE_UNAVAILABLE])
+
+        return (httplib.OK, 'ok', {}, httplib.responses[httplib.OK])
+
+class TokenBucketTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_reserve(self):
+        bucket = TokenBucket(rate=2, capacity=2, clock=self.clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+        # Reservations are queued
+        self.assertEqual(bucket.reserve(), 1.0)
+
+        self.clock.now += 1.0
+        self.assertEqual(bucket.reserve(), 0.5)
+
+    def test_refill_is_capped(self):
+        bucket = TokenBucket(rate=1, capacity=2, tokens=0, clock=self.clock)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+        self.clock.now += 100
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+    def test_drain(self):
+        bucket = TokenBucket(rate=1, capacity=5, clock=self.clock)
+        bucket.drain()
+        self.assertEqual(bucket.reserve(), 1.0)
+
+class RateLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.slept = []
+        self.limiter = RateLimiter()
+        self.limiter.sleep = self.slept.append
+
+    def test_from_limits(self):
+        limits = [
+            {'verb': 'POST', 'regex': '^/servers', 'value': '2',
+             'unit': 'MINUTE', 'remaining': '1'},
+            {'verb': 'GET', 'regex': '.*', 'value': '600',
+             'unit': 'MINUTE', 'remaining': '600'}]
+        limiter = RateLimiter.from_limits(limits, path_prefix='/v1.0/1234')
+        limiter.sleep = self.slept.append
+
+        self.assertEqual(limiter.wait('POST', '/v1.0/1234/servers'), 0)
+        self.assertTrue(limiter.wait('POST', '/v1.0/1234/servers') > 0)
+        self.assertEqual(len(self.slept), 1)
+
+        # Different verb / path
+        self.assertEqual(limiter.wait('POST', '/v1.0/1234/images'), 0)
+        self.assertEqual(limiter.wait('GET', '/v1.0/1234/servers'), 0)
+
+    def test_backoff_delay(self):
+        self.limiter.backoff_base = 1
+        self.limiter.backoff_max = 10
+
+        for attempt in range(10):
+            delay = self.limiter.get_backoff_delay(attempt)
+            self.assertTrue(0 <= delay <= min(10, 2 ** attempt))
+
+        delay = self.limiter.get_backoff_delay(0, {'Retry-After': '5'})
+        self.assertEqual(delay, 5)
+
+class ConnectionRateLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        ThrottlingMockHttp.requests = 0
+        ThrottlingMockHttp.throttled_count = 0
+        self.slept = []
+        self.connection = ConnectionKey('key', host='example.com')
+        self.connection.conn_classes = (None, ThrottlingMockHttp)
+        self.connection.driver = BaseMockDriver()
+        self.connection.rate_limiter = RateLimiter(max_retries=3)
+        self.connection.rate_limiter.sleep = self.slept.append
+
+    def test_throttled_request_is_retried(self):
+        ThrottlingMockHttp.throttled_count = 2
+        response = self.connection.request('/test')
+
+        self.assertEqual(response.status, httplib.OK)
+        self.assertEqual(ThrottlingMockHttp.requests, 3)
+        self.assertEqual(len(self.slept), 2)
+        # Retry-After header is honored
+        self.assertTrue(min(self.slept) >= 2)
+
+    def test_max_retries(self):
+        ThrottlingMockHttp.throttled_count = 10
+        self.assertRaises(Exception, self.connection.request, '/test')
+        self.assertEqual(ThrottlingMockHttp.requests, 4)
+
+    def test_requests_are_scheduled(self):
+        self.connection.rate_limiter.add_limit(value=1, unit='MINUTE')
+        self.connection.request('/test')
+        self.assertEqual(self.slept, [])
+        self.connection.request('/test')
+        self.assertEqual(len(self.slept), 1)
+        self.assertTrue(59 < self.slept[0] <= 60)
+
+    def test_no_rate_limiter(self):
+        self.connection.rate_limiter = None
+        ThrottlingMockHttp.throttled_count = 1
+        self.assertRaises(Exception, self.connection.request, '/test')
+        self.assertEqual(ThrottlingMockHttp.requests, 1)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,71 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import hmac
+import base64
+import unittest
+
+from hashlib import sha1, sha256, md5
+
+from libcloud.common import signing
+from libcloud.common.signing import sign, get_hmac, get_prefixed_hash
+from libcloud.common.signing import canonical_query_string
+
+class SigningTests(unittest.TestCase):
+
+    def setUp(self):
+        signing.clear_cache()
+
+    def test_sign(self):
+        for digestmod in [sha1, sha256]:
+            expected = base64.b64encode(
+                hmac.new('secret', 'data', digestmod).digest())
+            self.assertEqual(sign('secret', 'data', digestmod), expected)
+            # Cached prototype is not modified
+            self.assertEqual(sign('secret', 'data', digestmod), expected)
+
+        self.assertEqual(len(signing._hmacs), 2)
+
+    def test_get_hmac_returns_copy(self):
+        first = get_hmac('secret')
+        first.update('data')
+        second = get_hmac('secret')
+        self.assertNotEqual(first.digest(), second.digest())
+        self.assertEqual(second.digest(),
+                         hmac.new('secret', '', sha1).digest())
+
+    def test_cache_is_bounded(self):
+        for i in range(signing.MAX_CACHE_SIZE + 10):
+            sign('secret%d' % (i), 'data')
+
+        self.assertTrue(len(signing._hmacs) <= signing.MAX_CACHE_SIZE)
+
+        signing.clear_cache()
+        self.assertEqual(len(signing._hmacs), 0)
+
+    def test_get_prefixed_hash(self):
+        for i in range(2):
+            result = get_prefixed_hash('keysecret', '1300000000')
+            self.assertEqual(result.hexdigest(),
+                             md5('keysecret1300000000').hexdigest())
+
+    def test_canonical_query_string(self):
+        params = {'b': 'a b', 'a': '~/+', 'A.1': 'x'}
+        self.assertEqual(canonical_query_string(params),
+                         'A.1=x&a=~%2F%2B&b=a%20b')
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
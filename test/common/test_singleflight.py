@@ -0,0 +1,205 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import with_statement
+
+import sys
+import time
+import socket
+import httplib
+import unittest
+import threading
+
+from libcloud.common.singleflight import SingleFlight
+from libcloud.common.deadline import Deadline
+from libcloud.common.types import DeadlineExceededError
+
+from test import MockHttp, BaseMockDriver, CountingResponse, MockConnection
+
+class BlockingMockHttp(MockHttp):
+    requests = 0
+    release = None
+    fail = False
+
+    def _items(self, method, url, body, headers):
+        BlockingMockHttp.requests += 1
+        BlockingMockHttp.release.wait(5)
+
+        if BlockingMockHttp.fail:
+            return (httplib.INTERNAL_SERVER_ERROR, 'error', {},
+                    httplib.responses[httplib.INTERNAL_SERVER_ERROR])
+
+        return (httplib.OK, 'a,b', {}, httplib.responses[httplib.OK])
+
+class SingleFlightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def test_do(self):
+        self.assertEqual(self.flight.do('key', lambda: 1), (1, False))
+        self.assertEqual(self.flight.in_flight('key'), 0)
+
+    def test_exception_is_propagated(self):
+        def fail():
+            raise ValueError('boom')
+
+        self.assertRaises(ValueError, self.flight.do, 'key', fail)
+        self.assertEqual(self.flight.in_flight('key'), 0)
+
+    def _start_leader(self, release):
+        thread = threading.Thread(target=self.flight.do,
+                                  args=('key', lambda: release.wait(5)))
+        thread.start()
+        end = time.time() + 5
+
+        while self.flight.in_flight('key') < 1 and time.time() < end:
+            time.sleep(0.001)
+
+        return thread
+
+    def test_wait_is_bounded_by_the_deadline(self):
+        release = threading.Event()
+        thread = self._start_leader(release)
+
+        try:
+            with Deadline(0.05):
+                self.assertRaises(DeadlineExceededError, self.flight.do,
+                                  'key', lambda: None)
+
+            self.assertEqual(self.flight.in_flight('key'), 1)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_wait_is_bounded_by_the_timeout(self):
+        release = threading.Event()
+        thread = self._start_leader(release)
+
+        try:
+            self.assertRaises(socket.timeout, self.flight.do, 'key',
+                              lambda: None, timeout=0.05)
+        finally:
+            release.set()
+            thread.join()
+
+class ConnectionSingleFlightTests(unittest.TestCase):
+    thread_count = 5
+
+    def setUp(self):
+        BlockingMockHttp.requests = 0
+        BlockingMockHttp.release = threading.Event()
+        BlockingMockHttp.fail = False
+        CountingResponse.parsed = 0
+        self.flight = SingleFlight()
+        self.connection = MockConnection('key', host='example.com')
+        self.connection.conn_classes = (None, BlockingMockHttp)
+        self.connection.driver = BaseMockDriver()
+        self.connection.single_flight = self.flight
+
+    def _run_threads(self, method='GET', stream=False):
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                result = self.connection.request('/items', method=method,
+                                                 stream=stream)
+            except Exception, e:
+                result = e
+
+            lock.acquire()
+            results.append(result)
+            lock.release()
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(self.thread_count)]
+
+        for thread in threads:
+            thread.start()
+
+        return threads, results
+
+    def _wait_for_waiters(self, key_count, stream=False):
+        key = (MockConnection, None, 'key', 'example.com', '/items', (), (),
+               stream)
+        end = time.time() + 5
+
+        while self.flight.in_flight(key) < key_count and time.time() < end:
+            time.sleep(0.001)
+
+    def _join(self, threads):
+        BlockingMockHttp.release.set()
+
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_requests_share_a_round_trip(self):
+        threads, results = self._run_threads()
+        self._wait_for_waiters(self.thread_count)
+        self._join(threads)
+
+        self.assertEqual(BlockingMockHttp.requests, 1)
+        self.assertEqual(len(results), self.thread_count)
+
+        for response in results:
+            self.assertEqual(response.status, httplib.OK)
+            self.assertEqual(response.object, ['a', 'b'])
+
+        self.assertEqual(CountingResponse.parsed, 1)
+        self.assertEqual(len(set([id(response) for response in results])),
+                         self.thread_count)
+
+    def test_concurrent_stream_requests_share_a_round_trip(self):
+        threads, results = self._run_threads(stream=True)
+        self._wait_for_waiters(self.thread_count, stream=True)
+        self._join(threads)
+
+        self.assertEqual(BlockingMockHttp.requests, 1)
+        self.assertEqual(len(results), self.thread_count)
+
+        # Every caller can read the whole body
+        for response in results:
+            self.assertEqual(response.body.read(), 'a,b')
+
+        self.assertEqual(CountingResponse.parsed, 0)
+
+    def test_error_is_shared(self):
+        BlockingMockHttp.fail = True
+        threads, results = self._run_threads()
+        self._wait_for_waiters(self.thread_count)
+        self._join(threads)
+
+        self.assertEqual(BlockingMockHttp.requests, 1)
+        self.assertEqual(len(results), self.thread_count)
+
+        for result in results:
+            self.assertTrue(isinstance(result, Exception))
+
+    def test_post_requests_are_not_deduplicated(self):
+        BlockingMockHttp.release.set()
+        threads, results = self._run_threads(method='POST')
+        self._join(threads)
+
+        self.assertEqual(BlockingMockHttp.requests, self.thread_count)
+
+    def test_sequential_requests_are_not_deduplicated(self):
+        BlockingMockHttp.release.set()
+        self.connection.request('/items')
+        self.connection.request('/items')
+        self.assertEqual(BlockingMockHttp.requests, 2)
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
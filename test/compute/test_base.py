@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import sys
+import pickle
 import unittest
 
 from libcloud.common.base import Response
@@ -37,6 +38,45 @@ class BaseTests(unittest.TestCase):
     def test_base_node_image(self):
         NodeImage(id=0, name=0, driver=FakeDriver())
 
+    def test_node_is_slot_based(self):
+        node = Node(id=1, name='a', state=0, public_ip=[], private_ip=[],
+                    driver=FakeDriver())
+        self.assertFalse(hasattr(node, '__dict__'))
+        self.assertRaises(AttributeError, setattr, node, 'foo', 'bar')
+
+        # Extra dictionary is created on first access
+        self.assertEqual(node._extra, None)
+        node.extra['foo'] = 'bar'
+        self.assertEqual(node.extra, {'foo': 'bar'})
+
+    def test_node_uuid_is_cached(self):
+        calls = []
+
+        class CountingNode(Node):
+            __slots__ = ()
+
+            def get_uuid(self):
+                calls.append(1)
+                return Node.get_uuid(self)
+
+        node = CountingNode(id=1, name='a', state=0, public_ip=[],
+                            private_ip=[], driver=FakeDriver())
+        self.assertEqual(calls, [])
+        self.assertEqual(node.uuid, node.uuid)
+        self.assertEqual(len(calls), 1)
+
+    def test_node_pickle(self):
+        node = Node(id=1, name='a', state=0, public_ip=['127.0.0.1'],
+                    private_ip=[], driver=FakeDriver(), extra={'a': 1})
+        uuid = node.uuid
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(node, protocol))
+            self.assertEqual(copy.name, 'a')
+            self.assertEqual(copy.public_ip, ['127.0.0.1'])
+            self.assertEqual(copy.extra, {'a': 1})
+            self.assertEqual(copy.uuid, uuid)
+
     def test_base_response(self):
         Response(MockResponse(status=200, body='foo'))
 
@@ -21,7 +21,8 @@ try:
 except ImportError:
     import simplejson as json
 
-from libcloud.common.types import InvalidCredsError
+from libcloud.common.types import InvalidCredsError, DeadlineExceededError
+from libcloud.common.deadline import Deadline
 from libcloud.compute.drivers.brightbox import BrightboxNodeDriver
 from libcloud.compute.types import NodeState
 
@@ -44,6 +45,14 @@ class BrightboxTest(unittest.TestCase, TestCaseMixin):
         BrightboxMockHttp.type = 'UNAUTHORIZED_CLIENT'
         self.assertRaises(InvalidCredsError, self.driver.list_nodes)
 
+    def test_authentication_respects_deadline(self):
+        def list_nodes():
+            with Deadline(0):
+                self.driver.list_nodes()
+
+        self.assertRaises(DeadlineExceededError, list_nodes)
+        self.assertFalse(hasattr(self.driver.connection, 'token'))
+
     def test_list_nodes(self):
         nodes = self.driver.list_nodes()
         self.assertEqual(len(nodes), 1)
@@ -58,6 +58,7 @@ class DeploymentTests(unittest.TestCase):
         Rackspace.connectionCls.conn_classes = (None, RackspaceMockHttp)
         RackspaceMockHttp.type = None
         self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+        self.driver.warmup()
         self.driver.features = {'create_node': ['generates_password']}
         self.node = Node(id=12345, name='test', state=NodeState.RUNNING,
                    public_ip=['1.2.3.4'], private_ip='1.2.3.5',
@@ -319,6 +320,33 @@ class DeploymentTests(unittest.TestCase):
         node = self.driver.deploy_node(deploy=Mock())
         self.assertEqual(self.node.id, node.id)
 
+    def test_have_paramiko_is_a_bool(self):
+        import libcloud.compute.ssh as ssh
+        self.assertTrue(isinstance(ssh.have_paramiko, bool))
+
+    def test_get_paramiko_imports_paramiko_once(self):
+        import libcloud.compute.ssh as ssh
+        old_module = sys.modules.get('paramiko')
+
+        try:
+            # A None entry makes "import paramiko" raise ImportError
+            sys.modules['paramiko'] = None
+            ssh._paramiko_checked = False
+            self.assertTrue(ssh.get_paramiko() is None)
+
+            fake_paramiko = Mock()
+            sys.modules['paramiko'] = fake_paramiko
+            self.assertTrue(ssh.get_paramiko() is None)
+
+            ssh._paramiko_checked = False
+            self.assertTrue(ssh.get_paramiko() is fake_paramiko)
+        finally:
+            if old_module is None:
+                del sys.modules['paramiko']
+            else:
+                sys.modules['paramiko'] = old_module
+            ssh._paramiko_checked = False
+
 class RackspaceMockHttp(MockHttp):
 
     fixtures = ComputeFileFixtures('rackspace')
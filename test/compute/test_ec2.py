@@ -12,7 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from __future__ import with_statement
+
 import sys
+import time
 import unittest
 import httplib
 
@@ -21,6 +24,8 @@ from libcloud.compute.drivers.ec2 import NimbusNodeDriver, EucNodeDriver
 from libcloud.compute.drivers.ec2 import EC2APNENodeDriver
 from libcloud.compute.drivers.ec2 import IdempotentParamError
 from libcloud.compute.base import Node, NodeImage, NodeSize, NodeLocation
+from libcloud.common.deadline import Deadline
+from libcloud.common.types import DeadlineExceededError
 
 from test import MockHttp, LibcloudTestCase
 from test.compute import TestCaseMixin
@@ -107,6 +112,17 @@ class EC2Tests(LibcloudTestCase, TestCaseMixin):
         self.assertEqual(public_ips[0], '1.2.3.4')
         self.assertEqual(public_ips[1], '1.2.3.5')
 
+    def test_list_nodes_deadline(self):
+        # Deadline covers both the DescribeInstances and the
+        # DescribeAddresses request
+        EC2MockHttp.type = 'SLOW'
+
+        def list_nodes():
+            with Deadline(0.05):
+                self.driver.list_nodes()
+
+        self.assertRaises(DeadlineExceededError, list_nodes)
+
     def test_list_nodes_with_name_tag(self):
         EC2MockHttp.type = 'WITH_TAGS'
         node = self.driver.list_nodes()[0]
@@ -255,6 +271,10 @@ class EC2MockHttp(MockHttp):
         body = self.fixtures.load('describe_instances.xml')
         return (httplib.OK, body, {}, httplib.responses[httplib.OK])
 
+    def _SLOW_DescribeInstances(self, method, url, body, headers):
+        time.sleep(0.1)
+        return self._DescribeInstances(method, url, body, headers)
+
     def _WITH_TAGS_DescribeInstances(self, method, url, body, headers):
         body = self.fixtures.load('describe_instances_with_tags.xml')
         return (httplib.OK, body, {}, httplib.responses[httplib.OK])
@@ -386,6 +406,14 @@ class NimbusTests(EC2Tests):
         self.assertEqual(len(nodes_elastic_ips), 1)
         self.assertEqual(len(nodes_elastic_ips[node.id]), 0)
 
+    def test_list_nodes_deadline(self):
+        # overridden from EC2Tests -- Nimbus list_nodes makes only one
+        # request.
+        EC2MockHttp.type = 'SLOW'
+
+        with Deadline(0.05):
+            self.driver.list_nodes()
+
     def test_list_sizes(self):
         sizes = self.driver.list_sizes()
 
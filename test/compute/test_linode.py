@@ -21,10 +21,10 @@ import sys
 import unittest
 import httplib
 
-from libcloud.compute.drivers.linode import LinodeNodeDriver
+from libcloud.compute.drivers.linode import LinodeNodeDriver, LinodeResponse
 from libcloud.compute.base import Node, NodeAuthPassword
 
-from test import MockHttp
+from test import MockHttp, MockResponse, gzip_compress
 from test.compute import TestCaseMixin
 
 class LinodeTest(unittest.TestCase, TestCaseMixin):
@@ -81,6 +81,14 @@ class LinodeTest(unittest.TestCase, TestCaseMixin):
                          auth=NodeAuthPassword("foobar"))
         self.assertTrue(isinstance(node[0], Node))
 
+    def test_gzip_encoded_response(self):
+        body = '{"ERRORARRAY":[],"ACTION":"linode.boot","DATA":{"JobID":1300}}'
+        response = MockResponse(httplib.OK, gzip_compress(body),
+                                {'content-encoding': 'gzip'})
+        response = LinodeResponse(response)
+        self.assertEqual(response.body, body)
+        self.assertEqual(response.objects[0], {'JobID': 1300})
+
 
 class LinodeMockHttp(MockHttp):
     def _avail_datacenters(self, method, url, body, headers):
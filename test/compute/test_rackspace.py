@@ -12,11 +12,16 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from __future__ import with_statement
+
 import sys
 import unittest
 import httplib
 
 from libcloud.common.types import InvalidCredsError, MalformedResponseError
+from libcloud.common.types import DeadlineExceededError
+from libcloud.common.deadline import Deadline
+from libcloud.common.ratelimit import RateLimiter
 from libcloud.compute.drivers.rackspace import RackspaceNodeDriver as Rackspace
 from libcloud.compute.drivers.rackspace import OpenStackResponse
 from libcloud.compute.drivers.rackspace import OpenStackNodeDriver as OpenStack
@@ -38,20 +43,39 @@ class RackspaceTests(unittest.TestCase, TestCaseMixin):
         Rackspace.connectionCls.conn_classes = (None, RackspaceMockHttp)
         RackspaceMockHttp.type = None
         self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+        self.driver.warmup()
 
     def test_auth(self):
         RackspaceMockHttp.type = 'UNAUTHORIZED'
+        self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
         try:
-            self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+            self.driver.warmup()
         except InvalidCredsError, e:
             self.assertEqual(True, isinstance(e, InvalidCredsError))
         else:
             self.fail('test should have thrown')
 
+    def test_auth_is_lazy(self):
+        RackspaceMockHttp.type = 'UNAUTHORIZED'
+        # Driver authenticates on the first request
+        self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+        self.assertRaises(InvalidCredsError, self.driver.list_nodes)
+
+    def test_auth_respects_deadline(self):
+        self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+
+        def list_nodes():
+            with Deadline(0):
+                self.driver.list_nodes()
+
+        self.assertRaises(DeadlineExceededError, list_nodes)
+        self.assertEqual(self.driver.connection.auth_token, None)
+
     def test_auth_missing_key(self):
         RackspaceMockHttp.type = 'UNAUTHORIZED_MISSING_KEY'
+        self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
         try:
-            self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+            self.driver.warmup()
         except MalformedResponseError, e:
             self.assertEqual(True, isinstance(e, MalformedResponseError))
         else:
@@ -59,8 +83,9 @@ class RackspaceTests(unittest.TestCase, TestCaseMixin):
 
     def test_auth_server_error(self):
         RackspaceMockHttp.type = 'INTERNAL_SERVER_ERROR'
+        self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
         try:
-            self.driver = Rackspace(RACKSPACE_USER, RACKSPACE_KEY)
+            self.driver.warmup()
         except MalformedResponseError, e:
             self.assertEqual(True, isinstance(e, MalformedResponseError))
         else:
@@ -162,6 +187,26 @@ class RackspaceTests(unittest.TestCase, TestCaseMixin):
         self.assertTrue("rate" in limits)
         self.assertTrue("absolute" in limits)
 
+    def test_ex_limits_rate_limiter(self):
+        limits = self.driver.ex_limits()
+        limiter = RateLimiter.from_limits(
+            limits['rate'], path_prefix=self.driver.connection.server_url)
+        slept = []
+        limiter.sleep = slept.append
+        self.driver.connection.rate_limiter = limiter
+
+        node = Node(id=444222, name=None, state=None, public_ip=None,
+                    private_ip=None, driver=self.driver)
+
+        # 10 POST requests per minute are allowed
+        for i in range(10):
+            self.driver.ex_save_image(node, "imgtest")
+
+        self.assertEqual(slept, [])
+        self.driver.ex_save_image(node, "imgtest")
+        self.assertEqual(len(slept), 1)
+        self.assertTrue(5 < slept[0] <= 6)
+
     def test_ex_save_image(self):
         node = Node(id=444222, name=None, state=None, public_ip=None,
                     private_ip=None, driver=self.driver)
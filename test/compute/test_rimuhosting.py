@@ -19,8 +19,9 @@ import unittest
 import httplib
 
 from libcloud.compute.drivers.rimuhosting import RimuHostingNodeDriver
+from libcloud.compute.drivers.rimuhosting import RimuHostingResponse
 
-from test import MockHttp
+from test import MockHttp, MockResponse, gzip_compress
 from test.compute import TestCaseMixin
 from test.file_fixtures import ComputeFileFixtures
 
@@ -72,6 +73,14 @@ class RimuHostingTest(unittest.TestCase, TestCaseMixin):
         image = self.driver.list_images()[0]
         self.driver.create_node(name="api.ivan.net.nz", image=image, size=size)
 
+    def test_gzip_encoded_response(self):
+        body = RimuHostingMockHttp.fixtures.load('r_orders.json')
+        response = MockResponse(httplib.OK, gzip_compress(body),
+                                {'content-encoding': 'gzip'})
+        response = RimuHostingResponse(response)
+        self.assertEqual(response.body, body)
+        self.assertEqual(len(response.object['about_orders']), 1)
+
 class RimuHostingMockHttp(MockHttp):
 
     fixtures = ComputeFileFixtures('rimuhosting')
@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hmac
 import base64
+import hashlib
 import httplib
 import os.path
 import sys
@@ -340,6 +342,21 @@ class AtmosTests(unittest.TestCase):
         finally:
             libcloud.utils.guess_file_mime_type = old_func
 
+    def test_get_object_cdn_url(self):
+        container = Container(name='fbc', extra={}, driver=self.driver)
+        obj = Object(name='ftsd', size=0, hash=None, extra={},
+                     meta_data={}, container=container, driver=self.driver)
+        url = self.driver.get_object_cdn_url(obj, expiry=1234)
+
+        parsed = urlparse.urlparse(url)
+        params = dict(urlparse.parse_qsl(parsed[4]))
+        string_to_sign = 'GET\n/rest/namespace/fbc/ftsd\ndummy\n1234'
+        expected = hmac.new('dummy', string_to_sign, hashlib.sha1).digest()
+        self.assertEqual(parsed[2], '/rest/namespace/fbc/ftsd')
+        self.assertEqual(params['uid'], 'dummy')
+        self.assertEqual(params['expires'], '1234')
+        self.assertEqual(params['signature'], base64.b64encode(expected))
+
     def test_signature_algorithm(self):
         test_uid = 'fredsmagicuid'
         test_key = base64.b64encode('ssssshhhhhmysecretkey')
@@ -13,23 +13,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
 import unittest
 import hashlib
+import tempfile
 
 from StringIO import StringIO
 from mock import Mock
 
-from libcloud.storage.base import StorageDriver
+from libcloud.storage.base import StorageDriver, Object, Container
 
 from test import StorageMockHttp # pylint: disable-msg=E0611
 
 class BaseStorageTests(unittest.TestCase):
     def setUp(self):
         self.send_called = 0
+        self.file_paths = []
         StorageDriver.connectionCls.conn_classes = (None, StorageMockHttp)
         self.driver = StorageDriver('username', 'key', host='localhost')
 
+    def tearDown(self):
+        for file_path in self.file_paths:
+            os.remove(file_path)
+
+    def test_object_is_slot_based(self):
+        container = Container(name='c', extra=None, driver=self.driver)
+        obj = Object(name='o', size=1, hash='h', extra=None, meta_data=None,
+                     container=container, driver=self.driver)
+        self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertEqual(obj._meta_data, None)
+        self.assertEqual(obj.meta_data, {})
+        self.assertEqual(obj.extra, {})
+        self.assertEqual(container.extra, {})
+
     def test__upload_object_iterator_must_have_next_method(self):
         class Iterator(object):
             def next(self):
@@ -96,6 +113,70 @@ class BaseStorageTests(unittest.TestCase):
         self.assertEqual(bytes_transferred, 0)
         self.assertEqual(self.send_called, 5)
 
+    def _create_file(self, data):
+        fd, file_path = tempfile.mkstemp()
+        os.write(fd, data)
+        os.close(fd)
+        self.file_paths.append(file_path)
+        return file_path
+
+    def test_upload_file_is_sent_from_mapping(self):
+        data = ''.join([chr(i % 256) for i in range(2500)])
+        file_path = self._create_file(data)
+        sent = []
+
+        response = Mock()
+        # Buffers are only valid until the file is unmapped
+        response.connection.connection.send = \
+                 lambda chunk: sent.append(str(chunk))
+        self.driver.chunk_size = 1000
+
+        success, data_hash, bytes_transferred = \
+                 self.driver._upload_file(response=response,
+                                          file_path=file_path)
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, hashlib.md5(data).hexdigest())
+        self.assertEqual(bytes_transferred, len(data))
+        self.assertEqual([len(chunk) for chunk in sent], [1000, 1000, 500])
+        self.assertEqual(''.join(sent), data)
+
+    def test_upload_empty_file(self):
+        file_path = self._create_file('')
+        sent = []
+
+        response = Mock()
+        response.connection.connection.send = lambda chunk: sent.append(chunk)
+
+        success, data_hash, bytes_transferred = \
+                 self.driver._upload_file(response=response,
+                                          file_path=file_path)
+
+        self.assertTrue(success)
+        self.assertEqual(data_hash, hashlib.md5('').hexdigest())
+        self.assertEqual(bytes_transferred, 0)
+
+    def test_upload_file_send_error(self):
+        file_path = self._create_file('a' * 3000)
+        sent = []
+
+        def send(chunk):
+            if sent:
+                raise IOError('Connection reset by peer')
+            sent.append(str(chunk))
+
+        response = Mock()
+        response.connection.connection.send = send
+        self.driver.chunk_size = 1000
+
+        success, data_hash, bytes_transferred = \
+                 self.driver._upload_file(response=response,
+                                          file_path=file_path)
+
+        self.assertFalse(success)
+        self.assertEqual(data_hash, None)
+        self.assertEqual(bytes_transferred, 1000)
+
 
 if __name__ == '__main__':
     sys.exit(unittest.main())
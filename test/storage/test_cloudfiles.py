@@ -19,6 +19,8 @@ import copy
 import unittest
 import httplib
 
+from hashlib import md5
+
 import libcloud.utils
 
 from libcloud.common.types import LibcloudError, MalformedResponseError
@@ -47,6 +49,7 @@ class CloudFilesTests(unittest.TestCase):
         CloudFilesMockHttp.type = None
         CloudFilesMockRawResponse.type = None
         self.driver = CloudFilesStorageDriver('dummy', 'dummy')
+        self.driver.warmup()
         self._remove_test_file()
 
     def tearDown(self):
@@ -215,6 +218,24 @@ class CloudFilesTests(unittest.TestCase):
                                              delete_on_failure=True)
         self.assertTrue(result)
 
+    def test_download_object_parallel(self):
+        CloudFilesMockRawResponse.type = 'RANGE'
+        self.driver.parallel_download_threshold = 0
+        self.driver.parallel_download_chunk_size = 300
+        data = CloudFilesMockRawResponse.range_data
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        obj = Object(name='foo_bar_object', size=len(data),
+                     hash=md5(data).hexdigest(), extra={},
+                     container=container, meta_data=None,
+                     driver=CloudFilesStorageDriver)
+        destination_path = os.path.abspath(__file__) + '.temp'
+        result = self.driver.download_object(obj=obj,
+                                             destination_path=destination_path,
+                                             overwrite_existing=False,
+                                             delete_on_failure=True)
+        self.assertTrue(result)
+        self.assertEqual(open(destination_path, 'rb').read(), data)
+
     def test_download_object_invalid_file_size(self):
         CloudFilesMockRawResponse.type = 'INVALID_SIZE'
         container = Container(name='foo_bar_container', extra={}, driver=self)
@@ -447,7 +468,7 @@ class CloudFilesMockHttp(StorageMockHttp):
     def _v1_MossoCloudFS_MALFORMED_JSON(self, method, url, body, headers):
         # test_invalid_json_throws_exception
         body = 'broken: json /*"'
-        return (httplib.NO_CONTENT,
+        return (httplib.OK,
                 body,
                 self.base_headers,
                 httplib.responses[httplib.OK])
@@ -629,6 +650,7 @@ class CloudFilesMockRawResponse(MockRawResponse):
 
     fixtures = StorageFileFixtures('cloudfiles')
     base_headers = { 'content-type': 'application/json; charset=UTF-8'}
+    range_data = ''.join([str(i % 7) for i in range(1000)])
 
     def  _v1_MossoCloudFS_foo_bar_container_foo_test_upload(
         self, method, url, body, headers):
@@ -661,6 +683,17 @@ class CloudFilesMockRawResponse(MockRawResponse):
                 self.base_headers,
                 httplib.responses[httplib.OK])
 
+    def _v1_MossoCloudFS_foo_bar_container_foo_bar_object_RANGE(
+        self, method, url, body, headers):
+        # test_download_object_parallel
+        range_header = self.connection.connection.request_headers['Range']
+        start, end = range_header.split('=')[1].split('-')
+        self._data = [self.range_data[int(start):int(end) + 1]]
+        return (httplib.PARTIAL_CONTENT,
+                '',
+                self.base_headers,
+                httplib.responses[httplib.PARTIAL_CONTENT])
+
     def _v1_MossoCloudFS_foo_bar_container_foo_bar_object_INVALID_SIZE(
         self, method, url, body, headers):
         # test_download_object_invalid_file_size
@@ -13,13 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import with_statement
+
 import os
 import sys
+import socket
 import httplib
 import unittest
 
+from hashlib import md5
+from urlparse import urlparse
+from xml.etree import ElementTree as ET
+
 from libcloud.common.types import InvalidCredsError
 from libcloud.common.types import LibcloudError
+from libcloud.common.metrics import HistogramAggregator, DriverMethod
+from libcloud.common.deadline import Deadline, get_remaining
 from libcloud.storage.base import Container, Object
 from libcloud.storage.types import ContainerDoesNotExistError
 from libcloud.storage.types import ContainerIsNotEmptyError
@@ -30,7 +39,9 @@ from libcloud.storage.drivers.s3 import S3StorageDriver, S3USWestStorageDriver
 from libcloud.storage.drivers.s3 import S3EUWestStorageDriver
 from libcloud.storage.drivers.s3 import S3APSEStorageDriver
 from libcloud.storage.drivers.s3 import S3APNEStorageDriver
+from libcloud.storage.drivers.s3 import S3Connection
 from libcloud.storage.drivers.dummy import DummyIterator
+from libcloud.storage.base import get_range_header, DOWNLOAD_STATE_SUFFIX
 
 from test import StorageMockHttp, MockRawResponse # pylint: disable-msg=E0611
 from test.file_fixtures import StorageFileFixtures # pylint: disable-msg=E0611
@@ -43,6 +54,8 @@ class S3Tests(unittest.TestCase):
         S3MockHttp.type = None
         S3MockRawResponse.type = None
         self.driver = S3StorageDriver('dummy', 'dummy')
+        # Mocked multipart uploads use tiny parts
+        self.driver.multipart_min_chunk_size = 1
 
     def tearDown(self):
         self._remove_test_file()
@@ -50,10 +63,11 @@ class S3Tests(unittest.TestCase):
     def _remove_test_file(self):
         file_path = os.path.abspath(__file__) + '.temp'
 
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
+        for path in [file_path, file_path + DOWNLOAD_STATE_SUFFIX]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
 
     def test_invalid_credentials(self):
         S3MockHttp.type = 'UNAUTHORIZED'
@@ -264,6 +278,202 @@ class S3Tests(unittest.TestCase):
         else:
            self.fail('Exception was not thrown')
 
+    def _get_range_object(self, data_hash=None):
+        S3MockRawResponse.type = 'RANGE'
+        S3MockRawResponse.ranges = []
+        S3MockRawResponse.closed = 0
+        S3MockRawResponse.remaining = []
+        self.driver.parallel_download_chunk_size = 100
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        data_hash = data_hash or md5(S3MockRawResponse.range_data).hexdigest()
+        return Object(name='foo_bar_object',
+                      size=len(S3MockRawResponse.range_data),
+                      hash=data_hash, extra={}, container=container,
+                      meta_data=None, driver=self.driver)
+
+    def test_download_object_parallel(self):
+        obj = self._get_range_object()
+        self.driver.parallel_download_threshold = 0
+        destination_path = os.path.abspath(__file__) + '.temp'
+        result = self.driver.download_object(obj=obj,
+                                             destination_path=destination_path,
+                                             overwrite_existing=False,
+                                             delete_on_failure=True)
+        self.assertTrue(result)
+        self.assertEqual(open(destination_path, 'rb').read(),
+                         S3MockRawResponse.range_data)
+        self.assertEqual(sorted(S3MockRawResponse.ranges),
+                         [get_range_header(start, start + 99) for start in
+                          range(0, 1000, 100)])
+        self.assertEqual(S3MockRawResponse.closed, 10)
+        self.assertEqual(S3MockRawResponse.remaining, [None] * 10)
+
+    def test_download_object_parallel_deadline(self):
+        obj = self._get_range_object()
+        self.driver.parallel_download_threshold = 0
+        destination_path = os.path.abspath(__file__) + '.temp'
+
+        with Deadline(30):
+            self.assertTrue(self.driver.download_object(
+                obj=obj, destination_path=destination_path))
+
+        # Workers inherit the deadline of the caller
+        self.assertEqual(len(S3MockRawResponse.remaining), 10)
+
+        for remaining in S3MockRawResponse.remaining:
+            self.assertTrue(0 < remaining <= 30)
+
+    def test_download_object_parallel_read_error(self):
+        obj = self._get_range_object()
+        self.driver.parallel_download_threshold = 0
+        S3MockRawResponse.type = 'RANGE_BROKEN'
+        destination_path = os.path.abspath(__file__) + '.temp'
+        self.assertRaises(socket.error, self.driver.download_object,
+                          obj=obj, destination_path=destination_path,
+                          overwrite_existing=False, delete_on_failure=True)
+        self.assertFalse(os.path.exists(destination_path))
+        self.assertEqual(S3MockRawResponse.closed, 10)
+
+    def test_download_object_parallel_hash_mismatch(self):
+        obj = self._get_range_object(data_hash=md5('foo').hexdigest())
+        self.driver.parallel_download_threshold = 0
+        destination_path = os.path.abspath(__file__) + '.temp'
+        self.assertRaises(ObjectHashMismatchError,
+                          self.driver.download_object, obj=obj,
+                          destination_path=destination_path,
+                          overwrite_existing=False, delete_on_failure=True)
+        self.assertFalse(os.path.exists(destination_path))
+
+    def test_download_object_parallel_range_not_supported(self):
+        obj = self._get_range_object()
+        self.driver.parallel_download_threshold = 0
+        S3MockRawResponse.type = 'RANGE_NOT_SUPPORTED'
+        destination_path = os.path.abspath(__file__) + '.temp'
+        self.assertRaises(LibcloudError, self.driver.download_object,
+                          obj=obj, destination_path=destination_path,
+                          overwrite_existing=False, delete_on_failure=True)
+        self.assertFalse(os.path.exists(destination_path))
+        # Unread responses are closed
+        self.assertEqual(S3MockRawResponse.closed, 10)
+
+    def test_download_object_resumable(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+        state_path = destination_path + DOWNLOAD_STATE_SUFFIX
+
+        # Connection is dropped after 400 bytes
+        result = self.driver.download_object(obj=obj,
+                                             destination_path=destination_path,
+                                             overwrite_existing=False,
+                                             delete_on_failure=True)
+        self.assertFalse(result)
+        self.assertEqual(os.path.getsize(destination_path), 400)
+        self.assertTrue(os.path.exists(state_path))
+
+        result = self.driver.download_object(obj=obj,
+                                             destination_path=destination_path,
+                                             overwrite_existing=False,
+                                             delete_on_failure=True)
+        self.assertTrue(result)
+        self.assertEqual(S3MockRawResponse.ranges,
+                         ['bytes=0-', 'bytes=400-'])
+        self.assertEqual(S3MockRawResponse.if_range, '"%s"' % (obj.hash))
+        self.assertEqual(open(destination_path, 'rb').read(),
+                         S3MockRawResponse.range_data)
+        self.assertFalse(os.path.exists(state_path))
+
+    def test_download_object_resumable_object_has_changed(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+        state_path = destination_path + DOWNLOAD_STATE_SUFFIX
+
+        self.assertFalse(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+
+        # Partial file of a different version of the object isn't resumed,
+        # it's replaced even if overwriting is not allowed
+        obj = self._get_range_object(data_hash=md5('foo').hexdigest())
+        S3MockRawResponse.type = 'RESUME_CHANGED'
+        self.assertRaises(ObjectHashMismatchError,
+                          self.driver.download_object, obj=obj,
+                          destination_path=destination_path,
+                          overwrite_existing=False)
+        self.assertEqual(S3MockRawResponse.ranges, ['bytes=0-'])
+        self.assertFalse(os.path.exists(destination_path))
+        self.assertFalse(os.path.exists(state_path))
+
+    def test_download_object_resumable_file_exists(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+        open(destination_path, 'wb').close()
+
+        # File which hasn't been created by a download is never replaced
+        self.assertRaises(LibcloudError, self.driver.download_object,
+                          obj=obj, destination_path=destination_path,
+                          overwrite_existing=False)
+        self.assertEqual(S3MockRawResponse.ranges, [])
+        self.assertTrue(os.path.exists(destination_path))
+
+    def test_download_object_resumable_etag_has_changed(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+        state_path = destination_path + DOWNLOAD_STATE_SUFFIX
+
+        self.assertFalse(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+
+        # Stale partial file and state are removed
+        S3MockRawResponse.type = 'RESUME_ETAG_CHANGED'
+        self.assertRaises(LibcloudError, self.driver.download_object,
+                          obj=obj, destination_path=destination_path)
+        self.assertFalse(os.path.exists(destination_path))
+        self.assertFalse(os.path.exists(state_path))
+
+        S3MockRawResponse.type = 'RESUME'
+        self.assertFalse(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+        self.assertEqual(S3MockRawResponse.ranges,
+                         ['bytes=0-', 'bytes=400-', 'bytes=0-'])
+
+    def test_download_object_resumable_object_not_found(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+
+        self.assertFalse(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+        S3MockRawResponse.closed = 0
+
+        S3MockRawResponse.type = 'RESUME_NOT_FOUND'
+        self.assertRaises(ObjectDoesNotExistError,
+                          self.driver.download_object, obj=obj,
+                          destination_path=destination_path)
+        self.assertEqual(S3MockRawResponse.closed, 1)
+
+    def test_download_object_resumable_provider_returns_whole_object(self):
+        obj = self._get_range_object()
+        S3MockRawResponse.type = 'RESUME'
+        self.driver.resumable_downloads = True
+        destination_path = os.path.abspath(__file__) + '.temp'
+
+        self.assertFalse(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+
+        S3MockRawResponse.type = 'RESUME_CHANGED'
+        self.assertTrue(self.driver.download_object(
+            obj=obj, destination_path=destination_path))
+        self.assertEqual(open(destination_path, 'rb').read(),
+                         S3MockRawResponse.range_data)
+
     def test_download_object_as_stream_success(self):
         container = Container(name='foo_bar_container', extra={}, driver=self)
 
@@ -363,18 +573,178 @@ class S3Tests(unittest.TestCase):
         self.assertTrue('some-value' in obj.meta_data)
         S3StorageDriver._upload_file = old_func
 
-    def test_upload_object_via_stream(self):
+    def test_upload_object_metrics_are_reported(self):
+        def upload_file(self, response, file_path, chunked=False,
+                        calculate_hash=True):
+            return True, '0cc175b9c0f1b6a831c399e269772661', 1000
+
+        old_func = S3StorageDriver._upload_file
+        S3StorageDriver._upload_file = upload_file
+        sink = HistogramAggregator()
+        self.driver.connection.metrics_sink = sink
+        file_path = os.path.abspath(__file__)
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+
         try:
-            container = Container(name='foo_bar_container', extra={}, driver=self)
-            object_name = 'foo_test_stream_data'
-            iterator = DummyIterator(data=['2', '3', '5'])
-            self.driver.upload_object_via_stream(container=container,
-                                                 object_name=object_name,
-                                                 iterator=iterator)
-        except NotImplementedError:
-            pass
-        else:
-            self.fail('Exception was not thrown')
+            with DriverMethod(self.driver, 'upload_object'):
+                self.driver.upload_object(file_path=file_path,
+                                          container=container,
+                                          object_name='foo_test_upload',
+                                          verify_hash=True)
+        finally:
+            S3StorageDriver._upload_file = old_func
+            del self.driver.connection.metrics_sink
+
+        stats = sink.get_stats()[(self.driver.name, 'upload_object', 'PUT')]
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['statuses'], {httplib.OK: 1})
+        self.assertEqual(stats['bytes_sent'], 1000)
+
+    def test_upload_object_via_stream(self):
+        self.driver.multipart_chunk_size = 2
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        object_name = 'foo_test_stream_data'
+        iterator = DummyIterator(data=['2', '3', '5'])
+        extra = {'content_type': 'text/plain'}
+        obj = self.driver.upload_object_via_stream(container=container,
+                                                   object_name=object_name,
+                                                   iterator=iterator,
+                                                   extra=extra)
+        self.assertEqual(obj.name, object_name)
+        self.assertEqual(obj.size, 3)
+        self.assertEqual(S3MockHttp.parts, {1: '23', 2: '5'})
+        self.assertTrue(obj.hash.endswith('-2'))
+        self.assertFalse(S3MockHttp.aborted)
+
+    def test_upload_object_via_stream_empty(self):
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        obj = self.driver.upload_object_via_stream(
+            container=container, object_name='foo_test_stream_data',
+            iterator=DummyIterator(data=[]),
+            extra={'content_type': 'text/plain'})
+        self.assertEqual(obj.size, 0)
+        self.assertEqual(S3MockHttp.parts, {1: ''})
+
+    def test_upload_object_multipart(self):
+        self.driver.multipart_threshold = 0
+        self.driver.multipart_chunk_size = 1000
+        file_path = os.path.abspath(__file__)
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        extra = {'meta_data': {'some-value': 'foobar'}}
+        obj = self.driver.upload_object(file_path=file_path,
+                                        container=container,
+                                        object_name='foo_test_stream_data',
+                                        extra=extra)
+
+        data = open(file_path, 'rb').read()
+        part_numbers = sorted(S3MockHttp.parts.keys())
+        self.assertEqual(obj.size, len(data))
+        self.assertEqual(len(part_numbers), (len(data) + 999) // 1000)
+        self.assertEqual(''.join([S3MockHttp.parts[number] for number in
+                                  part_numbers]), data)
+        self.assertTrue('some-value' in obj.meta_data)
+
+    def test_upload_object_multipart_part_size(self):
+        self.driver.multipart_chunk_size = 1000
+        self.driver.multipart_max_parts = 10
+        self.assertEqual(self.driver._get_part_size(file_size=5000), 1000)
+        self.assertEqual(self.driver._get_part_size(file_size=10001), 1001)
+
+        # Default limits allow uploads larger than 80 GB
+        driver = S3StorageDriver('dummy', 'dummy')
+        file_size = 200 * 1024 * 1024 * 1024
+        part_size = driver._get_part_size(file_size=file_size)
+        self.assertTrue(part_size > driver.multipart_chunk_size)
+        self.assertTrue(part_size * driver.multipart_max_parts >= file_size)
+
+    def test_upload_object_multipart_part_too_small(self):
+        driver = S3StorageDriver('dummy', 'dummy')
+        driver.multipart_chunk_size = 1024 * 1024
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        S3MockHttp.parts = None
+        self.assertRaises(ValueError, driver.upload_object_via_stream,
+                          container=container,
+                          object_name='foo_test_stream_data',
+                          iterator=DummyIterator(data=['2', '3', '5']),
+                          extra={'content_type': 'text/plain'})
+        # Upload is never initiated
+        self.assertEqual(S3MockHttp.parts, None)
+
+    def test_upload_object_multipart_too_many_parts(self):
+        self.driver.multipart_chunk_size = 1
+        self.driver.multipart_max_parts = 2
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        iterator = DummyIterator(data=['2', '3', '5'])
+        self.assertRaises(LibcloudError,
+                          self.driver.upload_object_via_stream,
+                          container=container,
+                          object_name='foo_test_stream_data',
+                          iterator=iterator,
+                          extra={'content_type': 'text/plain'})
+        self.assertTrue(S3MockHttp.aborted)
+
+    def test_upload_object_multipart_retry_delay(self):
+        self.driver.multipart_backoff_base = 1
+        self.driver.multipart_backoff_max = 5
+
+        for attempt in range(5):
+            delay = self.driver._get_part_retry_delay(attempt=attempt)
+            self.assertTrue(0 <= delay <= min(5, 2 ** attempt))
+
+    def test_upload_object_multipart_part_is_retried(self):
+        S3MockHttp.type = 'FAIL_PART'
+        self.driver.multipart_chunk_size = 2
+        self.driver.multipart_backoff_base = 0.001
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        iterator = DummyIterator(data=['2', '3', '5'])
+        obj = self.driver.upload_object_via_stream(
+            container=container, object_name='foo_test_stream_data',
+            iterator=iterator, extra={'content_type': 'text/plain'})
+        self.assertEqual(obj.size, 3)
+        self.assertEqual(S3MockHttp.failures, 2)
+
+    def test_upload_object_multipart_is_aborted(self):
+        S3MockHttp.type = 'FAIL_PART_ALWAYS'
+        self.driver.multipart_chunk_size = 2
+        self.driver.multipart_backoff_base = 0.001
+        # Remaining parts are not uploaded once a part has failed
+        self.driver.multipart_max_concurrency = 1
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        iterator = DummyIterator(data=['2', '3', '5'])
+        self.assertRaises(LibcloudError,
+                          self.driver.upload_object_via_stream,
+                          container=container,
+                          object_name='foo_test_stream_data',
+                          iterator=iterator,
+                          extra={'content_type': 'text/plain'})
+        self.assertEqual(S3MockHttp.failures,
+                         self.driver.multipart_max_retries + 1)
+        self.assertTrue(S3MockHttp.aborted)
+
+    def test_upload_object_multipart_complete_error(self):
+        S3MockHttp.type = 'COMPLETE_ERROR'
+        container = Container(name='foo_bar_container', extra={}, driver=self)
+        iterator = DummyIterator(data=['2', '3', '5'])
+        self.assertRaises(LibcloudError,
+                          self.driver.upload_object_via_stream,
+                          container=container,
+                          object_name='foo_test_stream_data',
+                          iterator=iterator,
+                          extra={'content_type': 'text/plain'})
+        self.assertTrue(S3MockHttp.aborted)
+
+    def test_sub_resources_are_signed(self):
+        connection = S3Connection('dummy', 'dummy')
+        signature1 = connection._get_aws_auth_param(
+            method='PUT', headers={}, expires='1',
+            params={'partNumber': '1', 'uploadId': 'abc', 'Expires': '1'},
+            secret_key='secret', path='/container/object')
+        signature2 = connection._get_aws_auth_param(
+            method='PUT', headers={}, expires='1', params={},
+            secret_key='secret',
+            path='/container/object?partNumber=1&uploadId=abc')
+        self.assertEqual(signature1, signature2)
 
     def test_delete_object_not_found(self):
         S3MockHttp.type = 'NOT_FOUND'
@@ -403,6 +773,7 @@ class S3USWestTests(S3Tests):
         S3MockHttp.type = None
         S3MockRawResponse.type = None
         self.driver = S3USWestStorageDriver('dummy', 'dummy')
+        self.driver.multipart_min_chunk_size = 1
 
 class S3EUWestTests(S3Tests):
     def setUp(self):
@@ -411,6 +782,7 @@ class S3EUWestTests(S3Tests):
         S3MockHttp.type = None
         S3MockRawResponse.type = None
         self.driver = S3EUWestStorageDriver('dummy', 'dummy')
+        self.driver.multipart_min_chunk_size = 1
 
 class S3APSETests(S3Tests):
     def setUp(self):
@@ -419,6 +791,7 @@ class S3APSETests(S3Tests):
         S3MockHttp.type = None
         S3MockRawResponse.type = None
         self.driver = S3APSEStorageDriver('dummy', 'dummy')
+        self.driver.multipart_min_chunk_size = 1
 
 class S3APNETests(S3Tests):
     def setUp(self):
@@ -427,12 +800,18 @@ class S3APNETests(S3Tests):
         S3MockHttp.type = None
         S3MockRawResponse.type = None
         self.driver = S3APNEStorageDriver('dummy', 'dummy')
+        self.driver.multipart_min_chunk_size = 1
 
 class S3MockHttp(StorageMockHttp):
 
     fixtures = StorageFileFixtures('s3')
     base_headers = {}
 
+    # Multipart upload state
+    parts = {}
+    failures = 0
+    aborted = False
+
     def _UNAUTHORIZED(self, method, url, body, headers):
         return (httplib.UNAUTHORIZED,
                 '',
@@ -568,10 +947,167 @@ class S3MockHttp(StorageMockHttp):
                 headers,
                 httplib.responses[httplib.OK])
 
+    def _foo_bar_container_foo_test_stream_data(self, method, url, body,
+                                                headers):
+        # test_upload_object_via_stream, test_upload_object_multipart
+        query = urlparse(url)[4]
+
+        if method == 'POST' and 'uploads' in query:
+            S3MockHttp.parts = {}
+            S3MockHttp.failures = 0
+            S3MockHttp.aborted = False
+            body = self.fixtures.load('initiate_multipart_upload.xml')
+            return (httplib.OK, body, {}, httplib.responses[httplib.OK])
+        elif method == 'PUT':
+            part_number = int(query.split('partNumber=')[1].split('&')[0])
+
+            if ((self.type == 'FAIL_PART' and S3MockHttp.failures < 2) or
+                self.type == 'FAIL_PART_ALWAYS'):
+                S3MockHttp.failures += 1
+                return (httplib.INTERNAL_SERVER_ERROR, '', {},
+                        httplib.responses[httplib.INTERNAL_SERVER_ERROR])
+
+            S3MockHttp.parts[part_number] = body
+            headers = {'etag': '"%s"' % (md5(body).hexdigest())}
+            return (httplib.OK, '', headers, httplib.responses[httplib.OK])
+        elif method == 'POST':
+            if self.type == 'COMPLETE_ERROR':
+                body = self.fixtures.load(
+                    'complete_multipart_upload_error.xml')
+                return (httplib.OK, body, {}, httplib.responses[httplib.OK])
+
+            root = ET.XML(body)
+            digests = []
+            for part in root.findall('Part'):
+                data = S3MockHttp.parts[int(part.findtext('PartNumber'))]
+
+                if part.findtext('ETag') != '"%s"' % (md5(data).hexdigest()):
+                    # InvalidPart
+                    return (httplib.BAD_REQUEST, '', {},
+                            httplib.responses[httplib.BAD_REQUEST])
+
+                digests.append(md5(data).digest())
+
+            etag = '%s-%d' % (md5(''.join(digests)).hexdigest(),
+                              len(digests))
+            body = self.fixtures.load('complete_multipart_upload.xml') % (etag)
+            return (httplib.OK, body, {}, httplib.responses[httplib.OK])
+        elif method == 'DELETE':
+            S3MockHttp.aborted = True
+            return (httplib.NO_CONTENT, '', {},
+                    httplib.responses[httplib.NO_CONTENT])
+
+    def _foo_bar_container_foo_test_stream_data_FAIL_PART(self, *args):
+        return self._foo_bar_container_foo_test_stream_data(*args)
+
+    def _foo_bar_container_foo_test_stream_data_FAIL_PART_ALWAYS(self, *args):
+        return self._foo_bar_container_foo_test_stream_data(*args)
+
+    def _foo_bar_container_foo_test_stream_data_COMPLETE_ERROR(self, *args):
+        return self._foo_bar_container_foo_test_stream_data(*args)
+
 class S3MockRawResponse(MockRawResponse):
 
     fixtures = StorageFileFixtures('s3')
 
+    # Ranged download state
+    range_data = ''.join([str(i % 10) for i in range(1000)])
+    ranges = []
+    if_range = None
+    closed = 0
+    remaining = []
+
+    def close(self):
+        S3MockRawResponse.closed += 1
+
+    def next(self):
+        if self._data is None:
+            raise socket.error(104, 'Connection reset by peer')
+
+        return super(S3MockRawResponse, self).next()
+
+    def _foo_bar_container_foo_bar_object_RANGE(self, method, url, body,
+                                                headers):
+        # test_download_object_parallel
+        range_header = self.connection.connection.request_headers['Range']
+        S3MockRawResponse.ranges.append(range_header)
+        S3MockRawResponse.remaining.append(get_remaining())
+        start, end = range_header.split('=')[1].split('-')
+        self._data = [self.range_data[int(start):int(end) + 1]]
+        return (httplib.PARTIAL_CONTENT,
+                '',
+                {},
+                httplib.responses[httplib.PARTIAL_CONTENT])
+
+    def _foo_bar_container_foo_bar_object_RANGE_BROKEN(self, method, url,
+                                                       body, headers):
+        # Connection is reset while the body is being read
+        self._data = None
+        return (httplib.PARTIAL_CONTENT,
+                '',
+                {},
+                httplib.responses[httplib.PARTIAL_CONTENT])
+
+    def _foo_bar_container_foo_bar_object_RESUME(self, method, url, body,
+                                                 headers):
+        # test_download_object_resumable
+        request_headers = self.connection.connection.request_headers
+        S3MockRawResponse.ranges.append(request_headers['Range'])
+        S3MockRawResponse.if_range = request_headers.get('If-Range', None)
+        start = int(request_headers['Range'].split('=')[1].split('-')[0])
+
+        if start == 0:
+            # Connection is dropped
+            self._data = [self.range_data[:400]]
+        else:
+            self._data = [self.range_data[start:]]
+
+        return (httplib.PARTIAL_CONTENT,
+                '',
+                {'etag': '"%s"' % (md5(self.range_data).hexdigest())},
+                httplib.responses[httplib.PARTIAL_CONTENT])
+
+    def _foo_bar_container_foo_bar_object_RESUME_ETAG_CHANGED(self, method,
+                                                              url, body,
+                                                              headers):
+        # Object has changed but the provider has ignored If-Range
+        request_headers = self.connection.connection.request_headers
+        S3MockRawResponse.ranges.append(request_headers['Range'])
+        self._data = ['x' * 600]
+        return (httplib.PARTIAL_CONTENT,
+                '',
+                {'etag': '"%s"' % (md5('foo').hexdigest())},
+                httplib.responses[httplib.PARTIAL_CONTENT])
+
+    def _foo_bar_container_foo_bar_object_RESUME_CHANGED(self, method, url,
+                                                         body, headers):
+        # Whole object is returned
+        request_headers = self.connection.connection.request_headers
+        S3MockRawResponse.ranges.append(request_headers['Range'])
+        self._data = [self.range_data]
+        return (httplib.OK,
+                '',
+                {},
+                httplib.responses[httplib.OK])
+
+    def _foo_bar_container_foo_bar_object_RESUME_NOT_FOUND(self, method, url,
+                                                           body, headers):
+        # Object has been deleted
+        self._data = []
+        return (httplib.NOT_FOUND,
+                '',
+                {},
+                httplib.responses[httplib.NOT_FOUND])
+
+    def _foo_bar_container_foo_bar_object_RANGE_NOT_SUPPORTED(self, method,
+                                                              url, body,
+                                                              headers):
+        self._data = [self.range_data]
+        return (httplib.OK,
+                '',
+                {},
+                httplib.responses[httplib.OK])
+
     def _foo_bar_container_foo_bar_object(self, method, url, body, headers):
         # test_download_object_success
         body = ''
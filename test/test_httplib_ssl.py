@@ -13,11 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
+import ssl
 import unittest
 import os.path
 
 import libcloud.security
+import libcloud.httplib_ssl
 from libcloud.httplib_ssl import LibcloudHTTPSConnection
 
 class TestHttpLibSSLTests(unittest.TestCase):
@@ -135,5 +138,38 @@ class TestHttpLibSSLTests(unittest.TestCase):
         self.assertFalse(self.httplib_object.ca_cert)
         self.assertFalse(self.httplib_object.verify)
 
+    def test_ca_cert_path_lookup_is_cached(self):
+        libcloud.httplib_ssl.clear_ssl_cache()
+        paths = ['/does/not/exist', os.path.abspath(__file__)]
+        calls = []
+        original_exists = os.path.exists
+
+        def exists(path):
+            calls.append(path)
+            return original_exists(path)
+
+        os.path.exists = exists
+        try:
+            for i in range(3):
+                self.assertEqual(libcloud.httplib_ssl.get_ca_cert_path(paths),
+                                 paths[1])
+        finally:
+            os.path.exists = original_exists
+
+        self.assertEqual(calls, paths)
+
+    def test_ssl_context_is_shared(self):
+        if not hasattr(ssl, 'SSLContext'):
+            return
+
+        libcloud.httplib_ssl.clear_ssl_cache()
+        context1 = libcloud.httplib_ssl.get_ssl_context()
+        context2 = libcloud.httplib_ssl.get_ssl_context()
+        self.assertTrue(context1 is context2)
+        self.assertEqual(context1.verify_mode, ssl.CERT_REQUIRED)
+
+        libcloud.httplib_ssl.clear_ssl_cache()
+        self.assertFalse(libcloud.httplib_ssl.get_ssl_context() is context1)
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
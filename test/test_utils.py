@@ -18,10 +18,18 @@ import sys
 import unittest
 import warnings
 import os.path
+import subprocess
+
+from cStringIO import StringIO
 
 # In Python > 2.7 DeprecationWarnings are disabled by default
 warnings.simplefilter('default')
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 import libcloud.utils
 from libcloud.compute.types import Provider
 from libcloud.compute.providers import DRIVERS
@@ -62,6 +70,43 @@ class TestUtils(unittest.TestCase):
         else:
             self.fail('Invalid provider, but an exception was not thrown')
 
+    def test_get_driver_is_cached(self):
+        libcloud.utils.clear_driver_cache()
+        drivers = {'dummy': ('libcloud.compute.drivers.dummy',
+                             'DummyNodeDriver')}
+        driver = libcloud.utils.get_driver(drivers=drivers, provider='dummy')
+        self.assertEqual(len(libcloud.utils._driver_cache), 1)
+        self.assertTrue(libcloud.utils.get_driver(drivers=drivers,
+                                                  provider='dummy') is driver)
+
+        libcloud.utils.clear_driver_cache()
+        self.assertEqual(len(libcloud.utils._driver_cache), 0)
+
+    def test_providers_import_is_lazy(self):
+        # Connection classes and optional dependencies are imported on
+        # first use
+        code = ('import sys; import libcloud.compute.providers; '
+                'print [name for name in ["httplib", "paramiko", '
+                '"libcloud.common.base"] if name in sys.modules]')
+        cwd = os.path.join(os.path.dirname(__file__), '..')
+        process = subprocess.Popen([sys.executable, '-c', code], cwd=cwd,
+                                   stdout=subprocess.PIPE)
+        stdout = process.communicate()[0]
+        self.assertEqual(stdout.strip(), '[]')
+
+    def test_compute_base_import_is_lazy(self):
+        # Modules which are only needed by optional features are imported
+        # on first use
+        code = ('import sys; import libcloud.compute.base; '
+                'print [name for name in ["paramiko", "zlib", "Queue", '
+                '"libcloud.common.metrics", "libcloud.common.deadline", '
+                '"libcloud.common.futures"] if name in sys.modules]')
+        cwd = os.path.join(os.path.dirname(__file__), '..')
+        process = subprocess.Popen([sys.executable, '-c', code], cwd=cwd,
+                                   stdout=subprocess.PIPE)
+        stdout = process.communicate()[0]
+        self.assertEqual(stdout.strip(), '[]')
+
     def test_deprecated_warning(self):
         warnings.showwarning = show_warning
 
@@ -129,5 +174,74 @@ class TestUtils(unittest.TestCase):
 
             self.assertEqual(index, 548)
 
+    def test_read_in_chunks_fill_size_uneven_pieces(self):
+        pieces = ['a' * 3, 'b' * 25, '', 'c' * 7]
+        data = ''.join(pieces[:2])
+
+        result = list(libcloud.utils.read_in_chunks(iter(pieces),
+                                                    chunk_size=10,
+                                                    fill_size=True))
+        self.assertEqual(result, [data[0:10], data[10:20], data[20:]])
+
+        pieces = ['a' * 5, 'b' * 15]
+        result = list(libcloud.utils.read_in_chunks(iter(pieces),
+                                                    chunk_size=10,
+                                                    fill_size=True))
+        self.assertEqual(result, ['a' * 5 + 'b' * 5, 'b' * 10])
+
+    def test_read_in_chunks_default_chunk_size(self):
+        class FakeFile(file):
+            def __init__(self):
+                self.sizes = []
+
+            def read(self, size):
+                self.sizes.append(size)
+                return ''
+
+        fake = FakeFile()
+        self.assertEqual(list(libcloud.utils.read_in_chunks(fake)), [])
+        self.assertEqual(fake.sizes, [libcloud.utils.CHUNK_SIZE])
+
+    def test_iter_parser(self):
+        ns = 'http://example.com/ns'
+        body = ('<root xmlns="%s"><marker>5</marker><items>' % (ns) +
+                ''.join(['<item><id>%d</id><item>nested</item></item>' % (i)
+                         for i in range(100)]) +
+                '</items><done>true</done></root>')
+        parser = libcloud.utils.IterParser(StringIO(body))
+        ids = []
+
+        for element in parser.iterfind('items/item', namespace=ns):
+            ids.append(libcloud.utils.findtext(element=element, xpath='id',
+                                               namespace=ns))
+
+        self.assertEqual(ids, [str(i) for i in range(100)])
+        # Yielded elements are removed from the tree
+        self.assertEqual(libcloud.utils.findall(element=parser.root,
+                                                xpath='items/item',
+                                                namespace=ns), [])
+        self.assertEqual(libcloud.utils.findtext(element=parser.root,
+                                                 xpath='done', namespace=ns),
+                         'true')
+
+    def test_iter_json_array(self):
+        items = [{'name': 'a' * 100, 'bytes': i} for i in range(50)]
+        body = ' [ %s ] ' % (', '.join([json.dumps(i) for i in items] +
+                                       ['12345', '"x"', 'null']))
+
+        for chunk_size in [1, 7, 8192]:
+            source = StringIO(body + '\n')
+            result = list(libcloud.utils.iter_json_array(source, chunk_size))
+            self.assertEqual(result, items + [12345, 'x', None])
+            # Source is read to the end
+            self.assertEqual(source.read(), '')
+
+        self.assertEqual(list(libcloud.utils.iter_json_array(StringIO('[]'))),
+                         [])
+        self.assertRaises(ValueError, list,
+                          libcloud.utils.iter_json_array(StringIO('[1, 2')))
+        self.assertRaises(ValueError, list,
+                          libcloud.utils.iter_json_array(StringIO('{}')))
+
 if __name__ == '__main__':
     sys.exit(unittest.main())